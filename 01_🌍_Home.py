@@ -156,7 +156,8 @@ with theis:
         \n5. Aquifer is nonleaky confined\
         \n6. Flow is unsteady\
         \n7. Water is released instantaneously from storage with decline of hydraulic head\
-        \n8. Diameter of pumping well is very small so that storage in the well can be neglected")
+        \n8. Diameter of pumping well is very small so that storage in the well can be neglected\
+        (for drawdown in the pumped well itself, the Theis page can fit wellbore storage and skin)")
 
     st.markdown("**Equations:**")
 
@@ -380,7 +381,7 @@ st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 # deploy with nativefier and docker
 
 # Future Scope
-# connect data we want to store to mysql db
+# share the local test archive (aquaprobe/archive.py) through a server db
 # user authentication
 
 # 🌍 1️⃣ 2️⃣ 3️⃣ 4️⃣
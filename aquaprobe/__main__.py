@@ -0,0 +1,5 @@
+import sys
+
+from aquaprobe.cli import main
+
+sys.exit(main())
@@ -0,0 +1,157 @@
+"""Local SQLite archive of pumping tests, their readings and results.
+
+A test is one row of the tests table (method, site metadata, input
+parameters as JSON) with its readings and fitted results in child tables.
+Readings are keyed by (test_id, position) in a WITHOUT ROWID table, so all
+readings of a test are stored together and come back in order from one
+range scan; they are written with a single executemany in one
+transaction. Tests are indexed by location, date and method for the
+archive search.
+
+The archive lives in ARCHIVE_PATH unless the AQUAPROBE_ARCHIVE variable
+names another file. Every call opens its own connection, as Streamlit
+runs each session on its own thread.
+"""
+import json
+import os
+import sqlite3
+from collections import namedtuple
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ARCHIVE_PATH = os.environ.get('AQUAPROBE_ARCHIVE', 'archive.sqlite3')
+META_FIELDS = ('location', 'coordinates', 'geology', 'lithology', 'performed_by',
+               'performed_on')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    method TEXT NOT NULL,
+    location TEXT,
+    coordinates TEXT,
+    geology TEXT,
+    lithology TEXT,
+    performed_by TEXT,
+    performed_on TEXT,
+    saved_at TEXT NOT NULL,
+    columns TEXT NOT NULL,
+    parameters TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tests_location ON tests (location, performed_on);
+CREATE INDEX IF NOT EXISTS tests_performed_on ON tests (performed_on);
+CREATE INDEX IF NOT EXISTS tests_method ON tests (method, performed_on);
+CREATE TABLE IF NOT EXISTS readings (
+    test_id INTEGER NOT NULL REFERENCES tests (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    PRIMARY KEY (test_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS results (
+    test_id INTEGER NOT NULL REFERENCES tests (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (test_id, name)
+) WITHOUT ROWID;
+"""
+
+ArchivedTest = namedtuple('ArchivedTest', 'id method meta parameters df results')
+
+
+def connect(path=None):
+    """A connection to the archive at path, creating the tables if needed."""
+    conn = sqlite3.connect(path or ARCHIVE_PATH)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _number(value):
+    """value as a float, or None if it is not a number."""
+    if isinstance(value, (bool, np.bool_)):
+        return float(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    return None
+
+
+def save_test(method, meta, parameters, df, results, path=None):
+    """Store a test and return its id.
+
+    meta holds any of META_FIELDS (dates may be date objects), parameters
+    the inputs of the fit (Q, r, ...) and df the readings in its first two
+    columns. Readings with a missing or infinite value are left out, as
+    the readings table holds numbers only. The numeric entries of results
+    are kept.
+    """
+    columns = list(df.columns[:2])
+    x = df[columns[0]].to_numpy(dtype=float)
+    y = df[columns[1]].to_numpy(dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y = x[finite], y[finite]
+    row = [method] + [None if meta.get(field) is None else str(meta[field])
+                      for field in META_FIELDS]
+    row += [datetime.now().isoformat(timespec='seconds'), json.dumps(columns),
+            json.dumps({name: _number(value) for name, value in parameters.items()})]
+    numeric = [(name, _number(value)) for name, value in results.items()
+               if _number(value) is not None]
+    with closing(connect(path)) as conn, conn:
+        cursor = conn.execute(
+            'INSERT INTO tests (method, {}, saved_at, columns, parameters) VALUES ({})'.format(
+                ', '.join(META_FIELDS), ', '.join('?' * len(row))), row)
+        test_id = cursor.lastrowid
+        conn.executemany('INSERT INTO readings VALUES (?, ?, ?, ?)',
+                         zip([test_id] * len(x), range(len(x)), x.tolist(), y.tolist()))
+        conn.executemany('INSERT INTO results VALUES (?, ?, ?)',
+                         [(test_id, name, value) for name, value in numeric])
+    return test_id
+
+
+def find_tests(method=None, location=None, date_from=None, date_to=None, path=None):
+    """Archived tests, newest first, as a frame of their metadata; location
+    matches any part of the stored location."""
+    clauses, args = [], []
+    if method is not None:
+        clauses.append('method = ?')
+        args.append(method)
+    if location:
+        clauses.append('location LIKE ?')
+        args.append(f'%{location}%')
+    if date_from is not None:
+        clauses.append('performed_on >= ?')
+        args.append(str(date_from))
+    if date_to is not None:
+        clauses.append('performed_on <= ?')
+        args.append(str(date_to))
+    where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+    with closing(connect(path)) as conn:
+        return pd.read_sql_query(
+            'SELECT id, method, {}, saved_at FROM tests{} ORDER BY performed_on DESC, id DESC'
+            .format(', '.join(META_FIELDS), where), conn, params=args)
+
+
+def load_test(test_id, path=None):
+    """The ArchivedTest with the given id; raises KeyError if there is none."""
+    with closing(connect(path)) as conn:
+        row = conn.execute('SELECT method, {}, columns, parameters FROM tests WHERE id = ?'
+                           .format(', '.join(META_FIELDS)), (test_id,)).fetchone()
+        if row is None:
+            raise KeyError(f'no archived test {test_id}')
+        readings = np.array(conn.execute(
+            'SELECT x, y FROM readings WHERE test_id = ? ORDER BY position', (test_id,)
+        ).fetchall(), dtype=float).reshape(-1, 2)
+        results = dict(conn.execute(
+            'SELECT name, value FROM results WHERE test_id = ?', (test_id,)).fetchall())
+    method, meta, (columns, parameters) = row[0], row[1:-2], row[-2:]
+    columns = json.loads(columns)
+    df = pd.DataFrame({columns[0]: readings[:, 0], columns[1]: readings[:, 1]})
+    return ArchivedTest(test_id, method, dict(zip(META_FIELDS, meta)), json.loads(parameters),
+                        df, results)
+
+
+def delete_test(test_id, path=None):
+    with closing(connect(path)) as conn, conn:
+        conn.execute('DELETE FROM tests WHERE id = ?', (test_id,))
@@ -0,0 +1,197 @@
+"""Batch analysis of many pumping tests from one long-format table.
+
+The input has one row per reading with the columns in BATCH_COLUMNS; time
+is in minutes and converted to days like the single-test pages do. Every
+(test_id, well_id) pair is fitted separately and the results come back
+as one summary frame.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import t as student_t
+
+from aquaprobe.methods import MAX_REFITS, U_CRITERION
+from aquaprobe.theis import fit_theis
+
+BATCH_COLUMNS = ['test_id', 'well_id', 'Q', 'r', 'time', 'drawdown']
+GROUP_COLUMNS = ['test_id', 'well_id']
+SUMMARY_COLUMNS = GROUP_COLUMNS + ['Q', 'r', 'n', 'n_used', 'T', 'S', 'rms_residual']
+
+THIEM_BATCH_COLUMNS = ['test_id', 'well_id', 'Q', 'r', 'head']
+THIEM_SUMMARY_COLUMNS = GROUP_COLUMNS + ['Q', 'n', 'T', 'T_low', 'T_high', 'rms_residual']
+
+MIN_READINGS = 3
+# below this many tests a process pool costs more than it saves
+MIN_TESTS_FOR_POOL = 16
+
+
+def check_batch_columns(df, columns=BATCH_COLUMNS):
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError('Missing columns: {}'.format(', '.join(missing)))
+
+
+def _prepare(df):
+    check_batch_columns(df)
+    df = df[BATCH_COLUMNS].dropna()
+    df = df[(df['time'] > 0) & (df['Q'] > 0) & (df['r'] > 0)]
+    return df.sort_values(GROUP_COLUMNS, kind='stable')
+
+
+def fit_cooper_jacob_batch(df):
+    """Cooper-Jacob straight-line fit of every test in one vectorized pass.
+
+    As in methods.cooper_jacob_time, each line is refitted on the readings
+    with u <= U_CRITERION until no test's set of readings changes.
+    """
+    df = _prepare(df)
+    codes = df.groupby(GROUP_COLUMNS, sort=False).ngroup().to_numpy()
+    first = np.unique(codes, return_index=True)[1]
+    n_groups = len(first)
+    t = df['time'].to_numpy(dtype=float) / 1440
+    x = np.log(t)
+    y = df['drawdown'].to_numpy(dtype=float)
+    Q = df['Q'].to_numpy(dtype=float)[first]
+    r = df['r'].to_numpy(dtype=float)[first]
+
+    def group_sum(values):
+        return np.bincount(codes, weights=values, minlength=n_groups)
+
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    used = np.ones(len(df), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for _ in range(MAX_REFITS):
+            w = used.astype(float)
+            n_used = group_sum(w)
+            sx, sy = group_sum(w * x), group_sum(w * y)
+            sxx, sxy = group_sum(w * x * x), group_sum(w * x * y)
+            slope = (n_used * sxy - sx * sy) / (n_used * sxx - sx * sx)
+            intercept = (sy - slope * sx) / n_used
+
+            delta_s = np.abs(slope * np.log(10))
+            t_0 = np.exp(-intercept / slope)
+            T = (2.303 * Q) / (4 * np.pi * delta_s)
+            S = (2.25 * T * t_0) / (r * r)
+            valid = (r * r * S / (4 * T))[codes] / t <= U_CRITERION
+            # tests that would keep fewer than two readings keep their last fit
+            keep = group_sum(valid.astype(float)) < 2
+            valid[keep[codes]] = used[keep[codes]]
+            if np.array_equal(valid, used):
+                break
+            used = valid
+
+        residual = np.where(used, y - (slope[codes] * x + intercept[codes]), 0.0)
+        rms_residual = np.sqrt(group_sum(residual * residual) / n_used)
+    too_short = n < MIN_READINGS
+    T[too_short] = S[too_short] = rms_residual[too_short] = np.nan
+
+    summary = df[GROUP_COLUMNS].iloc[first].reset_index(drop=True)
+    summary['Q'] = Q
+    summary['r'] = r
+    summary['n'] = n.astype(int)
+    summary['n_used'] = n_used.astype(int)
+    summary['T'] = T
+    summary['S'] = S
+    summary['rms_residual'] = rms_residual
+    return summary[SUMMARY_COLUMNS]
+
+
+def _fit_theis_group(args):
+    t, s, Q, r = args
+    if t.size < MIN_READINGS:
+        return np.nan, np.nan, np.nan
+    fit = fit_theis(t, s, Q, r)
+    return fit.T, fit.S, fit.rms_residual
+
+
+def fit_theis_batch(df, max_workers=None):
+    """Theis fit of every test, spread over a process pool for large batches."""
+    df = _prepare(df)
+    rows = list()
+    jobs = list()
+    for key, group in df.groupby(GROUP_COLUMNS, sort=False):
+        Q = float(group['Q'].iloc[0])
+        r = float(group['r'].iloc[0])
+        rows.append(key + (Q, r, len(group), len(group)))
+        jobs.append((group['time'].to_numpy(dtype=float) / 1440,
+                     group['drawdown'].to_numpy(dtype=float), Q, r))
+
+    workers = max_workers or os.cpu_count() or 1
+    if len(jobs) >= MIN_TESTS_FOR_POOL and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(jobs) // (4 * workers))
+            results = list(pool.map(_fit_theis_group, jobs, chunksize=chunksize))
+    else:
+        results = [_fit_theis_group(job) for job in jobs]
+
+    summary = pd.DataFrame(
+        [row + result for row, result in zip(rows, results)],
+        columns=SUMMARY_COLUMNS)
+    return summary[SUMMARY_COLUMNS]
+
+
+def fit_thiem_batch(df, confidence=0.95):
+    """Thiem weighted least-squares fit of every pumped well in one pass.
+
+    Each (test_id, well_id) group holds the steady heads of its piezometers;
+    an optional weight column gives relative weights as in
+    methods.thiem_estimate. Raises ValueError, naming the wells, if any
+    weight is missing, infinite or not positive.
+    """
+    check_batch_columns(df, THIEM_BATCH_COLUMNS)
+    columns = THIEM_BATCH_COLUMNS + (['weight'] if 'weight' in df.columns else [])
+    df = df[columns].dropna(subset=THIEM_BATCH_COLUMNS)
+    df = df[(df['r'] > 0) & (df['Q'] > 0)]
+    df = df.sort_values(GROUP_COLUMNS, kind='stable')
+    codes = df.groupby(GROUP_COLUMNS, sort=False).ngroup().to_numpy()
+    first = np.unique(codes, return_index=True)[1]
+    n_groups = len(first)
+    x = np.log(df['r'].to_numpy(dtype=float))
+    y = df['head'].to_numpy(dtype=float)
+    w = df['weight'].to_numpy(dtype=float) if 'weight' in df.columns else np.ones(len(df))
+    invalid = ~(np.isfinite(w) & (w > 0))
+    if invalid.any():
+        wells = df.loc[invalid, GROUP_COLUMNS].drop_duplicates()
+        raise ValueError('weights must be finite and positive (test_id / well_id: {})'.format(
+            ', '.join(f'{test} / {well}' for test, well in wells.itertuples(index=False))))
+    Q = df['Q'].to_numpy(dtype=float)[first]
+
+    def group_sum(values):
+        return np.bincount(codes, weights=values, minlength=n_groups)
+
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sw = group_sum(w)
+        x_mean = group_sum(w * x) / sw
+        y_mean = group_sum(w * y) / sw
+        dx = x - x_mean[codes]
+        sxx = group_sum(w * dx * dx)
+        slope = group_sum(w * dx * (y - y_mean[codes])) / sxx
+        residual = y - (y_mean[codes] + slope[codes] * dx)
+        dof = n - 2
+        slope_error = np.sqrt(group_sum(w * residual * residual) / dof / sxx)
+        half_width = student_t.ppf(0.5 + confidence / 2, np.maximum(dof, 1)) * slope_error
+        T = Q / (2 * np.pi * slope)
+        T_low = Q / (2 * np.pi * (slope + half_width))
+        T_high = np.where(slope > half_width, Q / (2 * np.pi * (slope - half_width)), np.inf)
+        rms_residual = np.sqrt(group_sum(residual * residual) / n)
+    T_low[dof < 1] = T_high[dof < 1] = np.nan
+    T[n < 2] = rms_residual[n < 2] = np.nan
+
+    summary = df[GROUP_COLUMNS].iloc[first].reset_index(drop=True)
+    summary['Q'] = Q
+    summary['n'] = n.astype(int)
+    summary['T'] = T
+    summary['T_low'] = T_low
+    summary['T_high'] = T_high
+    summary['rms_residual'] = rms_residual
+    return summary[THIEM_SUMMARY_COLUMNS]
+
+
+BATCH_METHODS = {
+    'Theis': fit_theis_batch,
+    'Cooper Jacob': fit_cooper_jacob_batch,
+    'Thiem': fit_thiem_batch,
+}
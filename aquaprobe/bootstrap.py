@@ -0,0 +1,187 @@
+"""Bootstrap and jackknife confidence intervals of fitted aquifer parameters.
+
+Both methods refit the parameters to resampled readings. A resample is a
+row of weights over the readings: the bootstrap draws n readings with
+replacement N_RESAMPLES times (the weights are the counts), the jackknife
+leaves each reading out in turn. The bootstrap interval is the percentile
+interval of the refitted values; the jackknife interval is the estimate
+plus or minus Student's t times the jackknife standard error. All the
+parameters are positive, so the jackknife works on their logarithms.
+
+The straight-line fits (Cooper-Jacob, Theis recovery) are refitted in
+closed form for a whole block of resamples at once from weighted sums,
+with blocks of at most CHUNK_SIZE weights. The Theis fit is nonlinear, so
+its resamples are refitted one by one, from the fitted S and T, in blocks
+of REFIT_BLOCK spread over a process pool. The readings go to each worker
+once and a block is only its first resample and size: the worker draws
+the resampled rows itself, from a generator seeded with the seed and the
+block, so no block of weights is ever held for all the resamples.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import t as student_t
+
+from aquaprobe.superposition import fit_schedule
+from aquaprobe.theis import fit_theis
+from aquaprobe.well_function import CHUNK_SIZE
+
+RESAMPLING_METHODS = ('bootstrap', 'jackknife')
+N_RESAMPLES = 2000
+CONFIDENCE = 0.95
+SEED = 0
+REFIT_BLOCK = 100
+# below this many refits a process pool costs more than it saves
+MIN_REFITS_FOR_POOL = 500
+
+
+def check_method(method):
+    if method not in RESAMPLING_METHODS:
+        raise ValueError(f'unknown resampling method {method!r}')
+
+
+def resample_weights(n, method='bootstrap', n_resamples=N_RESAMPLES, seed=SEED, block=None):
+    """Blocks of resampling weights over n readings, one row per resample.
+
+    The bootstrap gives n_resamples rows drawn with a fixed seed, so the
+    same data always gives the same interval; the jackknife gives n rows.
+    """
+    check_method(method)
+    block = block or max(1, CHUNK_SIZE // n)
+    if method == 'jackknife':
+        for start in range(0, n, block):
+            rows = np.arange(start, min(start + block, n))
+            weights = np.ones((rows.size, n))
+            weights[np.arange(rows.size), rows] = 0
+            yield weights
+        return
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_resamples, block):
+        size = min(block, n_resamples - start)
+        yield rng.multinomial(n, np.full(n, 1 / n), size=size).astype(float)
+
+
+def interval(samples, estimate, method='bootstrap', confidence=CONFIDENCE):
+    """(low, high) of a positive parameter from its resampled values."""
+    check_method(method)
+    samples = np.asarray(samples, dtype=float)
+    samples = samples[np.isfinite(samples) & (samples > 0)]
+    if samples.size < 2:
+        return np.nan, np.nan
+    if method == 'bootstrap':
+        low, high = np.percentile(samples, [50 * (1 - confidence), 50 * (1 + confidence)])
+        return float(low), float(high)
+    n = samples.size
+    logs = np.log(samples)
+    error = np.sqrt((n - 1) / n * np.sum((logs - logs.mean()) ** 2))
+    half_width = student_t.ppf(0.5 + confidence / 2, n - 1) * error
+    return float(estimate * np.exp(-half_width)), float(estimate * np.exp(half_width))
+
+
+def intervals(names, samples, estimates, method='bootstrap', confidence=CONFIDENCE):
+    """{name_low: .., name_high: ..} for each parameter in names."""
+    results = dict()
+    for name, values, estimate in zip(names, samples, estimates):
+        results[name + '_low'], results[name + '_high'] = interval(
+            values, estimate, method, confidence)
+    return results
+
+
+def line_samples(x, y, weights):
+    """Slopes and intercepts of weighted least-squares lines of y against
+    x, one for each row of weights."""
+    sw = weights.sum(axis=1)
+    sx, sy = weights @ x, weights @ y
+    sxx, sxy = weights @ (x * x), weights @ (x * y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (sw * sxy - sx * sy) / (sw * sxx - sx * sx)
+        intercept = (sy - slope * sx) / sw
+    return slope, intercept
+
+
+def line_intervals(x, y, parameters, names, method='bootstrap', confidence=CONFIDENCE,
+                   n_resamples=N_RESAMPLES, seed=SEED):
+    """Intervals of the parameters of a straight-line fit of y against x.
+
+    parameters(slope, intercept) returns the parameters named in names as
+    arrays, for arrays of lines.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    ones = np.ones((1, x.size))
+    estimates = [float(value[0]) for value in parameters(*line_samples(x, y, ones))]
+    blocks = [parameters(*line_samples(x, y, weights))
+              for weights in resample_weights(x.size, method, n_resamples, seed)]
+    samples = [np.concatenate([np.atleast_1d(block[i]) for block in blocks])
+               for i in range(len(names))]
+    return intervals(names, samples, estimates, method, confidence)
+
+
+# the readings of a pool worker, set once by its initializer; refits in
+# the calling process are passed theirs, as sessions share the process
+_readings = None
+
+
+def _set_readings(*readings):
+    global _readings
+    _readings = readings
+
+
+def resample_blocks(n, method='bootstrap', n_resamples=N_RESAMPLES, block=REFIT_BLOCK):
+    """(start, size) of each block of resamples of n readings."""
+    check_method(method)
+    total = n if method == 'jackknife' else n_resamples
+    return [(start, min(block, total - start)) for start in range(0, total, block)]
+
+
+def resample_rows(n, method, start, size, seed=SEED):
+    """The rows of the resamples start .. start + size - 1 of n readings:
+    the jackknife leaves reading start + i out, the bootstrap draws n rows
+    with replacement from a generator seeded with seed and start."""
+    if method == 'jackknife':
+        for i in range(start, start + size):
+            yield np.delete(np.arange(n), i)
+        return
+    rng = np.random.default_rng([seed, start])
+    for _ in range(size):
+        yield rng.integers(0, n, n)
+
+
+def _refit_theis(job, readings):
+    t, s, Q, r, schedule, S0, T0 = readings
+    method, start, size, seed = job
+    samples = np.empty((size, 2))
+    for i, rows in enumerate(resample_rows(t.size, method, start, size, seed)):
+        if schedule is None:
+            fit = fit_theis(t[rows], s[rows], Q, r, S0, T0)
+        else:
+            fit = fit_schedule(t[rows], s[rows], schedule, r, S0, T0)
+        samples[i] = fit.T, fit.S
+    return samples
+
+
+def _refit_theis_in_worker(job):
+    return _refit_theis(job, _readings)
+
+
+def theis_intervals(t, s, Q, r, S, T, schedule=None, method='bootstrap',
+                    confidence=CONFIDENCE, n_resamples=N_RESAMPLES, seed=SEED,
+                    max_workers=None):
+    """Intervals of T and S of a Theis fit (t in days) with the fitted S and
+    T, or of a fit under a pumping schedule (in days) if one is given."""
+    readings = (np.asarray(t, dtype=float), np.asarray(s, dtype=float), Q, r, schedule, S, T)
+    jobs = [(method, start, size, seed)
+            for start, size in resample_blocks(readings[0].size, method, n_resamples)]
+
+    workers = max_workers or os.cpu_count() or 1
+    n_refits = sum(job[2] for job in jobs)
+    if n_refits >= MIN_REFITS_FOR_POOL and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_readings,
+                                 initargs=readings) as pool:
+            blocks = list(pool.map(_refit_theis_in_worker, jobs))
+    else:
+        blocks = [_refit_theis(job, readings) for job in jobs]
+
+    samples = np.vstack(blocks)
+    return intervals(('T', 'S'), samples.T, (T, S), method, confidence)
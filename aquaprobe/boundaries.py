@@ -0,0 +1,231 @@
+"""Theis drawdown near straight aquifer boundaries by the method of images.
+
+A straight barrier (no-flow) boundary is modelled by an image of the
+pumping well mirrored across it with the same rate, and a recharge
+(constant-head) boundary by an image of the opposite rate. With two
+boundaries the images are mirrored again across the other boundary, and
+so on: a wedge of angle 180/n degrees closes after 2n - 1 images, while a
+parallel strip needs an infinite series, which is cut off once at least
+max_images images have been generated (far images only add drawdown
+at late times). The drawdown at an observation point is
+
+    s(t) = Q / (4 pi T) sum_i sign_i W(r_i^2 S / (4 T t))
+
+over the pumping well and its images. The sum is evaluated for all
+images and times at once, a block of times at a time so that the arrays
+stay within CHUNK_SIZE elements. fit_boundary fits S, T and the distance
+from the pumping well to the boundary with the same Levenberg-Marquardt
+loop as the Theis fit.
+
+Coordinates put the pumping well at the origin with the first boundary
+across the positive x axis at x = distance.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from aquaprobe.theis import cooper_jacob_seed, levenberg_marquardt
+from aquaprobe.well_function import CHUNK_SIZE, calculate_u, well_function
+
+SHAPES = ('straight', 'strip', 'wedge')
+KINDS = ('barrier', 'recharge')
+MAX_IMAGES = 200
+SEED_DISTANCES = 16
+SEED_STARTS = 3
+DISTANCE_STEP = 1e-6
+
+Boundary = namedtuple('Boundary', 'x y nx ny kind')
+Layout = namedtuple('Layout', 'shape kinds width wedge_n position')
+ImageWells = namedtuple('ImageWells', 'x y sign')
+BoundaryFit = namedtuple('BoundaryFit', 'S T distance rms_residual iterations converged')
+
+
+def make_layout(shape, kinds, width=None, wedge_n=2, position=0.5):
+    """A Layout of one straight boundary, a parallel strip or a wedge of
+    angle 180/wedge_n degrees, checked for consistency.
+
+    kinds holds the kind of each boundary. width is the width of a strip,
+    position the angle of the pumping well from the first side of a wedge
+    as a fraction of the wedge angle.
+    """
+    kinds = tuple(kinds)
+    if shape not in SHAPES:
+        raise ValueError(f'unknown boundary shape {shape!r}')
+    if any(kind not in KINDS for kind in kinds):
+        raise ValueError('boundaries are either barrier or recharge')
+    if len(kinds) != (1 if shape == 'straight' else 2):
+        raise ValueError(f'a {shape} boundary needs {1 if shape == "straight" else 2} kinds')
+    if shape == 'strip' and not (width is not None and width > 0):
+        raise ValueError('a strip needs a positive width')
+    if shape == 'wedge' and not (int(wedge_n) == wedge_n and wedge_n >= 2):
+        raise ValueError('the wedge angle must be 180 degrees divided by a whole number above 1')
+    if shape == 'wedge' and len(set(kinds)) == 2 and wedge_n % 2:
+        raise ValueError('a barrier and a recharge boundary can only meet at a wedge angle '
+                         'of 180 degrees divided by an even number')
+    if shape == 'wedge' and not 0 < position < 1:
+        raise ValueError('the pumping well must lie inside the wedge')
+    return Layout(shape, kinds, width, int(wedge_n), position)
+
+
+def layout_boundaries(layout, distance):
+    """The boundaries of layout with the first one at distance from the
+    pumping well. Normals point out of the aquifer."""
+    distance = float(distance)
+    first = Boundary(distance, 0.0, 1.0, 0.0, layout.kinds[0])
+    if layout.shape == 'straight':
+        return [first]
+    if layout.shape == 'strip':
+        if layout.width <= distance:
+            raise ValueError('the pumping well must lie inside the strip')
+        return [first, Boundary(distance - layout.width, 0.0, -1.0, 0.0, layout.kinds[1])]
+    # the wedge apex is where the first boundary meets the second one,
+    # turned through the wedge angle about the apex
+    angle = math.pi / layout.wedge_n
+    phi = layout.position * angle
+    apex_y = distance / math.tan(phi)
+    turn = math.pi - angle
+    second = Boundary(distance, apex_y, math.cos(turn), math.sin(turn), layout.kinds[1])
+    return [first, second]
+
+
+def inside(boundaries, x, y):
+    """Whether the point (x, y) lies inside the aquifer, on the inner side
+    of every boundary."""
+    return all((x - b.x) * b.nx + (y - b.y) * b.ny < 0 for b in boundaries)
+
+
+def image_wells(boundaries, max_images=MAX_IMAGES):
+    """The pumping well (first, sign 1) and its images across boundaries.
+
+    Images are mirrored a generation at a time, nearest generation first,
+    until no new image turns up or max_images is reached. A barrier keeps
+    the sign of the mirrored well and a recharge boundary flips it; an
+    image reached twice with opposite signs means the boundaries cannot be
+    modelled by images and raises ValueError.
+    """
+    scale = max(max(abs(b.x), abs(b.y)) for b in boundaries)
+    found = {(0.0, 0.0): 1.0}
+    generation = [(0.0, 0.0, 1.0)]
+    while generation and len(found) <= max_images:
+        next_generation = []
+        for x, y, sign in generation:
+            for b in boundaries:
+                d = (x - b.x) * b.nx + (y - b.y) * b.ny
+                xi, yi = x - 2 * d * b.nx, y - 2 * d * b.ny
+                si = sign if b.kind == 'barrier' else -sign
+                key = (round(xi / scale, 6) + 0.0, round(yi / scale, 6) + 0.0)
+                if key in found:
+                    if found[key] != si:
+                        raise ValueError('these boundary kinds cannot meet at this wedge angle')
+                    continue
+                found[key] = si
+                next_generation.append((xi, yi, si))
+        generation = next_generation
+    keys = list(found)
+    signs = np.array([found[k] for k in keys])
+    points = np.array(keys) * scale
+    return ImageWells(points[:, 0], points[:, 1], signs)
+
+
+def _superpose(t, images, S, T, Q, x, y):
+    """Drawdown and sum of sign Q e^-u / (4 pi T) at the flat times t (days)."""
+    r = np.hypot(images.x - x, images.y - y)
+    scaled = images.sign * Q / (4 * np.pi * T)
+    drawdown = np.zeros(t.size)
+    e_u = np.zeros(t.size)
+    block = max(1, CHUNK_SIZE // r.size)
+    for start in range(0, t.size, block):
+        u = calculate_u(r[None, :], S, T, t[start:start + block, None])
+        drawdown[start:start + block] = well_function(u) @ scaled
+        e_u[start:start + block] = np.exp(-u) @ scaled
+    return drawdown, e_u
+
+
+def boundary_drawdown(t, S, T, Q, x, y, layout, distance, max_images=MAX_IMAGES):
+    """Drawdown at times t (days) at the observation point (x, y)."""
+    t = np.asarray(t, dtype=float)
+    images = image_wells(layout_boundaries(layout, distance), max_images)
+    drawdown, _ = _superpose(t.ravel(), images, S, T, Q, x, y)
+    return drawdown.reshape(t.shape)
+
+
+def _residuals_and_jacobian(p, t, s, Q, x, y, layout, max_images):
+    S, T, distance = np.exp(p)
+    try:
+        boundaries = layout_boundaries(layout, distance)
+        if not inside(boundaries, x, y):
+            raise ValueError('the observation well must lie inside the aquifer')
+        images = image_wells(boundaries, max_images)
+        moved = image_wells(layout_boundaries(layout, distance * (1 + DISTANCE_STEP)), max_images)
+    except ValueError:
+        # a trial step that puts either well outside the aquifer is rejected
+        return np.full(t.size, np.inf), np.zeros((3, t.size))
+    model, e_u = _superpose(t, images, S, T, Q, x, y)
+    jac = np.empty((3, t.size))
+    jac[0] = -e_u
+    jac[1] = e_u - model
+    # the images move with the boundary, so d/d ln(distance) by a difference
+    jac[2] = (_superpose(t, moved, S, T, Q, x, y)[0] - model) / np.log1p(DISTANCE_STEP)
+    return model - s, jac
+
+
+def boundary_seeds(t, s, Q, x, y, layout, max_images=MAX_IMAGES):
+    """Starting (S, T, distance) guesses, best first: Cooper-Jacob on the
+    early half (in log time) of the record, before the boundary shows, with
+    the SEED_STARTS best of a range of distances for that S and T. Only
+    distances that keep the observation point (x, y) inside the aquifer
+    are tried; raises ValueError if there are none."""
+    r = max(np.hypot(x, y), 1e-3)
+    early = np.log(t) <= 0.5 * (np.log(t.min()) + np.log(t.max()))
+    if np.count_nonzero(early) >= 3:
+        S, T = cooper_jacob_seed(t[early], s[early], Q, r)
+    else:
+        S, T = cooper_jacob_seed(t, s, Q, r)
+    reach = np.sqrt(2.25 * T * t.max() / S)
+    candidates = np.geomspace(r / 2, max(2 * reach, r), SEED_DISTANCES)
+    if layout.shape == 'strip':
+        # the well and the observation point both lie between the sides
+        low, high = max(x, 0.0), min(x + layout.width, layout.width)
+        candidates = np.linspace(low, high, SEED_DISTANCES + 2)[1:-1] if low < high else []
+    candidates = [distance for distance in candidates
+                  if inside(layout_boundaries(layout, distance), x, y)]
+    if not candidates:
+        raise ValueError('the observation well lies outside the boundaries '
+                         'at every distance tried')
+    costs = [np.sum((boundary_drawdown(t, S, T, Q, x, y, layout, distance, max_images) - s)**2)
+             for distance in candidates]
+    return [(S, T, candidates[i]) for i in np.argsort(costs)[:SEED_STARTS]]
+
+
+def fit_boundary(t, s, Q, x, y, layout, S0=None, T0=None, distance0=None,
+                 max_images=MAX_IMAGES):
+    """Fit S, T and the distance to the (first) boundary to time-drawdown
+    data (t in days) at the observation point (x, y).
+
+    Without a full starting guess the fit is run from each of
+    boundary_seeds, as a strip in particular has more than one local
+    minimum, and the best fit is kept. Distances that would put the
+    observation point outside the aquifer are never tried.
+    """
+    t = np.asarray(t, dtype=float).ravel()
+    s = np.asarray(s, dtype=float).ravel()
+    if S0 is None or T0 is None or distance0 is None:
+        seeds = boundary_seeds(t, s, Q, x, y, layout, max_images)
+    else:
+        if not inside(layout_boundaries(layout, distance0), x, y):
+            raise ValueError('the observation well must lie inside the aquifer')
+        seeds = [(S0, T0, distance0)]
+
+    best = None
+    for seed in seeds:
+        fit = levenberg_marquardt(
+            lambda p: _residuals_and_jacobian(p, t, s, Q, x, y, layout, max_images),
+            np.log(seed))
+        if best is None or fit[1] < best[1]:
+            best = fit
+    p, cost, iterations, converged = best
+    S, T, distance = np.exp(p)
+    rms_residual = np.sqrt(cost / t.size)
+    return BoundaryFit(float(S), float(T), float(distance), float(rms_residual),
+                       iterations, converged)
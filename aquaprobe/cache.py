@@ -0,0 +1,91 @@
+"""Process-wide memo of analysis results across Streamlit reruns.
+
+Every widget interaction reruns the page script from the top, so the fits
+and figures are looked up here by a hash of the function and the content
+of its arguments (arrays and frames included). The memo holds at most
+MAX_ENTRIES results and evicts the least recently used one. Results are
+shared between reruns and sessions, so callers must not modify them.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MAX_ENTRIES = 64
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_MISSING = object()
+
+
+def _update(h, value):
+    h.update(type(value).__name__.encode())
+    if isinstance(value, np.ndarray):
+        h.update(f'{value.dtype}{value.shape}'.encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, pd.DataFrame):
+        h.update(repr(list(value.columns)).encode())
+        h.update(pd.util.hash_pandas_object(value).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        h.update(repr(value.name).encode())
+        h.update(pd.util.hash_pandas_object(value).to_numpy().tobytes())
+    elif isinstance(value, (bytes, bytearray)):
+        h.update(value)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _update(h, item)
+    elif isinstance(value, dict):
+        for name in sorted(value):
+            h.update(repr(name).encode())
+            _update(h, value[name])
+    elif callable(value):
+        h.update(f'{value.__module__}.{value.__qualname__}'.encode())
+    else:
+        h.update(repr(value).encode())
+
+
+def make_key(func, *args, **kwargs):
+    h = hashlib.blake2b(digest_size=20)
+    _update(h, func)
+    _update(h, args)
+    _update(h, kwargs)
+    return h.hexdigest()
+
+
+def lookup(key, default=None):
+    with _lock:
+        if key in _entries:
+            _entries.move_to_end(key)
+            return _entries[key]
+    return default
+
+
+def store(key, value):
+    with _lock:
+        _entries[key] = value
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def cached(func, *args, **kwargs):
+    """func(*args, **kwargs), reusing the result of an earlier identical call."""
+    return cached_as(make_key(func, *args, **kwargs), func, *args, **kwargs)
+
+
+def cached_as(key, func, *args, **kwargs):
+    """func(*args, **kwargs) memoised under key rather than a hash of the
+    arguments, for arguments too large to hash on every rerun; key must
+    change whenever the result would."""
+    result = lookup(key, _MISSING)
+    if result is _MISSING:
+        result = func(*args, **kwargs)
+        store(key, result)
+    return result
+
+
+def clear():
+    with _lock:
+        _entries.clear()
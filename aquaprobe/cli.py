@@ -0,0 +1,216 @@
+"""Headless batch analysis of a directory of pumping tests.
+
+    python -m aquaprobe cooper-jacob-time "test data" -o results -p Q=2500 -p r=60
+
+Every CSV file in the directory is one test, with the same columns the
+matching page expects. Parameters are given with -p and can be overridden
+per test by a text file with the same name holding "key = value" lines
+(e.g. "Q = 2500 m3/day"). The steady-state methods have no readings, so
+for them every text file is a test. Tests are spread over a process pool
+and each one writes a results CSV, a figure and a PDF report; a summary
+of all tests is written to summary.csv.
+"""
+import argparse
+import glob
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import matplotlib
+matplotlib.use('Agg')
+import pandas as pd
+
+from aquaprobe import methods, plots
+from aquaprobe.ingest import read_logger
+from aquaprobe.report import build_report
+
+Method = namedtuple('Method', 'title columns params run plot')
+
+PARAMETER_PATTERN = re.compile(
+    r'^\s*([A-Za-z_]\w*)\s*=\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+
+
+def _plot_theis(results, df, params):
+    return plots.plot_theis(df['Time']/1440, df['Drawdown'], results['S'], results['T'],
+                            params['Q'], params['r'])
+
+
+def _plot_hantush_jacob(results, df, params):
+    return plots.plot_hantush(df, results, params['Q'], params['r'])
+
+
+def _plot_neuman(results, df, params):
+    return plots.plot_neuman(df, results, params['Q'], params['r'])
+
+
+def _plot_papadopulos_cooper(results, df, params):
+    return plots.plot_wellbore(df, results, params['Q'], params['r_w'])
+
+
+def _plot_cooper_jacob_time(results, df, params):
+    return plots.plot_cooper_jacob(df['Time'], df['Drawdown'], results,
+                                   'log Time', 'Time vs Drawdown')
+
+
+def _plot_cooper_jacob_distance(results, df, params):
+    return plots.plot_cooper_jacob(df['Distance'], df['Drawdown'], results,
+                                   'log Distance', 'Distance vs Drawdown')
+
+
+def _plot_thiem(results, df, params):
+    return plots.plot_thiem(df)
+
+
+def _plot_thiem_estimate(results, df, params):
+    return plots.plot_thiem(df, results)
+
+
+def _plot_dupuit(results, df, params):
+    return plots.plot_dupuit(df, results['r0'])
+
+
+def _plot_theis_recovery(results, df, params):
+    return plots.plot_theis_recovery(df['t_by_t_dash'], df['Residual_Drawdown'], results)
+
+
+METHODS = {
+    'theis': Method('Theis Test Report', ('Time', 'Drawdown'), ('Q', 'r'),
+                    methods.theis, _plot_theis),
+    'hantush-jacob': Method('Hantush-Jacob Test Report', ('Time', 'Drawdown'), ('Q', 'r'),
+                            methods.hantush_jacob, _plot_hantush_jacob),
+    'neuman': Method('Neuman Test Report', ('Time', 'Drawdown'), ('Q', 'r'),
+                     methods.neuman, _plot_neuman),
+    'papadopulos-cooper': Method('Papadopulos-Cooper Test Report', ('Time', 'Drawdown'),
+                                 ('Q', 'r_w'), methods.papadopulos_cooper,
+                                 _plot_papadopulos_cooper),
+    'cooper-jacob-time': Method('Cooper Jacob Test Report', ('Time', 'Drawdown'), ('Q', 'r'),
+                                methods.cooper_jacob_time, _plot_cooper_jacob_time),
+    'cooper-jacob-distance': Method('Cooper Jacob Test Report', ('Distance', 'Drawdown'),
+                                    ('Q', 't'), methods.cooper_jacob_distance,
+                                    _plot_cooper_jacob_distance),
+    'thiem': Method('Thiem Test Report', None, ('T', 'r1', 'h1', 'r2', 'h2'),
+                    methods.thiem, _plot_thiem),
+    'thiem-piezometers': Method('Thiem Test Report', ('r', 'h'), ('Q',),
+                                methods.thiem_estimate, _plot_thiem_estimate),
+    'dupuit-forchheimer': Method('Dupuit-Forchheimer Test Report', None,
+                                 ('R', 'Q', 'K', 'h0', 'r1'),
+                                 methods.dupuit_forchheimer, _plot_dupuit),
+    'theis-recovery': Method('Theis Recovery Test Report', ('t_dash', 'Residual_Drawdown'),
+                             ('Q', 't_when_pumping_stopped'),
+                             methods.theis_recovery, _plot_theis_recovery),
+}
+
+
+def read_parameters(path):
+    params = dict()
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = PARAMETER_PATTERN.match(line)
+            if match:
+                params[match.group(1)] = float(match.group(2))
+    return params
+
+
+def find_tests(method, directory):
+    pattern = '*.txt' if method.columns is None else '*.csv'
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def analyse_test(method_name, path, defaults, output_dir, report=True, log_bins=None):
+    """Run one test and write its outputs; returns a row of the summary."""
+    method = METHODS[method_name]
+    name = os.path.splitext(os.path.basename(path))[0]
+    row = {'test': name}
+    try:
+        params = dict(defaults)
+        sidecar = os.path.splitext(path)[0] + '.txt'
+        if os.path.exists(sidecar):
+            params.update(read_parameters(sidecar))
+        missing = [p for p in method.params if p not in params]
+        if missing:
+            raise ValueError('missing parameters: {}'.format(', '.join(missing)))
+        args = [params[p] for p in method.params]
+
+        if method.columns is None:
+            results, df = method.run(*args)
+        else:
+            if log_bins and method.columns[0] in ('Time', 't_dash'):
+                data = read_logger(path, bins_per_decade=log_bins)
+            else:
+                data = pd.read_csv(path)
+            results, df = method.run(*[data[col] for col in method.columns], *args)
+
+        df.to_csv(os.path.join(output_dir, name + '_results.csv'), index=False)
+        png = plots.render_png(method.plot, results, df, params)
+        with open(os.path.join(output_dir, name + '.png'), 'wb') as f:
+            f.write(png)
+        if report:
+            shown = {p: params[p] for p in method.params}
+            with open(os.path.join(output_dir, name + '_report.pdf'), 'wb') as f:
+                f.write(build_report(method.title, shown, results, df, png))
+        row.update(results)
+        row['status'] = 'ok'
+    except Exception as e:
+        row['status'] = 'error: {}'.format(e)
+    return row
+
+
+def run_batch(method_name, directory, output_dir, defaults=None, workers=None, report=True,
+              log_bins=None):
+    """Analyse every test in a directory and return the summary frame."""
+    method = METHODS[method_name]
+    os.makedirs(output_dir, exist_ok=True)
+    paths = find_tests(method, directory)
+    defaults = defaults or dict()
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(paths) > 1:
+        chunksize = max(1, len(paths) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(partial(analyse_test, method_name, defaults=defaults,
+                                         output_dir=output_dir, report=report,
+                                         log_bins=log_bins),
+                                 paths, chunksize=chunksize))
+    else:
+        rows = [analyse_test(method_name, path, defaults, output_dir, report, log_bins)
+                for path in paths]
+
+    summary = pd.DataFrame(rows)
+    if len(summary):
+        summary = summary[[col for col in summary.columns if col != 'status'] + ['status']]
+    summary.to_csv(os.path.join(output_dir, 'summary.csv'), index=False)
+    return summary
+
+
+def parse_parameter(text):
+    key, sep, value = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError('expected KEY=VALUE, got {!r}'.format(text))
+    return key.strip(), float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='aquaprobe', description='Analyse a directory of pumping tests.')
+    parser.add_argument('method', choices=sorted(METHODS))
+    parser.add_argument('directory', help='directory holding the test files')
+    parser.add_argument('-o', '--output', default='aquaprobe_results',
+                        help='directory for results and reports')
+    parser.add_argument('-p', '--param', action='append', type=parse_parameter, default=[],
+                        metavar='KEY=VALUE', help='default parameter for every test')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: all cores)')
+    parser.add_argument('--no-report', action='store_true', help='skip the PDF reports')
+    parser.add_argument('--log-bins', type=int, default=None, metavar='N',
+                        help='stream large logger files and reduce them to N time bins per decade')
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.method, args.directory, args.output, dict(args.param),
+                        args.workers, not args.no_report, args.log_bins)
+    failed = summary[summary['status'] != 'ok'] if len(summary) else summary
+    print(f'{len(summary) - len(failed)} of {len(summary)} tests analysed, '
+          f'results in {args.output}')
+    for row in failed.itertuples():
+        print(f'  {row.test}: {row.status}')
+    return 1 if len(failed) else 0
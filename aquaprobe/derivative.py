@@ -0,0 +1,52 @@
+"""Bourdet log-derivative of drawdown for flow-regime diagnosis.
+
+The derivative ds / d ln t of a reading is the weighted mean of the slopes
+to a reading before it and one after it, each the first at least window
+apart in ln t (Bourdet et al., 1989):
+
+    ds/dln t = (m_left dx_right + m_right dx_left) / (dx_left + dx_right)
+
+A flat derivative is radial flow (Theis, Cooper-Jacob), a falling one
+leakage or recharge, a doubling a barrier boundary and a unit slope with
+the drawdown wellbore storage. The neighbours of every reading are found
+at once with searchsorted on the sorted ln t, so long logger records need
+no Python loop. Near the ends of a record, where no reading lies a full
+window away on one side, the slope to the other side is used alone.
+"""
+import numpy as np
+
+WINDOW = 0.2
+
+
+def bourdet_derivative(t, s, window=WINDOW):
+    """ds / d ln t at every reading, in the order given (t > 0)."""
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+    order = np.argsort(t, kind='stable')
+    x = np.log(t[order])
+    y = s[order]
+    n = x.size
+    index = np.arange(n)
+    left = np.searchsorted(x, x - window, side='right') - 1
+    left = np.clip(np.minimum(left, index - 1), 0, None)
+    right = np.searchsorted(x, x + window, side='left')
+    right = np.clip(np.maximum(right, index + 1), None, n - 1)
+
+    dx_left = x - x[left]
+    dx_right = x[right] - x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m_left = (y - y[left]) / dx_left
+        m_right = (y[right] - y) / dx_right
+        derivative = (m_left * dx_right + m_right * dx_left) / (dx_left + dx_right)
+    # near an end only the side that reaches a full window is used, as a
+    # close neighbour would turn noise into a steep slope; the first and
+    # last readings (and repeated times) are one-sided
+    reached_left = dx_left >= window
+    reached_right = dx_right >= window
+    derivative = np.where(reached_left & ~reached_right, m_left, derivative)
+    derivative = np.where(reached_right & ~reached_left, m_right, derivative)
+    derivative = np.where(dx_left > 0, derivative, m_right)
+    derivative = np.where(dx_right > 0, derivative, m_left)
+    out = np.empty(n)
+    out[order] = derivative
+    return out
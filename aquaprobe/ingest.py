@@ -0,0 +1,60 @@
+"""Streaming ingestion of large logger files.
+
+A pressure transducer logging every second gives hundreds of thousands of
+rows per well, while the fits only need log-time resolution. read_logger
+reads the file in chunks and folds every chunk into a fixed set of
+log-spaced time bins, so memory stays bounded by the chunk size whatever
+the length of the file.
+"""
+import numpy as np
+import pandas as pd
+
+CHUNK_SIZE = 100_000
+BINS_PER_DECADE = 20
+# times outside 10^-6 .. 10^9 (in the file's unit) are folded into the end bins
+LOG_T_MIN = -6
+LOG_T_MAX = 9
+LARGE_FILE_BYTES = 2_000_000
+
+
+class LogTimeBinner:
+    """Running per-bin sums of time and drawdown over log-spaced time bins."""
+
+    def __init__(self, bins_per_decade=BINS_PER_DECADE):
+        self.bins_per_decade = bins_per_decade
+        self.n_bins = (LOG_T_MAX - LOG_T_MIN) * bins_per_decade
+        self.count = np.zeros(self.n_bins)
+        self.t_sum = np.zeros(self.n_bins)
+        self.s_sum = np.zeros(self.n_bins)
+        self.rows = 0
+
+    def add(self, t, s):
+        t = np.asarray(t, dtype=float)
+        s = np.asarray(s, dtype=float)
+        valid = (t > 0) & np.isfinite(t) & np.isfinite(s)
+        t, s = t[valid], s[valid]
+        index = np.floor((np.log10(t) - LOG_T_MIN) * self.bins_per_decade).astype(np.intp)
+        np.clip(index, 0, self.n_bins - 1, out=index)
+        self.count += np.bincount(index, minlength=self.n_bins)
+        self.t_sum += np.bincount(index, weights=t, minlength=self.n_bins)
+        self.s_sum += np.bincount(index, weights=s, minlength=self.n_bins)
+        self.rows += t.size
+
+    def result(self, columns=('Time', 'Drawdown')):
+        filled = self.count > 0
+        n = self.count[filled]
+        return pd.DataFrame({columns[0]: self.t_sum[filled] / n,
+                             columns[1]: self.s_sum[filled] / n})
+
+
+def read_logger(file, bins_per_decade=BINS_PER_DECADE, chunksize=CHUNK_SIZE):
+    """Read the first two columns (time, drawdown) of a CSV in chunks and
+    return them reduced to the mean of each log-spaced time bin, under the
+    file's own column names."""
+    binner = LogTimeBinner(bins_per_decade)
+    columns = None
+    for chunk in pd.read_csv(file, usecols=[0, 1], chunksize=chunksize):
+        if columns is None:
+            columns = tuple(chunk.columns)
+        binner.add(chunk.iloc[:, 0].to_numpy(), chunk.iloc[:, 1].to_numpy())
+    return binner.result(columns or ('Time', 'Drawdown'))
@@ -0,0 +1,77 @@
+"""Numerical inversion of Laplace-space drawdown solutions.
+
+The Gaver-Stehfest formula
+
+    f(t) ~ ln 2 / t * sum_k V_k F(k ln 2 / t),    k = 1 .. STEHFEST_N
+
+needs only real evaluations of the transform F, which suits the smooth,
+monotone drawdown curves of pumping tests. The weights and abscissae are
+computed once per process. A transform is a function of an array of
+Laplace points, so every point of every time is evaluated in one call.
+Long records are inverted on a log grid of GRID_PER_DECADE times per
+decade and splined in (ln t, ln f), so the cost does not grow with the
+number of readings. Stehfest cancels weights of up to about 1e6, so
+values below RESOLVED times the largest on the grid (the first moments of
+a record, where the drawdown has hardly started) are noise; they are
+raised to that level before the spline is fitted, which keeps a long flat
+start from bending the spline far above the data next to it.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+STEHFEST_N = 12
+GRID_PER_DECADE = 16
+RESOLVED = 1e-10
+
+
+@lru_cache(maxsize=None)
+def stehfest_weights(n=STEHFEST_N):
+    """Gaver-Stehfest weights V_1 .. V_n (n even)."""
+    half = n // 2
+    weights = np.zeros(n)
+    for k in range(1, n + 1):
+        total = 0.0
+        for j in range((k + 1) // 2, min(k, half) + 1):
+            total += (j ** half * math.factorial(2 * j)
+                      / (math.factorial(half - j) * math.factorial(j) * math.factorial(j - 1)
+                         * math.factorial(k - j) * math.factorial(2 * j - k)))
+        weights[k - 1] = (-1) ** (k + half) * total
+    return weights
+
+
+@lru_cache(maxsize=None)
+def stehfest_abscissae(n=STEHFEST_N):
+    """k ln 2 for k = 1 .. n; divided by t they are the Laplace points."""
+    return np.arange(1, n + 1) * math.log(2)
+
+
+def stehfest(transform, t):
+    """f at the flat times t from its transform F(p)."""
+    p = stehfest_abscissae()[None, :] / t[:, None]
+    return math.log(2) / t * (transform(p) @ stehfest_weights())
+
+
+def grid_size(t):
+    low, high = np.log10(np.min(t)), np.log10(np.max(t))
+    return int(np.ceil((high - low) * GRID_PER_DECADE)) + 2
+
+
+def laplace_curve(transform, t):
+    """Cubic spline of ln f against ln t, inverted on the log grid over the
+    range of t; its derivative is d ln f / d ln t."""
+    grid = np.geomspace(np.min(t), np.max(t), grid_size(t))
+    f = stehfest(transform, grid)
+    floor = max(RESOLVED * np.max(f), 1e-300)
+    return CubicSpline(np.log(grid), np.log(np.maximum(f, floor)))
+
+
+def invert(transform, t):
+    """f at times t of any shape, through laplace_curve for long records."""
+    t = np.asarray(t, dtype=float)
+    flat = t.ravel()
+    if flat.size <= grid_size(flat):
+        return stehfest(transform, flat).reshape(t.shape)
+    return np.exp(laplace_curve(transform, flat)(np.log(flat))).reshape(t.shape)
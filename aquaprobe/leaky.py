@@ -0,0 +1,225 @@
+"""Hantush-Jacob leaky well function W(u, r/B) and the leaky type-curve fit.
+
+    W(u, b) = integral from u to infinity of exp(-y - b^2 / (4 y)) / y dy
+
+is tabulated once per process as ln W on a grid in (ln u, ln b) and
+evaluated with a bicubic spline. The table is built without any per-point
+quadrature: with y = e^x the integral runs over x, so one cumulative
+Simpson sum from the top of a fine x grid gives W at every u of the table
+for all b at once. Points outside the table are handled the same way:
+for each distinct b among them one cumulative sum over a grid spanning
+their u gives W there, interpolated by a cubic spline in ln u, so a fit
+that wanders out of the table costs a few thousand exponentials per
+evaluation rather than a quadrature per reading.
+
+The fit works in (ln S, ln T, ln r/B) like the Theis fit. Since
+dW/du = -exp(-u - b^2/(4u)) / u, the S and T columns of the Jacobian are
+exact; the r/B column comes from the spline's derivative in ln b. Data
+without leakage drive r/B towards 0, so ln r/B is held at R_BY_B_MIN,
+where W(u, r/B) is the Theis E1(u) at any practical u, and a fit that
+ends there is reported as r/B = 0.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+from scipy.integrate import quad
+from scipy.interpolate import CubicSpline, RectBivariateSpline
+
+from aquaprobe.theis import cooper_jacob_seed, levenberg_marquardt
+from aquaprobe.well_function import CHUNK_SIZE, calculate_u
+
+U_MIN = 1e-6
+U_MAX = 50.0
+B_MIN = 1e-3
+B_MAX = 5.0
+POINTS_PER_DECADE = 32
+REFINE = 16
+# the integrand is below e^-40 of its value at U_MAX beyond U_MAX + 40
+TAIL = 40.0
+SEED_RATIOS = np.geomspace(B_MIN, B_MAX, 16)
+# below this r/B the leakage only shows at u < 1e-16
+R_BY_B_MIN = 1e-8
+# W(u, b) <= 2 K0(b) underflows beyond this b
+B_UNDERFLOW = 1400.0
+SEED_STARTS = 3
+
+HantushFit = namedtuple('HantushFit', 'S T r_by_B rms_residual iterations converged')
+
+
+def leaky_integrand(y, b):
+    return np.exp(-y - b * b / (4 * y)) / y
+
+
+def leaky_quad(u, b):
+    """W(u, b) by adaptive quadrature, for single values of u and b."""
+    if b == 0:
+        return quad(lambda y: np.exp(-y) / y, u, np.inf, limit=200)[0]
+    return quad(leaky_integrand, u, np.inf, args=(b,), limit=200)[0]
+
+
+class LeakyWellFunctionTable:
+
+    def __init__(self, u_min=U_MIN, u_max=U_MAX, b_min=B_MIN, b_max=B_MAX,
+                 points_per_decade=POINTS_PER_DECADE):
+        self.u_min, self.u_max = u_min, u_max
+        self.b_min, self.b_max = b_min, b_max
+        n_u = int(np.ceil(np.log10(u_max / u_min) * points_per_decade)) + 1
+        n_b = int(np.ceil(np.log10(b_max / b_min) * points_per_decade)) + 1
+        self.x = np.linspace(np.log(u_min), np.log(u_max), n_u)
+        self.z = np.linspace(np.log(b_min), np.log(b_max), n_b)
+        w = self._integrate(self.x, np.exp(self.z))
+        self.spline = RectBivariateSpline(self.x, self.z, np.log(w))
+        self.max_rel_error = self._measure_error()
+
+    @staticmethod
+    def _integrate(x, b, power=0):
+        """W at u = e^x for every b, by composite Simpson sums over a grid
+        REFINE times finer than x that runs on up to TAIL past the last u
+        (or past b, beyond the peak of the integrand at b / 2). With power
+        set the integrand carries an extra factor y^-power."""
+        h = (x[1] - x[0]) / REFINE
+        top = max(np.exp(x[-1]), np.max(b)) + TAIL
+        n_tail = int(np.ceil((np.log(top) - x[-1]) / h))
+        n_tail += n_tail % 2
+        fine = x[0] + h * np.arange((len(x) - 1) * REFINE + n_tail + 1)
+        y = np.exp(fine)[:, None]
+        # in x the integrand is exp(-y - b^2 / (4 y))
+        f = np.exp(-y - b[None, :] ** 2 / (4 * y) - power * fine[:, None])
+        # Simpson's rule on each pair of intervals, summed from the top
+        pairs = h / 3 * (f[:-2:2] + 4 * f[1:-1:2] + f[2::2])
+        tail_sums = np.cumsum(pairs[::-1], axis=0)[::-1]
+        tail_sums = np.vstack([tail_sums, np.zeros((1, len(b)))])
+        return tail_sums[:(len(x) - 1) * REFINE // 2 + 1:REFINE // 2]
+
+    def _measure_error(self):
+        mid_x = 0.5 * (self.x[1:] + self.x[:-1])[::8]
+        mid_z = 0.5 * (self.z[1:] + self.z[:-1])[::8]
+        approx = np.exp(self.spline(mid_x, mid_z))
+        exact = np.array([[leaky_quad(u, b) for b in np.exp(mid_z)] for u in np.exp(mid_x)])
+        return float(np.max(np.abs(approx - exact) / exact))
+
+    def inside(self, u, b):
+        return (u >= self.u_min) & (u <= self.u_max) & (b >= self.b_min) & (b <= self.b_max)
+
+    def __call__(self, u, b, d_ln_b=False):
+        """W(u, b), or d ln W / d ln b if d_ln_b is set, broadcast over u and b."""
+        u, b = np.broadcast_arrays(np.asarray(u, dtype=float), np.asarray(b, dtype=float))
+        flat_u, flat_b = u.ravel(), b.ravel()
+        out = np.empty(flat_u.size)
+        for start in range(0, flat_u.size, CHUNK_SIZE):
+            cu = flat_u[start:start + CHUNK_SIZE]
+            cb = flat_b[start:start + CHUNK_SIZE]
+            res = out[start:start + CHUNK_SIZE]
+            inside = self.inside(cu, cb)
+            x, z = np.log(cu[inside]), np.log(cb[inside])
+            if d_ln_b:
+                res[inside] = self.spline.ev(x, z, dy=1)
+            else:
+                res[inside] = np.exp(self.spline.ev(x, z))
+            outside = ~inside
+            if outside.any():
+                res[outside] = self._outside(cu[outside], cb[outside], d_ln_b)
+        return out.reshape(u.shape)
+
+    def _outside(self, u, b, d_ln_b):
+        out = np.empty(u.size)
+        for value in np.unique(b):
+            at = b == value
+            if value > B_UNDERFLOW:
+                # W is 0 there and d ln W / d ln b is -b as u -> 0
+                out[at] = -value if d_ln_b else 0.0
+            else:
+                out[at] = self._curve(u[at], value, d_ln_b)
+        return out
+
+    def _curve(self, u, b, d_ln_b):
+        """W(u, b), or d ln W / d ln b, for an array of u and a single b,
+        from one cumulative sum over a grid (with the table's spacing in
+        ln u) spanning the u."""
+        step = self.x[1] - self.x[0]
+        x_low, x_high = np.log(u.min()), np.log(u.max())
+        x = x_low + step * np.arange(int(np.ceil((x_high - x_low) / step)) + 4)
+        b_array = np.array([b])
+        # W underflows for u beyond about 700, where it is 0 for any purpose
+        w = np.maximum(self._integrate(x, b_array)[:, 0], 1e-300)
+        if not d_ln_b:
+            return np.exp(CubicSpline(x, np.log(w))(np.log(u)))
+        # d W / d b = -(b / 2) integral of exp(-y - b^2/(4y)) / y^2
+        ratio = -0.5 * b * b * self._integrate(x, b_array, power=1)[:, 0] / w
+        return CubicSpline(x, ratio)(np.log(u))
+
+
+@lru_cache(maxsize=None)
+def get_leaky_table():
+    return LeakyWellFunctionTable()
+
+
+def leaky_well_function(u, r_by_B):
+    """Hantush-Jacob well function W(u, r/B) for arrays of any shape."""
+    return get_leaky_table()(u, r_by_B)
+
+
+def hantush_drawdown(t, S, T, Q, r, r_by_B):
+    """Leaky drawdown, broadcast over t and the parameters (t in days)."""
+    u = calculate_u(np.asarray(r, dtype=float), S, T, np.asarray(t, dtype=float))
+    return Q / (4 * np.pi * T) * leaky_well_function(u, r_by_B)
+
+
+def _residuals_and_jacobian(p, t, s, Q, r):
+    if p[2] > np.log(B_UNDERFLOW):
+        # no drawdown left at all, reject the step
+        return np.full(t.size, np.inf), np.zeros((3, t.size))
+    S, T = np.exp(p[:2])
+    held = p[2] <= np.log(R_BY_B_MIN)
+    r_by_B = R_BY_B_MIN if held else np.exp(p[2])
+    table = get_leaky_table()
+    u = calculate_u(r, S, T, t)
+    scale = Q / (4 * np.pi * T)
+    model = scale * table(u, r_by_B)
+    e_u = scale * np.exp(-u - r_by_B * r_by_B / (4 * u))
+    jac = np.empty((3, t.size))
+    jac[0] = -e_u
+    jac[1] = e_u - model
+    jac[2] = 0.0 if held else model * table(u, r_by_B, d_ln_b=True)
+    return model - s, jac
+
+
+def hantush_seeds(t, s, Q, r):
+    """Starting (S, T, r/B) guesses, best first: Cooper-Jacob on the early
+    half (in log time) of the record, before leakage shows, with the
+    SEED_STARTS best of SEED_RATIOS for that S and T."""
+    early = np.log(t) <= 0.5 * (np.log(t.min()) + np.log(t.max()))
+    if np.count_nonzero(early) >= 3:
+        S, T = cooper_jacob_seed(t[early], s[early], Q, r)
+    else:
+        S, T = cooper_jacob_seed(t, s, Q, r)
+    model = hantush_drawdown(t[:, None], S, T, Q, r, SEED_RATIOS[None, :])
+    costs = np.sum((model - s[:, None]) ** 2, axis=0)
+    return [(S, T, SEED_RATIOS[i]) for i in np.argsort(costs)[:SEED_STARTS]]
+
+
+def fit_hantush(t, s, Q, r, S0=None, T0=None, r_by_B0=None):
+    """Fit S, T and r/B of the Hantush-Jacob solution to time-drawdown data
+    (t in days), from each of hantush_seeds unless a start is given."""
+    t = np.asarray(t, dtype=float).ravel()
+    s = np.asarray(s, dtype=float).ravel()
+    if S0 is None or T0 is None or r_by_B0 is None:
+        seeds = hantush_seeds(t, s, Q, r)
+    else:
+        seeds = [(S0, T0, r_by_B0)]
+
+    best = None
+    for seed in seeds:
+        fit = levenberg_marquardt(lambda p: _residuals_and_jacobian(p, t, s, Q, r),
+                                  np.log(seed))
+        if best is None or fit[1] < best[1]:
+            best = fit
+    p, cost, iterations, converged = best
+    S, T, r_by_B = np.exp(p)
+    if r_by_B <= R_BY_B_MIN:
+        # no measurable leakage
+        r_by_B = 0.0
+    rms_residual = np.sqrt(cost / t.size)
+    return HantushFit(float(S), float(T), float(r_by_B), float(rms_residual),
+                      iterations, converged)
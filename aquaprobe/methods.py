@@ -0,0 +1,370 @@
+"""The pumping test analysis methods, free of any Streamlit code.
+
+Each method takes plain arrays and numbers in the same units as the pages
+(time in mins unless stated otherwise) and returns a dict of results plus
+a DataFrame with the per-reading (or per-radius) table.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+from scipy.stats import t as student_t
+
+from aquaprobe.bootstrap import CONFIDENCE, line_intervals, theis_intervals
+from aquaprobe.boundaries import boundary_drawdown, fit_boundary
+from aquaprobe.leaky import fit_hantush, hantush_drawdown
+from aquaprobe.neuman import fit_neuman, neuman_drawdown
+from aquaprobe.superposition import (Schedule, fit_schedule, make_schedule,
+                                     schedule_drawdown, superposition_time)
+from aquaprobe.theis import fit_theis
+from aquaprobe.well_function import calculate_u, theis_drawdown
+from aquaprobe.wellbore import fit_wellbore, wellbore_drawdown
+
+U_CRITERION = 0.05
+MAX_REFITS = 20
+
+
+def mse(actual, predicted):
+    differences = np.subtract(actual, predicted)
+    return np.square(differences).mean()
+
+
+def cooper_jacob_drawdown(Q, T, t, S, r):
+    return ((2.303*Q)/(4*math.pi*T))*np.log10((2.25*T*t)/(S*r*r))
+
+
+def schedule_in_days(schedule):
+    return Schedule(schedule.starts/1440, schedule.rates)
+
+
+def theis(t, s, Q, r, schedule=None, resampling=None, confidence=CONFIDENCE):
+    """Theis fit at a constant rate Q, or under a pumping schedule (step
+    start times in mins and rates) if one is given. resampling ('bootstrap'
+    or 'jackknife') adds confidence intervals of T and S."""
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+    df = pd.DataFrame({'Time': t, 'Drawdown': s})
+    if schedule is None:
+        fit = fit_theis(t/1440, s, Q, r)
+        df['Calculated_Drawdown'] = theis_drawdown(t/1440, fit.S, fit.T, Q, r)
+    else:
+        days = schedule_in_days(schedule)
+        fit = fit_schedule(t/1440, s, days, r)
+        df['Calculated_Drawdown'] = schedule_drawdown(t/1440, days, fit.S, fit.T, r)
+    results = {'T': fit.T, 'S': fit.S, 'rms_residual': fit.rms_residual}
+    if resampling is not None:
+        results.update(theis_intervals(t/1440, s, Q, r, fit.S, fit.T,
+                                       None if schedule is None else days,
+                                       resampling, confidence))
+    return results, df
+
+
+def hantush_jacob(t, s, Q, r):
+    """Leaky-aquifer fit of S, T and r/B. B is the leakage factor and
+    T / B^2 the leakance K'/b' of the aquitard (1/day); with no measurable
+    leakage r/B is 0, B infinite and the leakance 0."""
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+    fit = fit_hantush(t/1440, s, Q, r)
+    df = pd.DataFrame({'Time': t, 'Drawdown': s})
+    df['Calculated_Drawdown'] = hantush_drawdown(t/1440, fit.S, fit.T, Q, r, fit.r_by_B)
+    B = r/fit.r_by_B if fit.r_by_B > 0 else math.inf
+    results = {'T': fit.T, 'S': fit.S, 'r_by_B': fit.r_by_B, 'B': B, 'leakance': fit.T/B**2,
+               'rms_residual': fit.rms_residual, 'converged': fit.converged}
+    return results, df
+
+
+def neuman(t, s, Q, r, b=0):
+    """Delayed-yield fit of S, T, Sy and beta = (Kz/Kr) r^2 / b^2; with the
+    saturated thickness b the anisotropy Kz/Kr is reported as well."""
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+    fit = fit_neuman(t/1440, s, Q, r)
+    df = pd.DataFrame({'Time': t, 'Drawdown': s})
+    df['Calculated_Drawdown'] = neuman_drawdown(t/1440, fit.S, fit.T, fit.Sy, fit.beta, Q, r)
+    results = {'T': fit.T, 'S': fit.S, 'Sy': fit.Sy, 'beta': fit.beta,
+               'rms_residual': fit.rms_residual, 'converged': fit.converged}
+    if b > 0:
+        results['K'] = fit.T/b
+        results['anisotropy'] = fit.beta*b*b/(r*r)
+    return results, df
+
+
+def papadopulos_cooper(t, s, Q, r_w, r_c=None, S=None):
+    """Fit to drawdown in the pumped well itself, with wellbore storage from
+    a casing of radius r_c (r_w if not given): S and T, or T and the skin
+    factor if the storativity S is known."""
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+    fit = fit_wellbore(t/1440, s, Q, r_w, r_c, S)
+    df = pd.DataFrame({'Time': t, 'Drawdown': s})
+    df['Calculated_Drawdown'] = wellbore_drawdown(t/1440, fit.S, fit.T, Q, r_w, r_c, fit.skin)
+    results = {'T': fit.T, 'S': fit.S, 'skin': fit.skin, 'C_D': fit.C_D,
+               'rms_residual': fit.rms_residual, 'converged': fit.converged}
+    return results, df
+
+
+def line_fit(x, y):
+    """Least-squares slope and intercept of y against x."""
+    x_mean = x.mean()
+    y_mean = y.mean()
+    dx = x - x_mean
+    slope = np.dot(dx, y - y_mean) / np.dot(dx, dx)
+    return slope, y_mean - slope*x_mean
+
+
+def fit_valid_line(x, s, solve, fit_mask=None):
+    """Fit s against ln x on the readings where the Cooper-Jacob approximation
+    holds.
+
+    solve(slope, y_intercept) returns (T, S, u) for a fitted line. The line
+    is refitted on the readings with u <= U_CRITERION until that set stops
+    changing (at most MAX_REFITS times). fit_mask, if given, limits the fit
+    to a segment of the readings (see segments.best_line_window). If fewer
+    than two readings would be left, the last fit is kept. Returns slope,
+    y_intercept, T, S, u and the mask of readings the line was fitted to.
+    """
+    log_x = np.log(x)
+    if fit_mask is None:
+        candidates = np.ones(len(x), dtype=bool)
+    else:
+        candidates = np.asarray(fit_mask, dtype=bool)
+    used = candidates
+    for _ in range(MAX_REFITS):
+        slope, y_intercept = line_fit(log_x[used], s[used])
+        T, S, u = solve(slope, y_intercept)
+        valid = (u <= U_CRITERION) & candidates
+        if np.count_nonzero(valid) < 2 or np.array_equal(valid, used):
+            break
+        used = valid
+    return slope, y_intercept, T, S, u, used
+
+
+def cooper_jacob_parameters(slope, y_intercept, Q, r):
+    """T and S of a line of drawdown against ln t (t in mins), also for
+    arrays of lines."""
+    delta_s = np.abs(slope*math.log(10))
+    t_0 = np.exp((-y_intercept)/slope)
+    T = (2.303*Q)/(4*math.pi*delta_s)
+    S = (2.25*T*(t_0/1440)) / (r*r)
+    return T, S
+
+
+def cooper_jacob_time(t, s, Q, r, fit_mask=None, resampling=None, confidence=CONFIDENCE):
+    """Straight-line fit of drawdown against ln t; early readings with
+    u > U_CRITERION, and readings outside fit_mask, are left out of the fit
+    (the Used column marks the readings the line is fitted to).
+    resampling ('bootstrap' or 'jackknife') adds confidence intervals of T
+    and S from those readings."""
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+
+    def solve(slope, y_intercept):
+        T, S = cooper_jacob_parameters(slope, y_intercept, Q, r)
+        return T, S, calculate_u(r, S, T, t/1440)
+
+    slope, y_intercept, T, S, u, used = fit_valid_line(t, s, solve, fit_mask)
+
+    df = pd.DataFrame({'Time': t, 'Drawdown': s})
+    df['Calculated_Drawdown'] = cooper_jacob_drawdown(Q, T, t/1440, S, r)
+    df['u'] = u
+    df['Error'] = (s - df['Calculated_Drawdown'])/s
+    df['Used'] = used
+
+    results = {
+        'T': T, 'S': S, 'mse_error': mse(s[used], df['Calculated_Drawdown'][used]),
+        'slope': slope, 'y_intercept': y_intercept,
+        't_for_u': (r*r * S)/(4*T*U_CRITERION)*1440,
+        'n_used': int(np.count_nonzero(used)),
+    }
+    if resampling is not None:
+        results.update(line_intervals(
+            np.log(t[used]), s[used], lambda m, c: cooper_jacob_parameters(m, c, Q, r),
+            ('T', 'S'), resampling, confidence))
+    return results, df
+
+
+def cooper_jacob_distance(distance, s, Q, t):
+    """Straight-line fit of drawdown against ln r; distant readings with
+    u > U_CRITERION are left out of the fit (the Used column marks the
+    readings the line is fitted to)."""
+    distance = np.asarray(distance, dtype=float)
+    s = np.asarray(s, dtype=float)
+    t = t/1440
+
+    def solve(slope, y_intercept):
+        delta_s = abs(slope*math.log(10))
+        r_0 = np.exp((-y_intercept)/slope)
+        T = (2.303*Q)/(2*math.pi*delta_s)
+        S = (2.25*T*t) / (r_0*r_0)
+        return T, S, calculate_u(distance, S, T, t)
+
+    slope, y_intercept, T, S, u, used = fit_valid_line(distance, s, solve)
+    r_0 = np.exp((-y_intercept)/slope)
+
+    df = pd.DataFrame({'Distance': distance, 'Drawdown': s})
+    df['Calculated_Drawdown'] = cooper_jacob_drawdown(Q, T, t, S, distance)
+    df['u'] = u
+    df['Error'] = (s - df['Calculated_Drawdown'])/s
+    df['Used'] = used
+
+    results = {
+        'T': T, 'S': S, 'mse_error': mse(s[used], df['Calculated_Drawdown'][used]),
+        'slope': slope, 'y_intercept': y_intercept,
+        't_for_u': (r_0*r_0 * S)/(4*T*U_CRITERION)*1440,
+        'n_used': int(np.count_nonzero(used)),
+    }
+    return results, df
+
+
+def thiem(T, r1, h1, r2, h2):
+    """Steady pumping rate from heads h1, h2 at radii r1, r2."""
+    Q = 2*math.pi*T*(h2 - h1)/math.log(r2/r1)
+    df = pd.DataFrame({'r': [r1, r2], 'h': [h1, h2]})
+    return {'Q': Q}, df
+
+
+def thiem_estimate(r, h, Q, weights=None, confidence=0.95):
+    """Transmissivity from steady heads in many piezometers.
+
+    Thiem's h = h_w + Q/(2 pi T) ln(r/r_w) is a straight line in ln r, fitted
+    by weighted least squares (weights are relative, e.g. 1/variance of each
+    head). The confidence interval of T follows from the t-distributed slope.
+    Raises ValueError unless every weight is finite and positive.
+    """
+    r = np.asarray(r, dtype=float)
+    h = np.asarray(h, dtype=float)
+    w = np.ones(r.size) if weights is None else np.asarray(weights, dtype=float)
+    if not (np.isfinite(w) & (w > 0)).all():
+        raise ValueError('weights must be finite and positive')
+    x = np.log(r)
+    sw = w.sum()
+    x_mean = (w @ x)/sw
+    h_mean = (w @ h)/sw
+    dx = x - x_mean
+    sxx = w @ (dx*dx)
+    slope = (w @ (dx*(h - h_mean)))/sxx
+    y_intercept = h_mean - slope*x_mean
+
+    df = pd.DataFrame({'r': r, 'h': h})
+    df['Calculated_Head'] = y_intercept + slope*x
+    df['Residual'] = h - df['Calculated_Head']
+
+    dof = r.size - 2
+    if dof > 0:
+        variance = (w @ np.square(df['Residual'].to_numpy()))/dof
+        slope_error = math.sqrt(variance/sxx)
+        half_width = student_t.ppf(0.5 + confidence/2, dof)*slope_error
+        T_low = Q/(2*math.pi*(slope + half_width))
+        # a slope interval reaching zero leaves T unbounded above
+        T_high = Q/(2*math.pi*(slope - half_width)) if slope > half_width else math.inf
+    else:
+        slope_error = T_low = T_high = math.nan
+    results = {
+        'T': Q/(2*math.pi*slope), 'T_low': T_low, 'T_high': T_high,
+        'slope': slope, 'slope_error': slope_error, 'y_intercept': y_intercept,
+        'rms_residual': math.sqrt(np.mean(np.square(df['Residual']))),
+    }
+    return results, df
+
+
+def radius_of_influence(R, Q):
+    return math.sqrt((Q/R)/math.pi)
+
+
+def dupuit_head(r, Q, K, h0, r0):
+    r = np.asarray(r, dtype=float)
+    with np.errstate(divide='ignore'):
+        h_sq = (h0**2)-(Q*(np.log(r0/r)))/(K*math.pi)
+    return np.where((r >= r0) | (r == 0), h0, np.sqrt(np.maximum(h_sq, 0)))
+
+
+def dupuit_forchheimer(R, Q, K, h0, r1, r_start=0.01, r_end=None, n_points=20):
+    r0 = radius_of_influence(R, Q)
+    if r_end is None:
+        r_end = r0+(0.2*r0)
+    h1 = float(dupuit_head(r1, Q, K, h0, r0))
+
+    step = (r_end-r_start)/n_points
+    df = pd.DataFrame({'r': np.arange(r_start, r_end, step)})
+    df['h'] = dupuit_head(df['r'], Q, K, h0, r0)
+    df['s'] = h0-df['h']
+
+    results = {'r0': r0, 'h': h1, 'drawdown': h0-h1}
+    return results, df
+
+
+def recovery_time_ratio(t_dash, t_when_pumping_stopped, schedule=None):
+    """t/t' of recovery readings, or its superposition equivalent when the
+    pumping before the stop followed a schedule (start times in mins)."""
+    t_dash = np.asarray(t_dash, dtype=float)
+    t = t_dash + t_when_pumping_stopped
+    if schedule is None:
+        return t/t_dash
+    pumping = make_schedule(np.append(schedule.starts, t_when_pumping_stopped),
+                            np.append(schedule.rates, 0.0))
+    return np.exp(superposition_time(t, pumping, schedule.rates[-1]))
+
+
+def recovery_parameters(slope, y_intercept, Q):
+    """T and S/S' of a line of residual drawdown against ln(t/t'), also for
+    arrays of lines."""
+    delta_s_dash = np.abs(slope*math.log(10))
+    T = (2.303*Q)/(4*math.pi*delta_s_dash)
+    return T, np.exp((-y_intercept)/slope)
+
+
+def theis_recovery(t_dash, residual_drawdown, Q, t_when_pumping_stopped, fit_mask=None,
+                   schedule=None, resampling=None, confidence=CONFIDENCE):
+    """Straight-line fit of residual drawdown against ln(t/t'), on the
+    readings in fit_mask if it is given.
+
+    schedule gives the pumping steps before the stop (start times in mins
+    and rates) when the rate was not constant. t/t' is then the equivalent
+    ratio exp(superposition_time) and Q is the rate of the last step.
+    resampling ('bootstrap' or 'jackknife') adds confidence intervals of T
+    and S/S'.
+    """
+    t_dash = np.asarray(t_dash, dtype=float)
+    residual_drawdown = np.asarray(residual_drawdown, dtype=float)
+    df = pd.DataFrame({'t': t_dash+t_when_pumping_stopped, 't_dash': t_dash})
+    df['t_by_t_dash'] = recovery_time_ratio(t_dash, t_when_pumping_stopped, schedule)
+    if schedule is not None:
+        Q = schedule.rates[-1]
+    df['Residual_Drawdown'] = residual_drawdown
+
+    used = slice(None) if fit_mask is None else np.asarray(fit_mask, dtype=bool)
+    log_ratio = np.log(df['t_by_t_dash'].to_numpy())[used]
+    slope, y_intercept = line_fit(log_ratio, residual_drawdown[used])
+    T, ratio_of_S = recovery_parameters(slope, y_intercept, Q)
+
+    results = {'T': T, 'ratio_of_S': ratio_of_S,
+               'slope': slope, 'y_intercept': y_intercept}
+    if resampling is not None:
+        results.update(line_intervals(
+            log_ratio, residual_drawdown[used], lambda m, c: recovery_parameters(m, c, Q),
+            ('T', 'ratio_of_S'), resampling, confidence))
+    return results, df
+
+
+def observation_point(r, angle):
+    """(x, y) of an observation well at r from the pumping well, angle
+    degrees anticlockwise from the direction to the (first) boundary."""
+    return r*math.cos(math.radians(angle)), r*math.sin(math.radians(angle))
+
+
+def image_well_theis(t, s, Q, r, angle, layout):
+    """Theis fit near the boundaries of layout (see aquaprobe.boundaries),
+    fitting S, T and the distance from the pumping well to the boundary.
+    The table also holds the unbounded Theis drawdown for the same S and T."""
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+    x, y = observation_point(r, angle)
+    fit = fit_boundary(t/1440, s, Q, x, y, layout)
+    df = pd.DataFrame({'Time': t, 'Drawdown': s})
+    df['Calculated_Drawdown'] = boundary_drawdown(t/1440, fit.S, fit.T, Q, x, y,
+                                                  layout, fit.distance)
+    df['Unbounded_Drawdown'] = theis_drawdown(t/1440, fit.S, fit.T, Q, r)
+    results = {'T': fit.T, 'S': fit.S, 'distance': fit.distance,
+               'rms_residual': fit.rms_residual, 'converged': fit.converged}
+    return results, df
@@ -0,0 +1,98 @@
+"""The Theis misfit over a log-spaced grid of S and T.
+
+The drawdown depends on S and T only through S / T and the factor 1 / T:
+
+    s(t; S, T) = G(t; S / T) / T,   G(t; R) = sum_k dQ_k / (4 pi) W(r^2 R / (4 (t - t_k)))
+
+summed over the rate changes of the pumping (one for a constant rate). With
+the same log step for S and T, the n_S x n_T grid holds only n_S + n_T - 1
+ratios S / T, so G is evaluated once for each of them, for every reading,
+in one broadcast call to the well-function kernel (in blocks of at most
+CHUNK_SIZE elements). The sum of squares at every grid point then follows
+from three sums over the readings:
+
+    sum (G / T - s)^2 = sum G^2 / T^2 - 2 sum G s / T + sum s^2
+
+The joint confidence regions of (S, T) are the regions where the sum of
+squares stays below cost_min (1 + p / (n - p) F(p, n - p)) with p = 2.
+"""
+from collections import namedtuple
+
+import numpy as np
+from scipy.stats import f as fisher_f
+
+from aquaprobe.superposition import make_schedule, rate_changes
+from aquaprobe.well_function import CHUNK_SIZE, calculate_u, well_function
+
+GRID_SIZE = 500
+DECADES = 2.0
+CONFIDENCE_LEVELS = (0.68, 0.95)
+
+MisfitSurface = namedtuple('MisfitSurface', 'S T rms best_S best_T levels thresholds')
+
+
+def ratio_drawdown(t, ratios, schedule, r):
+    """G(t; R) for every ratio R = S / T (rows) and time t (columns)."""
+    elapsed = t[:, None] - schedule.starts[None, :]
+    active = elapsed > 0
+    scaled = rate_changes(schedule) / (4 * np.pi)
+    g = np.empty((ratios.size, t.size))
+    block = max(1, CHUNK_SIZE // elapsed.size)
+    for start in range(0, ratios.size, block):
+        u = calculate_u(r, ratios[start:start + block, None, None], 1.0, elapsed[None, :, :])
+        w = np.where(active, well_function(np.where(active, u, 1.0)), 0.0)
+        g[start:start + block] = w @ scaled
+    return g
+
+
+def misfit_surface(t, s, Q, r, S, T, schedule=None, grid_size=GRID_SIZE, decades=DECADES,
+                   levels=CONFIDENCE_LEVELS):
+    """RMS misfit of the Theis solution (t in days) on a grid_size x
+    grid_size grid spanning decades either side of the fitted S and T, at
+    the constant rate Q or under a pumping schedule (starts in days)."""
+    t = np.asarray(t, dtype=float).ravel()
+    s = np.asarray(s, dtype=float).ravel()
+    if schedule is None:
+        schedule = make_schedule([0.0], [Q])
+    steps = np.linspace(-decades, decades, grid_size) * np.log(10)
+    S_grid = S * np.exp(steps)
+    T_grid = T * np.exp(steps)
+    # ln(S_i / T_j) = ln(S / T) + steps[i] - steps[j] only depends on i - j
+    h = steps[1] - steps[0]
+    offsets = np.arange(-(grid_size - 1), grid_size)
+    g = ratio_drawdown(t, S / T * np.exp(h * offsets), schedule, r)
+    gg = np.einsum('ij,ij->i', g, g)
+    gs = g @ s
+    index = np.arange(grid_size)[:, None] - np.arange(grid_size)[None, :] + grid_size - 1
+    inverse_T = 1 / T_grid[None, :]
+    cost = gg[index] * inverse_T * inverse_T - 2 * gs[index] * inverse_T + s @ s
+    cost = np.maximum(cost, 0.0)
+
+    best = np.unravel_index(np.argmin(cost), cost.shape)
+    n, p = t.size, 2
+    if n > p:
+        thresholds = [float(cost[best] * (1 + p / (n - p) * fisher_f.ppf(level, p, n - p)))
+                      for level in levels]
+    else:
+        thresholds = [np.nan for level in levels]
+    rms = np.sqrt(cost / n)
+    return MisfitSurface(S_grid, T_grid, rms, float(S_grid[best[0]]), float(T_grid[best[1]]),
+                         tuple(levels), [float(np.sqrt(c / n)) for c in thresholds])
+
+
+def confidence_extent(surface, level=0.95):
+    """(low, high) of S and of T over the confidence region of level, and
+    whether the region stays inside the grid in S and in T."""
+    threshold = surface.thresholds[surface.levels.index(level)]
+    inside = surface.rms <= threshold
+    if not inside.any():
+        # too few readings for a confidence region
+        return ((float(surface.S[0]), float(surface.S[-1])),
+                (float(surface.T[0]), float(surface.T[-1])), False, False)
+    rows = np.flatnonzero(inside.any(axis=1))
+    cols = np.flatnonzero(inside.any(axis=0))
+    S_range = (float(surface.S[rows[0]]), float(surface.S[rows[-1]]))
+    T_range = (float(surface.T[cols[0]]), float(surface.T[cols[-1]]))
+    S_bounded = bool(rows[0] > 0 and rows[-1] < len(surface.S) - 1)
+    T_bounded = bool(cols[0] > 0 and cols[-1] < len(surface.T) - 1)
+    return S_range, T_range, S_bounded, T_bounded
@@ -0,0 +1,164 @@
+"""Neuman (1974) delayed-yield drawdown in an unconfined aquifer.
+
+For a fully penetrating pumping well and an observation well screened over
+the whole saturated thickness b, the dimensionless drawdown
+s_D = 4 pi T s / Q has the Laplace transform (in t_s = T t / (S r^2))
+
+    s_D(p) = (2 / p) sum_n 2 sin^2 e_n / (e_n (e_n + sin e_n cos e_n))
+                       K0(sqrt(p + beta e_n^2))
+
+where e_n tan e_n = p / (sigma beta) has one root e_n in (n pi, n pi + pi/2),
+sigma = S / Sy and beta = (Kz / Kr) r^2 / b^2. With Sy = 0 it reduces to
+2 K0(sqrt(p)) / p, the transform of the Theis W(1 / (4 t_s)).
+
+The transform is inverted with aquaprobe.laplace. All the roots, for every
+Laplace point of every time, are found together (bisection for e_0,
+Newton for the rest), so a whole record is one set of array operations.
+
+The fit works in (ln S, ln T, ln (Sy - S), ln beta), so Sy always exceeds
+S; a step that overflows any parameter gets an infinite cost and is
+rejected.
+"""
+from collections import namedtuple
+from functools import partial
+
+import numpy as np
+from scipy.special import k0
+
+from aquaprobe.laplace import invert, laplace_curve
+from aquaprobe.theis import cooper_jacob_seed, levenberg_marquardt
+
+N_ROOTS = 40
+# terms with sqrt(beta) e_n beyond this add less than K0(20) ~ 1e-9
+ROOT_REACH = 20.0
+BISECTIONS = 52
+NEWTON_STEPS = 3
+STEP = 1e-6
+SEED_BETAS = np.geomspace(1e-3, 10, 12)
+SEED_STARTS = 3
+
+NeumanFit = namedtuple('NeumanFit', 'S T Sy beta rms_residual iterations converged')
+
+
+def water_table_roots(c, n_roots=N_ROOTS):
+    """The first n_roots roots e_n of e tan e = c for every c (c > 0),
+    with the roots along a new last axis."""
+    c = np.asarray(c, dtype=float)
+    roots = np.empty(c.shape + (n_roots,))
+    # e tan e rises from 0 to infinity across (0, pi/2): bisect for e_0
+    low = np.zeros(c.shape)
+    high = np.full(c.shape, np.pi / 2)
+    for _ in range(BISECTIONS):
+        mid = 0.5 * (low + high)
+        above = mid * np.sin(mid) - c * np.cos(mid) > 0
+        high = np.where(above, mid, high)
+        low = np.where(above, low, mid)
+    roots[..., 0] = 0.5 * (low + high)
+    # e_n = n pi + d solves F(d) = d - atan(c / (n pi + d)) = 0; F is
+    # increasing and concave, so Newton from d = atan(c / (n pi + pi/2)),
+    # which is below the root, climbs to it without overshooting
+    c = c[..., None]
+    n_pi = np.arange(1, n_roots) * np.pi
+    d = np.arctan(c / (n_pi + np.pi / 2))
+    for _ in range(NEWTON_STEPS):
+        a = n_pi + d
+        d = d - (d - np.arctan(c / a)) / (1 + c / (a * a + c * c))
+    roots[..., 1:] = n_pi + d
+    return roots
+
+
+def roots_needed(beta):
+    return int(min(N_ROOTS, np.ceil(ROOT_REACH / (np.pi * np.sqrt(beta))) + 1))
+
+
+def neuman_laplace(p, sigma, beta, n_roots=None):
+    """The transform s_D(p) for an array of Laplace points p."""
+    p = np.asarray(p, dtype=float)
+    if n_roots is None:
+        n_roots = roots_needed(beta)
+    e = water_table_roots(p / (sigma * beta), n_roots)
+    sin_e = np.sin(e)
+    weights = 2 * sin_e * sin_e / (e * (e + sin_e * np.cos(e)))
+    return 2 / p * np.sum(weights * k0(np.sqrt(p[..., None] + beta * e * e)), axis=-1)
+
+
+def neuman_dimensionless(t_s, sigma, beta):
+    """Dimensionless drawdown s_D at t_s = T t / (S r^2), any shape of t_s."""
+    return invert(partial(neuman_laplace, sigma=sigma, beta=beta), t_s)
+
+
+def neuman_drawdown(t, S, T, Sy, beta, Q, r):
+    """Drawdown at times t (days) at r from the pumping well."""
+    t = np.asarray(t, dtype=float)
+    return Q / (4 * np.pi * T) * neuman_dimensionless(T * t / (S * r * r), S / Sy, beta)
+
+
+def neuman_parameters(p):
+    """S, T, Sy and beta from the fitted p = (ln S, ln T, ln (Sy - S), ln beta)."""
+    S, T, excess, beta = np.exp(p)
+    return S, T, S + excess, beta
+
+
+def _residuals_and_jacobian(p, t, s, Q, r):
+    S, T, Sy, beta = neuman_parameters(p)
+    x = np.log(T * t / (S * r * r))
+    if not (np.all(np.isfinite(x)) and np.isfinite(Sy) and 0 < beta < np.inf):
+        return np.full(t.size, np.inf), np.zeros((4, t.size))
+    scale = Q / (4 * np.pi * T)
+    sigma = S / Sy
+    t_s = np.exp(x)
+    curve = laplace_curve(partial(neuman_laplace, sigma=sigma, beta=beta), t_s)
+    model = scale * np.exp(curve(x))
+    # s = Q / (4 pi T) s_D(t_s, sigma, beta) with t_s = T t / (S r^2) and
+    # sigma = S / (S + excess), so the chain rule needs d s_D / d ln t_s
+    # (from the spline) and d s_D / d ln sigma and d s_D / d ln beta (by
+    # differences); d ln sigma / d ln S = -d ln sigma / d ln excess = 1 - sigma
+    slope = model * curve(x, 1)
+    moved = partial(neuman_laplace, sigma=sigma * np.exp(STEP), beta=beta)
+    by_sigma = (scale * np.exp(laplace_curve(moved, t_s)(x)) - model) / STEP
+    moved = partial(neuman_laplace, sigma=sigma, beta=beta * np.exp(STEP))
+    by_beta = (scale * np.exp(laplace_curve(moved, t_s)(x)) - model) / STEP
+    jac = np.empty((4, t.size))
+    jac[0] = (1 - sigma) * by_sigma - slope
+    jac[1] = slope - model
+    jac[2] = -(1 - sigma) * by_sigma
+    jac[3] = by_beta
+    return model - s, jac
+
+
+def neuman_seeds(t, s, Q, r):
+    """Starting (S, T, Sy, beta) guesses, best first: Cooper-Jacob on the
+    first and last thirds of the record (in log time) for S and Sy, and the
+    SEED_STARTS best of SEED_BETAS for them."""
+    x = np.log(t)
+    early = x <= x.min() + (x.max() - x.min()) / 3
+    late = x >= x.max() - (x.max() - x.min()) / 3
+    S, T = cooper_jacob_seed(t[early], s[early], Q, r) if early.sum() >= 3 else \
+        cooper_jacob_seed(t, s, Q, r)
+    Sy, T_late = cooper_jacob_seed(t[late], s[late], Q, r) if late.sum() >= 3 else (10 * S, T)
+    T = T_late if np.isfinite(T_late) and T_late > 0 else T
+    Sy = max(Sy, 10 * S)
+    costs = [np.sum((neuman_drawdown(t, S, T, Sy, beta, Q, r) - s) ** 2) for beta in SEED_BETAS]
+    return [(S, T, Sy, SEED_BETAS[i]) for i in np.argsort(costs)[:SEED_STARTS]]
+
+
+def fit_neuman(t, s, Q, r, seed=None):
+    """Fit S, T, Sy and beta to time-drawdown data (t in days), from each
+    of neuman_seeds unless a starting (S, T, Sy, beta) is given (Sy > S)."""
+    t = np.asarray(t, dtype=float).ravel()
+    s = np.asarray(s, dtype=float).ravel()
+    seeds = neuman_seeds(t, s, Q, r) if seed is None else [seed]
+
+    best = None
+    for S, T, Sy, beta in seeds:
+        if Sy <= S:
+            raise ValueError('the specific yield must exceed the storativity')
+        fit = levenberg_marquardt(lambda p: _residuals_and_jacobian(p, t, s, Q, r),
+                                  np.log([S, T, Sy - S, beta]))
+        if best is None or fit[1] < best[1]:
+            best = fit
+    p, cost, iterations, converged = best
+    S, T, Sy, beta = neuman_parameters(p)
+    rms_residual = np.sqrt(cost / t.size)
+    return NeumanFit(float(S), float(T), float(Sy), float(beta), float(rms_residual),
+                     iterations, converged)
@@ -0,0 +1,314 @@
+"""Figures for each analysis method, shared by the pages and the CLI."""
+import io
+
+import numpy as np
+import matplotlib.pyplot as plt
+from PIL import Image
+
+from aquaprobe.boundaries import image_wells, layout_boundaries
+from aquaprobe.leaky import hantush_drawdown
+from aquaprobe.neuman import neuman_drawdown
+from aquaprobe.superposition import schedule_drawdown
+from aquaprobe.well_function import theis_drawdown
+from aquaprobe.wellbore import wellbore_drawdown
+from aquaprobe.wellfield import Grid, dupuit_field
+
+PLOT_MAX_CELLS = 500
+
+
+def plot_time_drawdown(t, s):
+    fig, ax = plt.subplots()
+    ax.plot(t, s, 'x')
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Drawdown')
+    return fig
+
+
+def plot_diagnostic(t, s, derivative, xlabel='Time'):
+    """Log-log drawdown and its Bourdet derivative ds/d ln t (see
+    aquaprobe.derivative); only positive values can be shown."""
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+    fig, ax = plt.subplots()
+    ax.loglog(t[s > 0], s[s > 0], ls='', marker='.', color='black', label='Drawdown')
+    ax.loglog(t[derivative > 0], derivative[derivative > 0], ls='', marker='.', color='red',
+              label='Derivative ds/d ln t')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Drawdown (m)')
+    ax.set_title('Diagnostic Plot')
+    ax.grid(True, which='both', alpha=0.3)
+    # below the axes, as loc='best' is slow on long logger records
+    ax.legend(loc='upper center', bbox_to_anchor=(0.5, -0.14), ncol=2)
+    fig.subplots_adjust(bottom=0.24)
+    return fig
+
+
+def plot_theis(t, s, S, T, Q, r, schedule=None):
+    """Field data and fitted Theis curve against ln t (t in days), at the
+    constant rate Q or under a pumping schedule (starts in days)."""
+    fig, ax = plt.subplots()
+    ax.plot(np.log(t), s, ls='', marker='o', label='Field Data')
+    if schedule is None:
+        t_curve = np.geomspace(np.min(t), np.max(t), 200)
+        s_curve = theis_drawdown(t_curve, S, T, Q, r)
+    else:
+        t_curve = np.geomspace(np.min(t), np.max(t), 1000)
+        s_curve = schedule_drawdown(t_curve, schedule, S, T, r)
+    ax.plot(np.log(t_curve), s_curve, label='Theis Fit')
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Drawdown')
+    ax.legend(loc='best')
+    return fig
+
+
+def plot_misfit(surface, S, T):
+    """Heatmap of the RMS misfit over the S-T grid of misfit.misfit_surface,
+    with its confidence contours and the fitted S and T."""
+    fig, ax = plt.subplots()
+    mesh = ax.pcolormesh(surface.T, surface.S, np.log10(np.maximum(surface.rms, 1e-12)),
+                         shading='auto', cmap='viridis')
+    fig.colorbar(mesh, ax=ax, label='log10 RMS misfit (m)')
+    thresholds = np.asarray(surface.thresholds)
+    if np.all(np.isfinite(thresholds)):
+        contours = ax.contour(surface.T, surface.S, surface.rms, levels=np.sort(thresholds),
+                              colors='white', linewidths=1)
+        labels = {level: f'{confidence:.0%}'
+                  for level, confidence in zip(thresholds, surface.levels)}
+        ax.clabel(contours, fmt=labels, fontsize=8)
+    ax.plot(T, S, marker='*', color='red', markersize=12, ls='', label='Theis Fit')
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('Transmissivity (m2/day)')
+    ax.set_ylabel('Storativity')
+    # loc='best' would test the legend against every cell of the mesh
+    ax.legend(loc='upper right')
+    return fig
+
+
+def plot_hantush(df, results, Q, r):
+    """Field data, the fitted Hantush-Jacob curve and the Theis curve of the
+    same S and T, against time (see methods.hantush_jacob)."""
+    fig, ax = plt.subplots()
+    t_curve = np.geomspace(df['Time'].min(), df['Time'].max(), 200)
+    ax.loglog(df['Time'], df['Drawdown'], ls='', marker='o', color='black', label='Field Data')
+    ax.loglog(t_curve, hantush_drawdown(t_curve/1440, results['S'], results['T'], Q, r,
+                                        results['r_by_B']),
+              'r-', label='Hantush-Jacob Fit (r/B = {:.3g})'.format(results['r_by_B']))
+    ax.loglog(t_curve, theis_drawdown(t_curve/1440, results['S'], results['T'], Q, r),
+              'b--', label='Theis, no leakage')
+    ax.set_xlabel('Time (mins)')
+    ax.set_ylabel('Drawdown (m)')
+    ax.grid(True, which='both', alpha=0.3)
+    ax.legend(loc='best')
+    return fig
+
+
+def plot_neuman(df, results, Q, r):
+    """Field data and the fitted Neuman curve, with the early (S) and late
+    (Sy) Theis curves it runs between (see methods.neuman)."""
+    fig, ax = plt.subplots()
+    t_curve = np.geomspace(df['Time'].min(), df['Time'].max(), 200)
+    S, T, Sy = results['S'], results['T'], results['Sy']
+    ax.loglog(df['Time'], df['Drawdown'], ls='', marker='o', color='black', label='Field Data')
+    ax.loglog(t_curve, neuman_drawdown(t_curve/1440, S, T, Sy, results['beta'], Q, r),
+              'r-', label='Neuman Fit (beta = {:.3g})'.format(results['beta']))
+    ax.loglog(t_curve, theis_drawdown(t_curve/1440, S, T, Q, r), 'b--', label='Theis, S')
+    ax.loglog(t_curve, theis_drawdown(t_curve/1440, Sy, T, Q, r), 'g--', label='Theis, Sy')
+    ax.set_ylim(0.5 * df['Drawdown'][df['Drawdown'] > 0].min(), 2 * df['Drawdown'].max())
+    ax.set_xlabel('Time (mins)')
+    ax.set_ylabel('Drawdown (m)')
+    ax.grid(True, which='both', alpha=0.3)
+    ax.legend(loc='best')
+    return fig
+
+
+def plot_wellbore(df, results, Q, r_w, r_c=None):
+    """Pumped-well data and the fitted Papadopulos-Cooper curve, with the
+    casing storage line Q t / (pi r_c^2) and the Theis curve at r_w."""
+    r_c = r_w if r_c is None else r_c
+    fig, ax = plt.subplots()
+    t_curve = np.geomspace(df['Time'].min(), df['Time'].max(), 200)
+    S, T, skin = results['S'], results['T'], results['skin']
+    ax.loglog(df['Time'], df['Drawdown'], ls='', marker='o', color='black', label='Field Data')
+    ax.loglog(t_curve, wellbore_drawdown(t_curve/1440, S, T, Q, r_w, r_c, skin), 'r-',
+              label='Papadopulos-Cooper Fit (skin = {:.3g})'.format(skin))
+    ax.loglog(t_curve, Q*t_curve/1440/(np.pi*r_c*r_c), 'g--', label='Casing Storage')
+    ax.loglog(t_curve, theis_drawdown(t_curve/1440, S, T, Q, r_w), 'b--', label='Theis, r_w')
+    ax.set_ylim(0.5 * df['Drawdown'][df['Drawdown'] > 0].min(), 2 * df['Drawdown'].max())
+    ax.set_xlabel('Time (mins)')
+    ax.set_ylabel('Drawdown (m)')
+    ax.grid(True, which='both', alpha=0.3)
+    ax.legend(loc='best')
+    return fig
+
+
+def plot_straight_line_fit(x_data, y_data, slope, y_intercept, xlabel, ylabel, title):
+    fig, ax = plt.subplots()
+    y_data = np.asarray(y_data, dtype=float)
+    ax.semilogx(x_data, y_data, marker='.',
+                color='black', label='Actual Data')
+    ax.semilogx(np.exp((y_data - y_intercept)/slope),
+                y_data, 'r--', label='Fitting Line')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.grid(True)
+    ax.legend(loc='best')
+    return fig
+
+
+def plot_cooper_jacob(x_data, y_data, results, xlabel, title):
+    fig = plot_straight_line_fit(x_data, y_data, results['slope'], results['y_intercept'],
+                                 xlabel, 'Drawdown', title)
+    ax = fig.axes[0]
+    ax.axvline(x=results['t_for_u'], color='blue', ls=':', label='u = 0.05')
+    ax.legend(loc='best')
+    return fig
+
+
+def plot_theis_recovery(x_data, y_data, results):
+    return plot_straight_line_fit(x_data, y_data, results['slope'], results['y_intercept'],
+                                  "log t/t'", 'Residual Drawdown', 'Time vs Drawdown')
+
+
+def plot_dupuit(df, r0):
+    fig, ax = plt.subplots()
+    ax.plot(df['r'], df['s'])
+    ax.set_xlabel("Distance from pumping well (m)")
+    ax.set_ylabel("Drawdown (m)")
+    ax.set_title("Estimated Steady State Cone of Depression")
+    arrow_properties = dict(facecolor="red", width=1, headwidth=4, shrink=0.1)
+    ax.annotate("r0", (r0, df['s'].iloc[-1]), arrowprops=arrow_properties)
+    return fig
+
+
+def plot_thiem(df, results=None):
+    """Steady heads against distance, with the Thiem line if results of
+    methods.thiem_estimate are given."""
+    fig, ax = plt.subplots()
+    if results is None:
+        ax.semilogx(df['r'], df['h'], marker='o')
+    else:
+        ax.semilogx(df['r'], df['h'], ls='', marker='o', color='black', label='Piezometers')
+        r_line = np.geomspace(df['r'].min(), df['r'].max(), 100)
+        ax.semilogx(r_line, results['y_intercept'] + results['slope']*np.log(r_line),
+                    'r--', label='Thiem Fit')
+        ax.legend(loc='best')
+    ax.set_xlabel("Distance from pumping well (m)")
+    ax.set_ylabel("Head (m)")
+    ax.set_title("Steady State Head")
+    ax.grid(True)
+    return fig
+
+
+def plot_image_wells(df, results, x, y, layout):
+    """Field data with the fitted drawdown near a boundary and the
+    unbounded Theis curve (see methods.image_well_theis), beside a map of
+    the boundaries and the image wells."""
+    fig, (ax, ax_map) = plt.subplots(1, 2, figsize=(12, 5))
+    ax.semilogx(df['Time'], df['Drawdown'], ls='', marker='o', color='black', label='Field Data')
+    ax.semilogx(df['Time'], df['Calculated_Drawdown'], 'r-', label='Image Well Fit')
+    ax.semilogx(df['Time'], df['Unbounded_Drawdown'], 'b--', label='Theis, no boundary')
+    ax.set_xlabel('Time (mins)')
+    ax.set_ylabel('Drawdown (m)')
+    ax.grid(True)
+    ax.legend(loc='best')
+
+    boundaries = layout_boundaries(layout, results['distance'])
+    images = image_wells(boundaries)
+    reach = 3 * max(results['distance'], np.hypot(x, y))
+    near = np.hypot(images.x, images.y) <= reach
+    # boundaries run along (-ny, nx) through (x, y); the sides of a wedge
+    # stop at its apex, which is the point of the second side
+    spans = [(-2 * reach, 2 * reach)] * 2
+    if layout.shape == 'wedge':
+        spans = [(-2 * reach, 0), (0, 2 * reach)]
+    for b, span in zip(boundaries, spans):
+        ends = np.array(span)
+        ax_map.plot(b.x - b.ny * ends, b.y + b.nx * ends,
+                    color='blue' if b.kind == 'recharge' else 'black', lw=2)
+    real = np.arange(images.sign.size) == 0
+    ax_map.plot(images.x[near & ~real & (images.sign > 0)],
+                images.y[near & ~real & (images.sign > 0)], 'k^', label='Pumping image')
+    ax_map.plot(images.x[near & (images.sign < 0)], images.y[near & (images.sign < 0)],
+                'bv', label='Recharge image')
+    ax_map.plot(0, 0, 'r^', label='Pumping well')
+    ax_map.plot(x, y, 'go', label='Observation well')
+    ax_map.set_xlim(-reach, reach)
+    ax_map.set_ylim(-reach, reach)
+    ax_map.set_aspect('equal')
+    ax_map.set_xlabel('x (m)')
+    ax_map.set_ylabel('y (m)')
+    ax_map.set_title('Boundary {:.5g} m from the pumping well'.format(results['distance']))
+    ax_map.legend(loc='best', fontsize='small')
+    return fig
+
+
+def plot_well_field(grid, wells, title, max_cells=PLOT_MAX_CELLS, levels=20):
+    """Contour map of the drawdown of a well field (see wellfield.Grid).
+
+    Grids finer than max_cells along an axis are thinned for drawing.
+    """
+    step_x = max(1, len(grid.x) // max_cells)
+    step_y = max(1, len(grid.y) // max_cells)
+    fig, ax = plt.subplots(figsize=(7, 6))
+    contours = ax.contourf(grid.x[::step_x], grid.y[::step_y],
+                           grid.drawdown[::step_y, ::step_x], levels=levels, cmap='viridis_r')
+    ax.contour(grid.x[::step_x], grid.y[::step_y], grid.drawdown[::step_y, ::step_x],
+               levels=contours.levels, colors='k', linewidths=0.3)
+    fig.colorbar(contours, ax=ax, label='Drawdown (m)')
+    ax.plot(wells.x, wells.y, 'r^', label='Pumping well')
+    ax.set_xlabel('x (m)')
+    ax.set_ylabel('y (m)')
+    ax.set_title(title)
+    ax.set_aspect('equal')
+    ax.legend(loc='best')
+    return fig
+
+
+def plot_dupuit_field(wells, R, K, h0, n_cells):
+    """Drawdown map of a Dupuit-Forchheimer well field on an n_cells square
+    grid; only the figure is kept, not the grid."""
+    grid = dupuit_field(wells, R, K, h0, nx=n_cells, ny=n_cells)
+    title = 'Steady State Drawdown (max {:.3f} m)'.format(float(grid.drawdown.max()))
+    return plot_well_field(grid, wells, title)
+
+
+def plot_theis_field(field, wells, k):
+    """Drawdown map of time slice k of a wellfield.TimeGrid (t in days).
+
+    The contour levels span the whole series, so the slices of an
+    animation share one colour scale.
+    """
+    low, high = float(field.drawdown.min()), float(field.drawdown.max())
+    levels = np.linspace(low, high, 21) if high > low else 20
+    grid = Grid(field.x, field.y, None, field.drawdown[k])
+    title = 'Drawdown at t = {:.4g} min (max {:.3f} m)'.format(
+        field.t[k] * 1440, float(field.drawdown[k].max()))
+    return plot_well_field(grid, wells, title, levels=levels)
+
+
+def render_png(plot, *args):
+    """Draw plot(*args) once and return it as PNG bytes.
+
+    The figure is closed straight away, so pyplot does not keep it alive;
+    the same bytes are shown on the page and embedded in the report.
+    """
+    fig = plot(*args)
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png')
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+def render_gif(plot, frames, duration=250):
+    """Draw plot(*args) for each args in frames and return the figures as
+    the frames of a looping GIF (duration in ms per frame)."""
+    images = [Image.open(io.BytesIO(render_png(plot, *args))).convert('RGB')
+              for args in frames]
+    buffer = io.BytesIO()
+    images[0].save(buffer, format='GIF', save_all=True, append_images=images[1:],
+                   duration=duration, loop=0)
+    return buffer.getvalue()
@@ -0,0 +1,137 @@
+"""Columnar store of manually entered readings.
+
+The readings of a page are kept as one numpy array per column, with spare
+capacity that doubles as it fills, so adding a block of readings is one
+slice assignment and deleting any set of them one compaction. The grid
+editor reports only what changed since the readings were last committed
+(edited cells, deleted rows and added rows, by position); apply_edits
+turns such a change into a handful of fancy-indexed operations rather than
+a row at a time.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+INITIAL_CAPACITY = 64
+SEPARATORS = r'[\t,; ]+'
+
+
+class ReadingBuffer:
+    """Readings in n_columns numpy columns, in the order entered."""
+
+    def __init__(self, n_columns=2, capacity=INITIAL_CAPACITY):
+        self.data = np.empty((n_columns, capacity))
+        self.size = 0
+        # bumped on every change, so a grid showing the readings knows when
+        # to start again from the committed state
+        self.version = 0
+
+    def __len__(self):
+        return self.size
+
+    def columns(self):
+        """The readings as an (n_columns, size) view."""
+        return self.data[:, :self.size]
+
+    def _reserve(self, size):
+        if size > self.data.shape[1]:
+            capacity = max(size, 2 * self.data.shape[1])
+            data = np.empty((self.data.shape[0], capacity))
+            data[:, :self.size] = self.columns()
+            self.data = data
+
+    def insert(self, rows, at=None):
+        """Insert rows (one per reading) before position at, or at the end."""
+        rows = np.asarray(rows, dtype=float).reshape(-1, self.data.shape[0])
+        at = self.size if at is None else at
+        if not 0 <= at <= self.size:
+            raise ValueError(f'position {at} is outside the {self.size} readings')
+        self._reserve(self.size + len(rows))
+        end = at + len(rows)
+        self.data[:, end:self.size + len(rows)] = self.data[:, at:self.size]
+        self.data[:, at:end] = rows.T
+        self.size += len(rows)
+        self.version += 1
+
+    def delete(self, positions):
+        """Delete the readings at positions."""
+        positions = np.asarray(positions, dtype=int)
+        if positions.size and (positions.min() < 0 or positions.max() >= self.size):
+            raise ValueError(f'positions outside the {self.size} readings')
+        keep = np.ones(self.size, dtype=bool)
+        keep[positions] = False
+        kept = np.count_nonzero(keep)
+        self.data[:, :kept] = self.columns()[:, keep]
+        self.size = kept
+        self.version += 1
+
+    def clear(self):
+        self.size = 0
+        self.version += 1
+
+    def frame(self, names):
+        """The readings as a DataFrame with the given column names."""
+        return pd.DataFrame(dict(zip(names, self.columns().copy())))
+
+    def edited(self, edits, names):
+        """The readings with the changes of a grid editor applied, as an
+        (n_columns, n) array, leaving the buffer as it is."""
+        return apply_edits(self.columns(), edits, names)
+
+    def commit(self, edits, names):
+        """Apply the changes of a grid editor to the buffer."""
+        columns = self.edited(edits, names)
+        self.size = 0
+        self._reserve(columns.shape[1])
+        self.data[:, :columns.shape[1]] = columns
+        self.size = columns.shape[1]
+        self.version += 1
+
+
+def apply_edits(columns, edits, names):
+    """columns with the changes of a grid editor applied.
+
+    edits is the editor state: edited_rows maps a position to the new
+    values by column name, deleted_rows lists positions and added_rows new
+    readings by column name. Empty cells become NaN.
+    """
+    columns = np.array(columns, dtype=float)
+    edits = edits or dict()
+    edited = edits.get('edited_rows') or dict()
+    for i, name in enumerate(names):
+        cells = [(int(row), value) for row, values in edited.items()
+                 for column, value in values.items() if column == name]
+        if cells:
+            rows, values = zip(*cells)
+            columns[i, list(rows)] = np.array(values, dtype=float)
+    deleted = edits.get('deleted_rows')
+    if deleted:
+        keep = np.ones(columns.shape[1], dtype=bool)
+        keep[np.asarray(deleted, dtype=int)] = False
+        columns = columns[:, keep]
+    added = edits.get('added_rows')
+    if added:
+        rows = np.array([[row.get(name) for name in names] for row in added], dtype=float)
+        columns = np.hstack([columns, rows.T])
+    return columns
+
+
+def complete(columns):
+    """The readings (columns) with no empty values."""
+    return columns[:, ~np.isnan(columns).any(axis=0)]
+
+
+def parse_readings(text, n_columns=2):
+    """Readings pasted as text, one per line with the columns separated by
+    tabs, commas, semicolons or spaces (as copied from a spreadsheet), as
+    rows. Lines that hold no number at all, such as headers, are skipped
+    and columns beyond n_columns ignored."""
+    lines = [re.split(SEPARATORS, line.strip()) for line in text.splitlines() if line.strip()]
+    if not lines:
+        return np.empty((0, n_columns))
+    values = pd.DataFrame(lines).apply(pd.to_numeric, errors='coerce')
+    values = values[values.notna().any(axis=1)]
+    if values.shape[1] < n_columns or values.iloc[:, :n_columns].isna().any(axis=None):
+        raise ValueError(f'every reading needs {n_columns} numbers')
+    return values.iloc[:, :n_columns].to_numpy(dtype=float)
@@ -0,0 +1,245 @@
+"""PDF report building shared by the pages and the CLI.
+
+The builders take plain values and return the finished document as bytes.
+They accept an optional progress callable, called with the fraction done
+while the data table (the slow part) is written.
+"""
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'images', 'logo.jpg')
+PROGRESS_EVERY = 50
+# printable width of an A4 page with the default margins, in mm
+TABLE_WIDTH = 190
+
+
+def csv_bytes(df):
+    return df.to_csv().encode('utf-8')
+
+
+def interval_lines(results, labels, method, confidence):
+    """Text lines of the confidence intervals in results (see
+    aquaprobe.bootstrap); labels are (name, text) pairs, e.g.
+    ('T', 'Transmissivity (m2/day)')."""
+    return [f'{confidence:.0%} {method} interval of {text} : '
+            f'{results[name + "_low"]:.5g} to {results[name + "_high"]:.5g}'
+            for name, text in labels]
+
+
+def _cell_text(value):
+    if isinstance(value, (bool, np.bool_)):
+        return 'yes' if value else 'no'
+    return str(round(value, 5))
+
+
+def output_df_to_pdf(pdf, df, progress=None):
+    table_cell_width = min(35, TABLE_WIDTH / len(df.columns))
+    table_cell_height = 10
+    pdf.set_font('Arial', 'B', 8)
+    cols = df.columns
+    for col in cols:
+        pdf.cell(table_cell_width, table_cell_height,
+                 col, align='C', border=1)
+    pdf.ln(table_cell_height)
+    pdf.set_font('Arial', '', 10)
+    for i, row in enumerate(df.itertuples()):
+        for col in cols:
+            value = _cell_text(getattr(row, col))
+            pdf.cell(table_cell_width, table_cell_height,
+                     value, align='C', border=1)
+        pdf.ln(table_cell_height)
+        if progress is not None and i % PROGRESS_EVERY == 0:
+            progress(i / len(df))
+
+
+def output_df_to_pdf1(pdf, df):
+    table_cell_width = 90
+    table_cell_height = 12
+    pdf.set_font('Arial', '', 12)
+    cols = df.columns
+    for row in df.itertuples():
+        for col in cols:
+            value = str(getattr(row, col))
+            if (value[:9] == 'Performed'):
+                table_cell_width = 180
+                pdf.cell(table_cell_width, table_cell_height, value, align='L', border=1)
+            elif (value == ''):
+                pass
+            else:
+                table_cell_width = 90
+                pdf.cell(table_cell_width, table_cell_height, value, align='L', border=1)
+        pdf.ln(table_cell_height)
+
+
+def new_report(title):
+    pdf = FPDF()
+    pdf.add_page()
+
+    pdf.image(LOGO_PATH, w=100, h=30)
+
+    pdf.set_font('Arial', 'B', 10)
+    pdf.cell(0, 10, 'CENTRAL GROUND WATER BOARD (CGWB)', ln=1)
+    pdf.ln(5)
+
+    pdf.set_font('Arial', 'B', 18)
+    pdf.cell(0, 10, title, align='C', ln=1)
+    pdf.line(10, int(pdf.get_y()), 210 - 10, int(pdf.get_y()))
+    pdf.ln(5)
+    return pdf
+
+
+def finish_report(pdf, progress=None):
+    if progress is not None:
+        progress(1.0)
+    return bytes(pdf.output())
+
+
+def build_method_report(title, meta, parameter_rows, df, result_lines, figure_png,
+                        progress=None):
+    """The report layout used by the Cooper-Jacob, Dupuit-Forchheimer and
+    Theis Recovery pages.
+
+    meta holds location, coordinates, test_employee and date_performed (or
+    is None); parameter_rows are (left, right) text pairs, right may be None;
+    figure_png is the rendered figure (see plots.render_png).
+    """
+    pdf = new_report(title)
+
+    pdf.set_font('Arial', '', 12)
+    if meta:
+        pdf.cell(0, 10, f'Location : {meta["location"]}', align='L')
+        pdf.cell(0, 10, f'Coordinates : {meta["coordinates"]}', align='R', ln=1)
+        pdf.cell(0, 10, f'Performed by : {meta["test_employee"]}', align='L')
+        pdf.cell(0, 10, f'Performed on : {meta["date_performed"]}', align='R', ln=1)
+        pdf.ln(5)
+
+    for left, right in parameter_rows:
+        if right is None:
+            pdf.cell(0, 10, left, align='L', ln=1)
+        else:
+            pdf.cell(0, 10, left, align='L')
+            pdf.cell(0, 10, right, align='R', ln=1)
+    pdf.ln(5)
+
+    pdf.set_font('Arial', 'B', 13)
+    pdf.cell(0, 10, 'Data Table', ln=1)
+
+    pdf.set_font('Arial', '', 12)
+    output_df_to_pdf(pdf, df, progress)
+    pdf.ln(5)
+
+    pdf.set_font('Arial', 'B', 12)
+    for line in result_lines:
+        pdf.cell(0, 10, line, ln=1)
+    pdf.ln(4)
+
+    pdf.set_font('Arial', 'B', 13)
+    pdf.cell(0, 10, "Graphical Interpretation", ln=1)
+    pdf.image(io.BytesIO(figure_png), w=200, h=200)
+    pdf.ln(5)
+    pdf.dashed_line(10, int(pdf.get_y()), 210 - 10,
+                    int(pdf.get_y()), dash_length=1, space_length=1)
+
+    return finish_report(pdf, progress)
+
+
+def build_theis_report(meta, Q, r, T, S, rms_residual, df, figure_png, schedule=None,
+                       wellbore=None, intervals=(), progress=None):
+    """The Theis page report; schedule lists the pumping steps (start times
+    in mins and rates) of a variable-rate test, wellbore the skin and C_D
+    of a Papadopulos-Cooper fit to pumped-well data (r is then r_w) and
+    intervals the lines of interval_lines."""
+    pdf = FPDF()
+    pdf.add_page()
+
+    pdf.image(LOGO_PATH, w=25, h=30)
+
+    pdf.set_font('Arial', 'B', 10)
+    pdf.cell(0, 10, 'CENTRAL GROUND WATER BOARD (CGWB)', ln=1)
+    pdf.ln(5)
+
+    pdf.set_font('Arial', 'BU', 18)
+    pdf.cell(0, 10, 'Theis Test Report', align='C', ln=1)
+    pdf.ln(5)
+
+    pdf.set_font('Arial', '', 12)
+    lst1 = list()
+    lst2 = list()
+    lst1.append(f' location: {meta["location"]} ')
+    lst2.append(f' coordinate: {meta["coordinates"]} ')
+    lst1.append(f' Geology: {meta["soil_select"]} ')
+    lst2.append(f' Lithology: {meta["rock_select"]} ')
+    lst1.append(f'Performed by: {meta["test_employee"]} ')
+    lst2.append('')
+    lst1.append(f'Start time: {meta["shr"]}:{meta["smin"]} ')
+    lst2.append(f'End time:  {meta["ehr"]}:{meta["emin"]}')
+    lst1.append(f' Start Date: {meta["start_date"]} ')
+    lst2.append(f' End date:  {meta["end_date"]} ')
+
+    df_1 = pd.DataFrame({'properties': lst1, 'values': lst2})
+    output_df_to_pdf1(pdf, df_1)
+
+    pdf.ln(15)
+
+    lst3 = list()
+    lst4 = list()
+    lst3.append(f' Zones tapped in : {meta["zone"]} (bgl m)')
+    lst4.append(f' Well depth : {meta["well_depth"]} m')
+    lst3.append(f' Well diameter : {meta["well_diameter"]} m')
+    lst4.append(f' Static water level : {meta["static_water"]} m')
+    df_2 = pd.DataFrame({'properties': lst3, 'values': lst4})
+    output_df_to_pdf1(pdf, df_2)
+    pdf.ln(5)
+
+    pdf.set_font('Arial', '', 12)
+    if schedule is None:
+        pdf.cell(0, 10, f'Well Discharge (Q) : {Q} m3/day', ln=1)
+    else:
+        pdf.cell(0, 10, 'Pumping schedule :', ln=1)
+        for start, rate in zip(*schedule):
+            pdf.cell(0, 10, f'    {rate} m3/day from {start} mins', ln=1)
+    if wellbore is None:
+        pdf.cell(0, 10, f'Radial Distance (r) : {r} m', ln=1)
+    else:
+        pdf.cell(0, 10, f'Pumped well, radius (r_w) : {r} m', ln=1)
+    pdf.ln(5)
+
+    pdf.set_font('Arial', 'B', 13)
+    pdf.cell(0, 10, "Graphical Interpretation", ln=1)
+    pdf.image(io.BytesIO(figure_png), w=200, h=200)
+    pdf.ln(5)
+
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0, 10, f'Transmissivity : {round(T, 5)} m2/day', ln=1)
+    pdf.cell(0, 10, f'Storativity : {round(S, 5)}', ln=1)
+    if wellbore is not None:
+        pdf.cell(0, 10, f'Skin factor : {round(wellbore["skin"], 3)}', ln=1)
+        pdf.cell(0, 10, f'Wellbore storage (C_D) : {round(wellbore["C_D"], 3)}', ln=1)
+    pdf.cell(0, 10, f'RMS residual : {round(rms_residual, 5)} m', ln=1)
+    for line in intervals:
+        pdf.cell(0, 10, line, ln=1)
+    pdf.ln(5)
+
+    pdf.set_font('Arial', 'B', 13)
+    pdf.cell(0, 10, 'Data Table', ln=1)
+
+    pdf.set_font('Arial', '', 12)
+    output_df_to_pdf(pdf, df, progress)
+    pdf.ln(4)
+
+    pdf.dashed_line(10, int(pdf.get_y()), 210 - 10,
+                    int(pdf.get_y()), dash_length=1, space_length=1)
+
+    return finish_report(pdf, progress)
+
+
+def build_report(title, parameters, results, df, figure_png):
+    """A report of a CLI run: the inputs, results, data table and figure."""
+    parameter_rows = [(f'{name} : {value}', None) for name, value in parameters.items()]
+    result_lines = [f'{name} : {round(value, 5)}' for name, value in results.items()]
+    return build_method_report(title, None, parameter_rows, df, result_lines, figure_png)
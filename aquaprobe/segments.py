@@ -0,0 +1,110 @@
+"""Automatic choice of the straight-line segment of a semi-log plot.
+
+Cooper-Jacob and Theis Recovery fit a straight line to drawdown against
+log time, but only part of a record is straight (well storage early on,
+boundaries late). best_line_window scores contiguous windows of the
+record sorted by x = ln(time) and proposes the straightest one that spans
+at least min_cycles log cycles and reaches into the late part of the
+record (the last LATE_FRACTION of its log span).
+
+With prefix sums of x, y, x^2, xy and y^2 the regression of any window
+costs O(1), so every candidate window is scored in one vectorized pass.
+Short records try every start and end; longer ones try window edges on
+MAX_EDGES points evenly spaced in x, which keeps the search to a few
+hundred thousand windows however long the record is.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+MIN_POINTS = 5
+MIN_CYCLES = 1.0
+MAX_EDGES = 400
+LATE_FRACTION = 1/3
+
+LineWindow = namedtuple('LineWindow', 'mask x_start x_end slope y_intercept score')
+
+
+def _prefix(values):
+    out = np.zeros(len(values) + 1)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def window_edges(x_sorted, max_edges=MAX_EDGES):
+    """Candidate window boundaries (positions into x_sorted, end exclusive)."""
+    n = len(x_sorted)
+    if n + 1 <= max_edges:
+        return np.arange(n + 1)
+    targets = np.linspace(x_sorted[0], x_sorted[-1], max_edges)
+    edges = np.searchsorted(x_sorted, targets, side='left')
+    return np.unique(np.concatenate(([0], edges, [n])))
+
+
+def best_line_window(x, y, min_cycles=MIN_CYCLES, late='high', min_points=MIN_POINTS,
+                     max_edges=MAX_EDGES):
+    """The straightest window of y against x (x = ln of time or of t/t').
+
+    A window is scored by the standard error of its regression (weighted by
+    log-time spacing) divided by the rise of the fitted line across the
+    window, so long straight windows beat short ones. Windows must hold min_points readings and span
+    min_cycles log cycles (or the whole record if it is shorter). late says
+    whether late readings have high x (ln t) or low x (ln t/t' of a
+    recovery test); None allows windows anywhere in the record. Returns a
+    LineWindow whose mask selects the readings of the window in the order
+    given, or None if the record has fewer than min_points readings.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if len(finite) < max(min_points, 3):
+        return None
+    order = finite[np.argsort(x[finite], kind='stable')]
+    xs = x[order]
+    ys = y[order]
+    # centring keeps the prefix-sum differences accurate
+    x0 = xs.mean()
+    y0 = ys.mean()
+    xc = xs - x0
+    yc = ys - y0
+
+    # every reading is weighted by its share of log time, so that densely
+    # logged late times do not swamp the shape of the early record
+    w = np.gradient(xs) if len(xs) > 1 else np.ones(1)
+    count = _prefix(np.ones(len(xs)))
+    sw, sx, sy = _prefix(w), _prefix(w * xc), _prefix(w * yc)
+    sxx, sxy, syy = _prefix(w * xc * xc), _prefix(w * xc * yc), _prefix(w * yc * yc)
+
+    edges = window_edges(xs, max_edges)
+    start, stop = np.meshgrid(edges, edges, indexing='ij', sparse=True)
+    n = count[stop] - count[start]
+    min_span = min(min_cycles * np.log(10), xs[-1] - xs[0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        span = xs[np.maximum(stop - 1, 0)] - xs[np.minimum(start, len(xs) - 1)]
+        W = sw[stop] - sw[start]
+        Sx = sx[stop] - sx[start]
+        Sy = sy[stop] - sy[start]
+        Sxx = sxx[stop] - sxx[start] - Sx * Sx / W
+        Sxy = sxy[stop] - sxy[start] - Sx * Sy / W
+        Syy = syy[stop] - syy[start] - Sy * Sy / W
+        slope = Sxy / Sxx
+        variance = np.maximum(Syy - slope * Sxy, 0) / W * n / (n - 2)
+        score = np.sqrt(variance) / np.abs(slope * span)
+    allowed = (n >= min_points) & (span >= min_span) & (Sxx > 0)
+    late_span = LATE_FRACTION * (xs[-1] - xs[0])
+    if late == 'high':
+        allowed &= xs[np.maximum(stop - 1, 0)] >= xs[-1] - late_span
+    elif late == 'low':
+        allowed &= xs[np.minimum(start, len(xs) - 1)] <= xs[0] + late_span
+    score[~allowed] = np.inf
+    score[~np.isfinite(score)] = np.inf
+
+    i, j = np.unravel_index(np.argmin(score), score.shape)
+    if not np.isfinite(score[i, j]):
+        return None
+    first, last = edges[i], edges[j]
+    mask = np.zeros(len(x), dtype=bool)
+    mask[order[first:last]] = True
+    best_slope = slope[i, j]
+    y_intercept = y0 + Sy[i, j] / W[i, j] - best_slope * (x0 + Sx[i, j] / W[i, j])
+    return LineWindow(mask, xs[first], xs[last - 1], best_slope, y_intercept, score[i, j])
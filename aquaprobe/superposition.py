@@ -0,0 +1,113 @@
+"""Drawdown under a variable pumping schedule by superposition in time.
+
+A schedule is a list of steps: the well pumps at rates[i] from starts[i]
+until the next step starts, and a rate of 0 is recovery. Every change of
+rate starts a new Theis solution, so
+
+    s(t) = sum_i (Q_i - Q_i-1) / (4 pi T) W(r^2 S / (4 T (t - t_i)))
+
+over the steps that have started by t. The sum is evaluated for all steps
+and observation times at once, a block of times at a time so that the
+times x steps arrays stay within CHUNK_SIZE elements. The Jacobian has the
+same form as for a constant rate (see aquaprobe.theis), so fit_schedule
+reuses its Levenberg-Marquardt fit.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from aquaprobe.theis import TheisFit, cooper_jacob_seed, levenberg_marquardt
+from aquaprobe.well_function import CHUNK_SIZE, calculate_u, well_function
+
+Schedule = namedtuple('Schedule', 'starts rates')
+
+MIN_SEED_READINGS = 3
+
+
+def make_schedule(starts, rates):
+    """A Schedule from step start times and rates, checked for consistency."""
+    starts = np.asarray(starts, dtype=float).ravel()
+    rates = np.asarray(rates, dtype=float).ravel()
+    if starts.size == 0 or starts.size != rates.size:
+        raise ValueError('every step needs a start time and a rate')
+    if not (np.all(np.isfinite(starts)) and np.all(np.isfinite(rates))):
+        raise ValueError('start times and rates must be numbers')
+    if np.any(np.diff(starts) <= 0):
+        raise ValueError('step start times must increase')
+    return Schedule(starts, rates)
+
+
+def rate_changes(schedule):
+    return np.diff(schedule.rates, prepend=0.0)
+
+
+def _superpose(t, schedule, S, T, r):
+    """Drawdown and sum of dQ e^-u / (4 pi T) at the flat times t."""
+    scaled = rate_changes(schedule) / (4 * np.pi * T)
+    drawdown = np.zeros(t.size)
+    e_u = np.zeros(t.size)
+    block = max(1, CHUNK_SIZE // schedule.starts.size)
+    for start in range(0, t.size, block):
+        elapsed = t[start:start + block, None] - schedule.starts[None, :]
+        active = elapsed > 0
+        u = calculate_u(r, S, T, elapsed[active])
+        w = np.zeros(elapsed.shape)
+        w[active] = well_function(u)
+        drawdown[start:start + block] = w @ scaled
+        w[active] = np.exp(-u)
+        e_u[start:start + block] = w @ scaled
+    return drawdown, e_u
+
+
+def schedule_drawdown(t, schedule, S, T, r):
+    """Drawdown at times t (same unit as the schedule's starts, days for T
+    in m2/day) under a pumping schedule."""
+    t = np.asarray(t, dtype=float)
+    drawdown, _ = _superpose(t.ravel(), schedule, S, T, r)
+    return drawdown.reshape(t.shape)
+
+
+def superposition_time(t, schedule, q_ref):
+    """The log time function sum_i (dQ_i / q_ref) ln(t - t_i).
+
+    For one step of rate Q followed by recovery (q_ref = Q) this is
+    ln(t / t'), so a variable-rate record can be analysed like a
+    constant-rate one. Only valid where every step has started.
+    """
+    t = np.asarray(t, dtype=float)
+    elapsed = t[..., None] - schedule.starts
+    return np.log(elapsed) @ (rate_changes(schedule) / q_ref)
+
+
+def schedule_seed(t, s, schedule, r):
+    """Cooper-Jacob estimate from the readings of the first step."""
+    first = t < schedule.starts[1] if schedule.starts.size > 1 else np.ones(t.size, bool)
+    first &= t > schedule.starts[0]
+    if np.count_nonzero(first) >= MIN_SEED_READINGS and schedule.rates[0] > 0:
+        return cooper_jacob_seed(t[first] - schedule.starts[0], s[first], schedule.rates[0], r)
+    Q = max(np.max(np.abs(schedule.rates)), 1e-12)
+    return 1e-4, Q / (4 * np.pi * max(np.mean(np.abs(s)), 1e-12))
+
+
+def _residuals_and_jacobian(p, t, s, schedule, r):
+    S, T = np.exp(p)
+    model, e_u = _superpose(t, schedule, S, T, r)
+    jac = np.empty((2, t.size))
+    jac[0] = -e_u
+    jac[1] = e_u - model
+    return model - s, jac
+
+
+def fit_schedule(t, s, schedule, r, S0=None, T0=None):
+    """Fit S and T of the superposed Theis solution to time-drawdown data
+    recorded under a pumping schedule (t and starts in days)."""
+    t = np.asarray(t, dtype=float).ravel()
+    s = np.asarray(s, dtype=float).ravel()
+    if S0 is None or T0 is None:
+        S0, T0 = schedule_seed(t, s, schedule, r)
+
+    p, cost, iterations, converged = levenberg_marquardt(
+        lambda p: _residuals_and_jacobian(p, t, s, schedule, r), np.log([S0, T0]))
+    S, T = np.exp(p)
+    rms_residual = np.sqrt(cost / t.size)
+    return TheisFit(float(S), float(T), float(rms_residual), iterations, converged)
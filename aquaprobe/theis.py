@@ -0,0 +1,106 @@
+"""Nonlinear least-squares Theis type-curve fit.
+
+The fit works in (ln S, ln T), which keeps both parameters positive and
+makes the problem close to linear. The Jacobian is exact and costs one
+exp per point, since dW/du = -e^-u / u gives
+
+    ds/d ln S = -Q/(4 pi T) e^-u
+    ds/d ln T = -s + Q/(4 pi T) e^-u
+
+so each Levenberg-Marquardt step only needs the 2x2 normal equations.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from aquaprobe.well_function import calculate_u, well_function
+
+TheisFit = namedtuple('TheisFit', 'S T rms_residual iterations converged')
+
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-10
+
+
+def get_S_and_T(m, c, Q, r):
+    """S and T from a straight line s = m ln t + c (Cooper-Jacob)."""
+    Tfit = Q / 4 / np.pi / m
+    Sfit = 4 * Tfit / r**2 * np.exp(-(c/m + np.euler_gamma))
+    return Sfit, Tfit
+
+
+def cooper_jacob_seed(t, s, Q, r):
+    m, c = np.polyfit(np.log(t), s, 1)
+    if m > 0:
+        S, T = get_S_and_T(m, c, Q, r)
+        if np.isfinite(S) and np.isfinite(T) and S > 0:
+            return S, T
+    # no usable straight line, start from the mean drawdown instead
+    return 1e-4, Q / (4 * np.pi * max(np.mean(s), 1e-12))
+
+
+def _residuals_and_jacobian(p, t, s, Q, r):
+    S, T = np.exp(p)
+    u = calculate_u(r, S, T, t)
+    scale = Q / (4 * np.pi * T)
+    model = scale * well_function(u)
+    e_u = scale * np.exp(-u)
+    jac = np.empty((2, t.size))
+    jac[0] = -e_u
+    jac[1] = e_u - model
+    return model - s, jac
+
+
+def levenberg_marquardt(evaluate, p):
+    """Minimise the sum of squared residuals over p = (ln S, ln T, ...).
+
+    evaluate(p) returns the residuals and their len(p) x n Jacobian.
+    Returns the final p, the cost, the number of iterations and whether it
+    converged, that is whether the step or the improvement of the cost fell
+    below its tolerance; running out of iterations, or out of damping with
+    no downhill step found, is reported as not converged.
+    """
+    res, jac = evaluate(p)
+    cost = res @ res
+    damping = 1e-3
+    converged = False
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        jtj = jac @ jac.T
+        grad = jac @ res
+        scaling = np.diag(np.maximum(np.diag(jtj), 1e-300))
+        accepted = False
+        while damping < 1e12:
+            step = np.linalg.solve(jtj + damping * scaling, -grad)
+            trial_res, trial_jac = evaluate(p + step)
+            trial_cost = trial_res @ trial_res
+            if np.isfinite(trial_cost) and trial_cost <= cost:
+                accepted = True
+                break
+            damping *= 10
+        if not accepted:
+            break
+        p = p + step
+        res, jac = trial_res, trial_jac
+        improvement = cost - trial_cost
+        cost = trial_cost
+        damping = max(damping / 10, 1e-12)
+        if np.max(np.abs(step)) < 1e-8 or improvement <= TOLERANCE * cost:
+            converged = True
+            break
+    return p, cost, iteration, converged
+
+
+def fit_theis(t, s, Q, r, S0=None, T0=None):
+    """Fit S and T of the Theis solution to time-drawdown data.
+
+    Starts from the Cooper-Jacob estimate unless S0 and T0 are given.
+    """
+    t = np.asarray(t, dtype=float)
+    s = np.asarray(s, dtype=float)
+    if S0 is None or T0 is None:
+        S0, T0 = cooper_jacob_seed(t, s, Q, r)
+
+    p, cost, iterations, converged = levenberg_marquardt(
+        lambda p: _residuals_and_jacobian(p, t, s, Q, r), np.log([S0, T0]))
+    S, T = np.exp(p)
+    rms_residual = np.sqrt(cost / t.size)
+    return TheisFit(float(S), float(T), float(rms_residual), iterations, converged)
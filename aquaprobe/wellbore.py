@@ -0,0 +1,154 @@
+"""Papadopulos-Cooper drawdown in a pumped well with wellbore storage and skin.
+
+For a fully penetrating well of screen radius r_w and casing radius r_c
+in a confined aquifer, the drawdown in the well s_w, as the dimensionless
+s_wD = 2 pi T s_w / Q, has the Laplace transform (in t_D = T t / (S r_w^2))
+
+    s_wD(p) = (K0(q) + sk q K1(q)) / (p (q K1(q) + C_D p (K0(q) + sk q K1(q))))
+
+with q = sqrt(p), skin factor sk and dimensionless wellbore storage
+C_D = r_c^2 / (2 S r_w^2) (Agarwal et al., 1970). With sk = 0 it is the
+Papadopulos and Cooper (1967) solution. A negative skin is modelled by the
+effective radius r_w e^-sk with no skin, which keeps the transform
+positive at the large p of early times.
+
+Early on the well casing supplies the water and s_w = Q t / (pi r_c^2);
+late on s_w follows the Cooper-Jacob line for the radius r_w e^-sk. Only
+the combination S e^-2sk shows there, so S and the skin cannot both be
+fitted to pumped-well data: fit_wellbore fits S and T without skin, or T
+and the skin with S known from elsewhere (an observation well).
+"""
+from collections import namedtuple
+from functools import partial
+
+import numpy as np
+from scipy.special import k0e, k1e
+
+from aquaprobe.laplace import invert, laplace_curve
+from aquaprobe.theis import cooper_jacob_seed, levenberg_marquardt
+
+STEP = 1e-6
+SEED_STORATIVITIES = np.geomspace(1e-7, 1e-1, 13)
+SEED_SKINS = np.linspace(-4, 20, 13)
+SEED_STARTS = 3
+
+WellboreFit = namedtuple('WellboreFit', 'S T skin C_D rms_residual iterations converged')
+
+
+def wellbore_storage(S, r_w, r_c):
+    """Dimensionless wellbore storage C_D."""
+    return r_c * r_c / (2 * S * r_w * r_w)
+
+
+def wellbore_laplace(p, C_D, skin):
+    """The transform s_wD(p) for an array of Laplace points p (skin >= 0).
+    The scaled Bessel functions share the factor e^-q, which cancels."""
+    p = np.asarray(p, dtype=float)
+    q = np.sqrt(p)
+    well = k0e(q) + skin * q * k1e(q)
+    return well / (p * (q * k1e(q) + C_D * p * well))
+
+
+def effective_radius(t_D, C_D, skin):
+    """t_D, C_D and skin for the effective radius r_w e^-skin when the skin
+    is negative, unchanged otherwise."""
+    if skin >= 0:
+        return t_D, C_D, skin
+    stretch = np.exp(2 * skin)
+    return t_D * stretch, C_D * stretch, 0.0
+
+
+def wellbore_dimensionless(t_D, C_D, skin=0.0):
+    """Dimensionless drawdown s_wD at t_D = T t / (S r_w^2), any shape of t_D."""
+    t_D, C_D, skin = effective_radius(np.asarray(t_D, dtype=float), C_D, skin)
+    return invert(partial(wellbore_laplace, C_D=C_D, skin=skin), t_D)
+
+
+def wellbore_drawdown(t, S, T, Q, r_w, r_c=None, skin=0.0):
+    """Drawdown in the pumped well at times t (days); r_c defaults to r_w."""
+    r_c = r_w if r_c is None else r_c
+    t = np.asarray(t, dtype=float)
+    t_D = T * t / (S * r_w * r_w)
+    return Q / (2 * np.pi * T) * wellbore_dimensionless(t_D, wellbore_storage(S, r_w, r_c), skin)
+
+
+def _model(t_D, C_D, skin):
+    """s_wD at t_D and d ln s_wD / d ln t_D, from one spline."""
+    t_D, C_D, skin = effective_radius(t_D, C_D, skin)
+    curve = laplace_curve(partial(wellbore_laplace, C_D=C_D, skin=skin), t_D)
+    x = np.log(t_D)
+    return np.exp(curve(x)), curve(x, 1)
+
+
+def _residuals_and_jacobian(p, t, s, Q, r_w, r_c, S_known):
+    # p is (ln S, ln T) without S_known and (ln T, skin) with it
+    if S_known is None:
+        (S, T), skin = np.exp(p), 0.0
+    else:
+        S, T, skin = S_known, np.exp(p[0]), p[1]
+    scale = Q / (2 * np.pi * T)
+    t_D = T * t / (S * r_w * r_w)
+    C_D = wellbore_storage(S, r_w, r_c)
+    shape, slope = _model(t_D, C_D, skin)
+    model = scale * shape
+    # s = Q / (2 pi T) s_wD(t_D, C_D, skin) with t_D = T t / (S r_w^2) and
+    # C_D proportional to 1 / S: d s_wD / d ln t_D comes from the spline,
+    # d s_wD / d ln C_D and d s_wD / d skin by differences
+    by_time = model * slope
+    jac = np.empty((2, t.size))
+    if S_known is None:
+        by_storage = (scale * _model(t_D, C_D * np.exp(STEP), skin)[0] - model) / STEP
+        jac[0] = -by_time - by_storage
+        jac[1] = by_time - model
+    else:
+        jac[0] = by_time - model
+        jac[1] = (scale * _model(t_D, C_D, skin + STEP)[0] - model) / STEP
+    return model - s, jac
+
+
+def wellbore_seeds(t, s, Q, r_w, r_c, S_known=None):
+    """Starting (S, T, skin) guesses, best first. T comes from Cooper-Jacob
+    on the last third (in log time) of the record, after the casing has
+    emptied; the SEED_STARTS best of SEED_STORATIVITIES (or of SEED_SKINS,
+    with S known) are kept for it."""
+    x = np.log(t)
+    late = x >= x.max() - (x.max() - x.min()) / 3
+    if np.count_nonzero(late) >= 3:
+        S, T = cooper_jacob_seed(t[late], s[late], Q, r_w)
+    else:
+        S, T = cooper_jacob_seed(t, s, Q, r_w)
+    if S_known is None:
+        seeds = [(S_seed, T, 0.0) for S_seed in SEED_STORATIVITIES]
+    else:
+        # late on S_known e^-2 skin stands in for the Cooper-Jacob S
+        skins = np.append(SEED_SKINS, 0.5 * np.log(S_known / S))
+        seeds = [(S_known, T, skin) for skin in skins]
+    costs = [np.sum((wellbore_drawdown(t, S, T, Q, r_w, r_c, skin) - s) ** 2)
+             for S, T, skin in seeds]
+    return [seeds[i] for i in np.argsort(costs)[:SEED_STARTS]]
+
+
+def fit_wellbore(t, s, Q, r_w, r_c=None, S=None):
+    """Fit the Papadopulos-Cooper solution to drawdown in the pumped well
+    (t in days): S and T without skin, or T and the skin if the
+    storativity S is given."""
+    t = np.asarray(t, dtype=float).ravel()
+    s = np.asarray(s, dtype=float).ravel()
+    r_c = r_w if r_c is None else r_c
+    seeds = wellbore_seeds(t, s, Q, r_w, r_c, S)
+
+    best = None
+    for seed_S, seed_T, seed_skin in seeds:
+        start = np.log([seed_S, seed_T]) if S is None else np.array([np.log(seed_T), seed_skin])
+        fit = levenberg_marquardt(
+            lambda p: _residuals_and_jacobian(p, t, s, Q, r_w, r_c, S), start)
+        if best is None or fit[1] < best[1]:
+            best = fit
+    p, cost, iterations, converged = best
+    if S is None:
+        (S, T), skin = np.exp(p), 0.0
+    else:
+        T, skin = np.exp(p[0]), p[1]
+    rms_residual = np.sqrt(cost / t.size)
+    return WellboreFit(float(S), float(T), float(skin), float(wellbore_storage(S, r_w, r_c)),
+                       float(rms_residual), iterations, converged)
@@ -0,0 +1,133 @@
+"""Head and drawdown maps of a field of pumping wells.
+
+In an unconfined aquifer the Dupuit-Forchheimer discharge potential h^2 is
+linear in the pumping rates, so the wells superpose in h^2:
+
+    h^2 = h0^2 - sum_i Q_i / (pi K) ln(r0_i / r_i)     (r_i < r0_i)
+
+where r0_i = sqrt(Q_i / (pi R)) is the radius of influence of well i for
+the recharge rate R. In a confined aquifer the Theis drawdowns of the
+wells superpose directly, and theis_field evaluates them on the grid at a
+series of times. Both grids are filled a block of rows at a time, one well
+at a time, so the working memory is a few blocks of CHUNK_SIZE cells
+besides the output grid, however fine the grid or large the field.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from aquaprobe.methods import radius_of_influence
+from aquaprobe.well_function import CHUNK_SIZE, theis_drawdown, well_function
+
+WELL_RADIUS = 0.1
+MARGIN = 0.2
+
+WellField = namedtuple('WellField', 'x y Q')
+Grid = namedtuple('Grid', 'x y h drawdown')
+TimeGrid = namedtuple('TimeGrid', 't x y drawdown')
+
+
+def make_well_field(x, y, Q):
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    Q = np.asarray(Q, dtype=float).ravel()
+    if x.size == 0 or not (x.size == y.size == Q.size):
+        raise ValueError('every well needs x, y and a discharge')
+    if not np.all(np.isfinite(x) & np.isfinite(y) & np.isfinite(Q)):
+        raise ValueError('well positions and discharges must be numbers')
+    return WellField(x, y, Q)
+
+
+def grid_extent(wells, reach):
+    """Bounds (x_min, x_max, y_min, y_max) covering every well's reach."""
+    pad = (1 + MARGIN) * np.max(reach)
+    return (wells.x.min() - pad, wells.x.max() + pad,
+            wells.y.min() - pad, wells.y.max() + pad)
+
+
+def _fill(x, y, potential, wells, weights, reach, well_radius):
+    """Add sum_i weights_i * ln(reach_i / r_i) (where r_i < reach_i) onto
+    potential, block by block over the rows of the grid."""
+    block = max(1, CHUNK_SIZE // x.size)
+    min_r_sq = well_radius * well_radius
+    for start in range(0, y.size, block):
+        rows = potential[start:start + block]
+        dy = y[start:start + block, None]
+        for xi, yi, weight, reach_i in zip(wells.x, wells.y, weights, reach):
+            if weight == 0 or reach_i <= 0:
+                continue
+            r_sq = (x[None, :] - xi)**2 + (dy - yi)**2
+            np.maximum(r_sq, min_r_sq, out=r_sq)
+            # ln(reach / r) = 0.5 ln(reach^2 / r^2), clipped at the reach
+            term = np.log(reach_i * reach_i / r_sq)
+            np.maximum(term, 0, out=term)
+            rows += 0.5 * weight * term
+    return potential
+
+
+def dupuit_field(wells, R, K, h0, extent=None, nx=400, ny=400, well_radius=WELL_RADIUS):
+    """Head and drawdown of a well field on an nx by ny grid.
+
+    extent is (x_min, x_max, y_min, y_max); by default it covers the radius
+    of influence of every well. Wells with Q <= 0 are left out. Cells where
+    the superposed h^2 drops below zero (the aquifer is dewatered) have a
+    head of 0.
+    """
+    reach = np.array([radius_of_influence(R, Q) if Q > 0 else 0.0 for Q in wells.Q])
+    if extent is None:
+        extent = grid_extent(wells, reach)
+    x = np.linspace(extent[0], extent[1], nx)
+    y = np.linspace(extent[2], extent[3], ny)
+    h_sq = np.full((ny, nx), float(h0) ** 2)
+    _fill(x, y, h_sq, wells, -wells.Q / (np.pi * K), reach, well_radius)
+    h = np.sqrt(np.maximum(h_sq, 0, out=h_sq), out=h_sq)
+    return Grid(x, y, h, h0 - h)
+
+
+def theis_reach(S, T, t):
+    """Cooper-Jacob radius of influence sqrt(2.25 T t / S) at time t."""
+    return np.sqrt(2.25 * T * t / S)
+
+
+def theis_field(wells, S, T, times, extent=None, nx=200, ny=200, well_radius=WELL_RADIUS,
+                dtype=np.float32):
+    """Theis drawdown of a well field at each of times (days) on an nx by ny
+    grid.
+
+    Returns a TimeGrid whose drawdown has shape (len(times), ny, nx) and is
+    stored as dtype; float32 keeps a 500 x 500 x 50 cube to 50 MB. Each
+    block of rows is worked out for every time at once, so the block holds
+    at most CHUNK_SIZE cells. extent defaults to the Cooper-Jacob radius of
+    influence at the last time around every well. Wells with Q < 0 inject.
+    """
+    times = np.asarray(times, dtype=float).ravel()
+    if times.size == 0 or np.any(times <= 0):
+        raise ValueError('times must be positive')
+    if extent is None:
+        extent = grid_extent(wells, theis_reach(S, T, times.max()))
+    x = np.linspace(extent[0], extent[1], nx)
+    y = np.linspace(extent[2], extent[3], ny)
+    drawdown = np.empty((times.size, ny, nx), dtype=dtype)
+    # u = r^2 S / (4 T t) = r^2 * scale, one scale per time
+    scale = (S / (4 * T * times))[:, None, None]
+    min_r_sq = well_radius * well_radius
+    block = max(1, CHUNK_SIZE // (nx * times.size))
+    for start in range(0, ny, block):
+        dy = y[start:start + block, None]
+        rows = np.zeros((times.size, dy.shape[0], nx))
+        for xi, yi, Qi in zip(wells.x, wells.y, wells.Q):
+            if Qi == 0:
+                continue
+            r_sq = (x[None, :] - xi)**2 + (dy - yi)**2
+            np.maximum(r_sq, min_r_sq, out=r_sq)
+            rows += Qi / (4 * np.pi * T) * well_function(r_sq * scale)
+        drawdown[:, start:start + block] = rows
+    return TimeGrid(times, x, y, drawdown)
+
+
+def interference(wells, S, T, t, well_radius=WELL_RADIUS):
+    """Theis drawdown at each well caused by each well at time t (days):
+    entry [i, j] is the drawdown at well i due to pumping well j, and the
+    diagonal is each well's own drawdown at well_radius."""
+    r = np.hypot(wells.x[:, None] - wells.x[None, :], wells.y[:, None] - wells.y[None, :])
+    return theis_drawdown(t, S, T, wells.Q[None, :], np.maximum(r, well_radius))
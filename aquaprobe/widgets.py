@@ -0,0 +1,283 @@
+"""Streamlit components shared by the pages."""
+import math
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from aquaprobe.archive import find_tests, load_test, save_test
+from aquaprobe.bootstrap import CONFIDENCE, RESAMPLING_METHODS
+from aquaprobe.cache import cached, lookup, make_key, store
+from aquaprobe.derivative import WINDOW, bourdet_derivative
+from aquaprobe.plots import plot_diagnostic, render_png
+from aquaprobe.readings import ReadingBuffer, complete, parse_readings
+from aquaprobe.segments import MIN_CYCLES, best_line_window
+from aquaprobe.superposition import make_schedule
+
+PAGE_SIZE = 25
+SCHEDULE_COLUMNS = ['Start (mins)', 'Rate (m3/day)']
+
+_report_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='report')
+
+
+def highlight_styles(window, mask, color='red'):
+    """CSS for every cell of window, coloured where the row mask is set."""
+    rows = np.asarray(mask.loc[window.index], dtype=bool)
+    css = np.where(rows, 'background-color: {}'.format(color), '')
+    return pd.DataFrame(np.repeat(css[:, None], window.shape[1], axis=1),
+                        index=window.index, columns=window.columns)
+
+
+def paginated_table(df, key, highlight=None, formats=None, page_size=PAGE_SIZE):
+    """Render one page of df at a time, with summary statistics of the whole frame.
+
+    Only the visible window is styled and sent to the browser. highlight is
+    an optional boolean Series aligned with df marking rows to colour red.
+    The page shown is kept across reruns, and moved back to the last page
+    if df has shrunk below it.
+    """
+    n_pages = max(1, math.ceil(len(df) / page_size))
+    if n_pages > 1:
+        page_key = key + '_page'
+        if st.session_state.get(page_key, 1) > n_pages:
+            st.session_state[page_key] = n_pages
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            page = st.number_input('Page', min_value=1, max_value=n_pages, key=page_key)
+        start = (page - 1) * page_size
+        end = min(start + page_size, len(df))
+        with col2:
+            st.write('')
+            st.caption(f'Rows {start} to {end - 1} of {len(df)} ({n_pages} pages)')
+        window = df.iloc[start:end]
+    else:
+        window = df
+
+    if highlight is not None or formats:
+        styler = window.style
+        if highlight is not None:
+            styler = styler.apply(highlight_styles, axis=None, mask=highlight)
+        if formats:
+            styler = styler.format(formats)
+        st.table(styler)
+    else:
+        st.table(window)
+
+    if n_pages > 1:
+        with st.expander('Summary statistics'):
+            st.table(df.describe())
+
+
+def _editor_key(key):
+    return f'{key}_grid_{st.session_state[key].version}'
+
+
+def _add_pasted(key, names):
+    buffer = st.session_state[key]
+    try:
+        rows = parse_readings(st.session_state[key + '_paste'], len(names))
+    except ValueError as e:
+        st.session_state[key + '_error'] = str(e)
+        return
+    # keep what was typed into the grid before adding the pasted readings
+    buffer.commit(st.session_state.get(_editor_key(key)), names)
+    buffer.insert(rows)
+    st.session_state[key + '_paste'] = ''
+
+
+def _clear_readings(key):
+    st.session_state[key].clear()
+
+
+def reading_editor(key, names, labels):
+    """Manual entry of readings: a grid to type, edit and delete them in
+    and a box to paste many at once from a spreadsheet.
+
+    The readings live in a ReadingBuffer in the session state. The grid
+    only sends back the cells and rows that changed, which are applied to
+    the buffer in one go; the buffer itself is only rewritten when readings
+    are pasted or cleared. Returns the complete readings as a frame with
+    the columns names (shown as labels).
+    """
+    if key not in st.session_state:
+        st.session_state[key] = ReadingBuffer(len(names))
+    buffer = st.session_state[key]
+
+    with st.expander('Paste readings'):
+        st.text_area('One reading per line, ' + ' and '.join(labels) +
+                     ', separated by tabs, commas or spaces', key=key + '_paste')
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button('Add pasted readings', on_click=_add_pasted, args=(key, names),
+                      key=key + '_add')
+        with col2:
+            st.button('Clear all readings', on_click=_clear_readings, args=(key,),
+                      key=key + '_clear')
+        error = st.session_state.pop(key + '_error', None)
+        if error:
+            st.warning(f'Incorrect readings pasted - {error}')
+
+    column_config = {name: st.column_config.NumberColumn(label, min_value=0.0)
+                     for name, label in zip(names, labels)}
+    st.data_editor(buffer.frame(names), num_rows='dynamic', column_config=column_config,
+                   width='stretch', key=_editor_key(key))
+    columns = complete(buffer.edited(st.session_state.get(_editor_key(key)), names))
+    st.caption(f'{columns.shape[1]} readings')
+    return pd.DataFrame(dict(zip(names, columns)))
+
+
+def segment_selector(x, y, key, name, late='high'):
+    """Offer to fit only the straightest late semi-log segment of y against x.
+
+    Returns the mask of the proposed segment, or None to fit every reading.
+    """
+    if not st.checkbox('Fit the best straight-line segment automatically', key=key):
+        return None
+    min_cycles = st.slider('Minimum segment length (log cycles)', min_value=0.5,
+                           max_value=3.0, value=MIN_CYCLES, step=0.25, key=key + '_cycles')
+    window = cached(best_line_window, np.log(np.asarray(x, dtype=float)), y, min_cycles, late)
+    if window is None:
+        st.warning('Too few readings to search for a straight-line segment')
+        return None
+    st.info(f'Best straight-line segment: {name} from {np.exp(window.x_start):.5g} '
+            f'to {np.exp(window.x_end):.5g} ({np.count_nonzero(window.mask)} readings)')
+    return window.mask
+
+
+def diagnostic_plot(t, s, key, xlabel='Time'):
+    """Log-log plot of drawdown and its Bourdet derivative, with the
+    smoothing window of the derivative on a slider."""
+    png = st.empty()
+    window = st.slider('Derivative smoothing window (ln time)', min_value=0.0, max_value=0.5,
+                       value=WINDOW, step=0.05, key=key)
+    derivative = cached(bourdet_derivative, t, s, window)
+    png.image(cached(render_png, plot_diagnostic, t, s, derivative, xlabel), width='stretch')
+
+
+def interval_selector(key):
+    """Offer confidence intervals of the fitted parameters by resampling.
+
+    Returns the resampling method (None for no intervals) and the
+    confidence level.
+    """
+    if not st.checkbox('Confidence intervals (bootstrap or jackknife)', key=key):
+        return None, CONFIDENCE
+    col1, col2 = st.columns(2)
+    with col1:
+        method = st.radio('Resampling', RESAMPLING_METHODS, horizontal=True,
+                          format_func=str.capitalize, key=key + '_method')
+    with col2:
+        confidence = st.select_slider('Confidence level', options=[0.8, 0.9, 0.95, 0.99],
+                                      value=CONFIDENCE, format_func=lambda c: f'{c:.0%}',
+                                      key=key + '_confidence')
+    return method, confidence
+
+
+def schedule_editor(key, Q, label='Variable pumping rate (step test)'):
+    """Optional table of pumping steps, starting from the constant rate Q.
+
+    Returns a Schedule with start times in mins, or None for a constant rate.
+    """
+    if not st.checkbox(label, key=key):
+        return None
+    st.caption('Each row is a step: the well pumps at the given rate from its start time '
+               'until the next step starts.')
+    steps = st.data_editor(pd.DataFrame({SCHEDULE_COLUMNS[0]: [0.0], SCHEDULE_COLUMNS[1]: [Q]}),
+                           num_rows='dynamic', key=key + '_steps')
+    steps = steps.dropna().sort_values(SCHEDULE_COLUMNS[0])
+    try:
+        return make_schedule(steps[SCHEDULE_COLUMNS[0]], steps[SCHEDULE_COLUMNS[1]])
+    except ValueError as e:
+        st.error(f'Invalid pumping schedule - {e}')
+        st.stop()
+
+
+def archive_loader(method, key):
+    """Pick an archived test of method; returns its readings, or None if
+    the archive holds no matching test. Its stored results are shown."""
+    location = st.text_input('Search location', key=key + '_location')
+    tests = find_tests(method, location)
+    if tests.empty:
+        st.info('No archived tests found')
+        return None
+    labels = {row.id: f'#{row.id} {row.location or "(no location)"}, '
+                      f'{row.performed_on or "no date"}, saved {row.saved_at}'
+              for row in tests.itertuples()}
+    test_id = st.selectbox('Archived test', list(labels), format_func=labels.get,
+                           key=key + '_test')
+    test = load_test(test_id)
+    st.caption(', '.join(f'{name}: {value}' for name, value in test.meta.items() if value) or
+               'No metadata')
+    st.info('Archived inputs: ' + ', '.join(f'{name} = {value:.5g}'
+                                            for name, value in test.parameters.items()
+                                            if value is not None))
+    st.info('Archived results: ' + ', '.join(f'{name} = {value:.5g}'
+                                             for name, value in test.results.items()
+                                             if value is not None))
+    return test.df
+
+
+def archive_saver(method, key, meta, parameters, df, results):
+    """A button that stores the test in the local archive."""
+    if st.button('Save to archive', key=key):
+        try:
+            test_id = save_test(method, meta, parameters, df, results)
+        except sqlite3.Error as e:
+            st.error(f'The test could not be saved to the archive - {e}')
+            return
+        st.success(f'Saved as archived test #{test_id}')
+
+
+class _Progress:
+
+    def __init__(self):
+        self.value = 0.0
+
+    def __call__(self, fraction):
+        self.value = fraction
+
+
+def _build_and_store(report_key, build, args, progress):
+    data = build(*args, progress=progress)
+    store(report_key, data)
+    return data
+
+
+def report_download(key, file_name, build, *args):
+    """Offer a PDF report that is only built when the user asks for it.
+
+    build(*args, progress=...) runs on a worker thread, but the script
+    waits for it: the thread is only there so the script can move the
+    progress bar while the report is built. The bytes are kept in the
+    result cache, so the same report is never built twice and later reruns
+    go straight to the download button. If the build fails the error is
+    shown and the next click tries again.
+    """
+    report_key = make_key(build, *args)
+    data = lookup(report_key)
+    if data is None:
+        job = st.session_state.get(key)
+        if job is None or job[0] != report_key:
+            if not st.button('Generate Report', key=key + '_generate'):
+                return
+            progress = _Progress()
+            future = _report_executor.submit(_build_and_store, report_key, build, args, progress)
+            job = (report_key, future, progress)
+            st.session_state[key] = job
+        _, future, progress = job
+        bar = st.progress(0.0, text='Building report...')
+        while not future.done():
+            bar.progress(min(progress.value, 1.0), text='Building report...')
+            time.sleep(0.1)
+        bar.empty()
+        try:
+            data = future.result()
+        except Exception as e:
+            # forget the failed job, so it is not re-raised on every rerun
+            st.session_state.pop(key, None)
+            st.error(f'The report could not be built - {e}')
+            return
+    st.download_button("Download Report", data=data, file_name=file_name, key=key + '_download')
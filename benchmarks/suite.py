@@ -0,0 +1,344 @@
+"""Time every analysis method on synthetic tests from 10 to 10^6 readings.
+
+Run from the repository root:
+
+    python -m benchmarks.suite                  # compare against baselines.json
+    python -m benchmarks.suite --save           # record new baselines
+    python -m benchmarks.suite -m theis -n 1e5  # a subset
+
+Each test goes through the same stages as the CLI: ingest (read the CSV),
+fit (the method), plot (render the PNG) and report (build the PDF). Every
+stage is timed (best of --repeat runs, or of as many as take MIN_TIMED
+seconds for fast stages) and its peak Python memory is measured with
+tracemalloc in a separate run. The report stage writes one table row per
+reading, so it is skipped above REPORT_MAX_ROWS, and the slower fitters
+stop at their MAX_ROWS.
+
+Wall-clock times depend on the machine, so each run also times a fixed
+NumPy reference kernel and every stage is compared in units of it: the
+baselines store seconds / reference seconds. A stage is flagged when its
+relative time is more than --tolerance times its baseline and it is at
+least --min-slowdown seconds slower than the baseline (scaled to this
+run), and the exit status is 1 if any stage regressed.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from functools import partial
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+
+from aquaprobe import methods, plots
+from aquaprobe.boundaries import make_layout
+from aquaprobe.cli import METHODS, Method
+from aquaprobe.leaky import hantush_drawdown
+from aquaprobe.neuman import neuman_drawdown
+from aquaprobe.plots import render_png
+from aquaprobe.report import build_report
+from aquaprobe.superposition import make_schedule, schedule_drawdown
+from aquaprobe.well_function import theis_drawdown
+from aquaprobe.wellbore import wellbore_drawdown
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+REPORT_MAX_ROWS = 1_000
+TOLERANCE = 1.5
+# slowdown in seconds below which a stage is never flagged, as stages of
+# up to about a hundred ms (plots in particular) vary by more than
+# TOLERANCE between runs
+MIN_SLOWDOWN = 0.05
+MIN_TIMED = 0.5
+REFERENCE_KEY = 'reference'
+REFERENCE_SIZE = 1_000_000
+REFERENCE_CALLS = 2_500
+
+# aquifer used to generate the synthetic readings
+Q = 2500.0
+T = 800.0
+S = 2e-4
+R = 60.0
+T_STOP = 1440.0
+NOISE = 0.01
+R_BY_B = 0.1
+SY = 0.1
+BETA = 0.5
+R_W = 0.1
+# steps of the variable-rate test (start in mins, rate in m3/day)
+STEPS = ((0.0, 1500.0), (1440.0, 2500.0), (2880.0, 3500.0))
+ANGLE = 30.0
+DISTANCE = 200.0
+LAYOUT = make_layout('straight', ['barrier'])
+
+
+def _plot_theis_schedule(results, df, params):
+    return plots.plot_theis(df['Time']/1440, df['Drawdown'], results['S'], results['T'],
+                            params['Q'], params['r'], methods.schedule_in_days(SCHEDULE))
+
+
+def _plot_image_wells(results, df, params):
+    x, y = methods.observation_point(params['r'], ANGLE)
+    return plots.plot_image_wells(df, results, x, y, LAYOUT)
+
+
+SCHEDULE = make_schedule(*zip(*STEPS))
+# methods the pages offer beyond the CLI, run the same way
+SUITE_METHODS = dict(METHODS, **{
+    'theis-schedule': Method('Theis Test Report', ('Time', 'Drawdown'), ('Q', 'r'),
+                             partial(methods.theis, schedule=SCHEDULE), _plot_theis_schedule),
+    'theis-bootstrap': Method('Theis Test Report', ('Time', 'Drawdown'), ('Q', 'r'),
+                              partial(methods.theis, resampling='bootstrap'),
+                              METHODS['theis'].plot),
+    'image-wells': Method('Image Wells Test Report', ('Time', 'Drawdown'), ('Q', 'r'),
+                          partial(methods.image_well_theis, angle=ANGLE, layout=LAYOUT),
+                          _plot_image_wells),
+})
+METHOD_NAMES = ('theis', 'theis-schedule', 'theis-bootstrap', 'cooper-jacob-time',
+                'cooper-jacob-distance', 'theis-recovery', 'thiem-piezometers',
+                'dupuit-forchheimer', 'hantush-jacob', 'neuman', 'papadopulos-cooper',
+                'image-wells')
+# the nonlinear fitters that refit many times are only run up to here
+MAX_ROWS = {'theis-bootstrap': 1_000, 'hantush-jacob': 100_000, 'neuman': 100_000,
+            'papadopulos-cooper': 100_000, 'image-wells': 100_000}
+
+Case = namedtuple('Case', 'method data params')
+
+
+def noisy(s, rng):
+    return s * (1 + NOISE*rng.standard_normal(s.size))
+
+
+def readings(t, s, rng):
+    return pd.DataFrame({'Time': t, 'Drawdown': noisy(s, rng)})
+
+
+def recovery_readings(n, rng):
+    t_dash = np.geomspace(1, 1e4, n)
+    residual = (theis_drawdown((T_STOP + t_dash)/1440, S, T, Q, R)
+                - theis_drawdown(t_dash/1440, S, T, Q, R))
+    return pd.DataFrame({'t_dash': t_dash, 'Residual_Drawdown': noisy(residual, rng)})
+
+
+def distance_readings(n, rng):
+    r = np.geomspace(5, 500, n)
+    s = theis_drawdown(T_STOP/1440, S, T, Q, r)
+    return pd.DataFrame({'Distance': r, 'Drawdown': noisy(s, rng)})
+
+
+def piezometer_readings(n, rng):
+    r = np.geomspace(5, 500, n)
+    h = 30.0 + Q/(2*np.pi*T)*np.log(r) + NOISE*rng.standard_normal(n)
+    return pd.DataFrame({'r': r, 'h': h})
+
+
+def make_cases(n, rng):
+    """The synthetic tests of n readings (n radii for Dupuit-Forchheimer)."""
+    t = np.geomspace(1, 1e4, n)
+    days = t/1440
+    x, y = methods.observation_point(R, ANGLE)
+    theis = readings(t, theis_drawdown(days, S, T, Q, R), rng)
+    image = methods.boundary_drawdown(days, S, T, Q, x, y, LAYOUT, DISTANCE)
+    return [
+        Case('theis', theis, dict(Q=Q, r=R)),
+        Case('theis-schedule', readings(
+            t, schedule_drawdown(days, methods.schedule_in_days(SCHEDULE), S, T, R), rng),
+            dict(Q=Q, r=R)),
+        Case('theis-bootstrap', theis, dict(Q=Q, r=R)),
+        Case('cooper-jacob-time', theis, dict(Q=Q, r=R)),
+        Case('cooper-jacob-distance', distance_readings(n, rng), dict(Q=Q, t=T_STOP)),
+        Case('theis-recovery', recovery_readings(n, rng),
+             dict(Q=Q, t_when_pumping_stopped=T_STOP)),
+        Case('thiem-piezometers', piezometer_readings(n, rng), dict(Q=Q)),
+        Case('dupuit-forchheimer', None, dict(R=0.0012, Q=Q, K=100.0, h0=30.0, r1=5.0)),
+        Case('hantush-jacob', readings(t, hantush_drawdown(days, S, T, Q, R, R_BY_B), rng),
+             dict(Q=Q, r=R)),
+        Case('neuman', readings(t, neuman_drawdown(days, S, T, SY, BETA, Q, R), rng),
+             dict(Q=Q, r=R)),
+        Case('papadopulos-cooper', readings(t, wellbore_drawdown(days, S, T, Q, R_W), rng),
+             dict(Q=Q, r_w=R_W)),
+        Case('image-wells', readings(t, image, rng), dict(Q=Q, r=R)),
+    ]
+
+
+def reference_kernel(rng=np.random.default_rng(0)):
+    """A fixed mix of the work the stages do: whole-array NumPy (sorting,
+    transcendental functions and a matrix product) as in the fits, and
+    interpreter-bound small-array calls and number formatting as in the
+    plots, reports and short records."""
+    x = rng.random(REFERENCE_SIZE)
+    np.sort(x)
+    np.exp(-x) * np.log(x)
+    a = x[:250_000].reshape(500, 500)
+    a @ a
+    small = x[:8]
+    for i in range(REFERENCE_CALLS):
+        float(np.sum(small * i))
+    ','.join(f'{value:.6g}' for value in x[:REFERENCE_CALLS])
+
+
+def measure(func, repeat):
+    """Best wall time of func() over at least repeat runs, and as many more
+    as fit in MIN_TIMED seconds, and its peak traced memory."""
+    tracemalloc.start()
+    try:
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    best = float('inf')
+    runs, timed = 0, 0.0
+    while runs < repeat or timed < MIN_TIMED:
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        best = min(best, seconds)
+        runs += 1
+        timed += seconds
+    return result, best, peak
+
+
+def run_case(case, n, directory, repeat):
+    """Yield (stage, seconds, peak bytes) for every stage of one case."""
+    method = SUITE_METHODS[case.method]
+    args = [case.params[p] for p in method.params]
+
+    if case.data is None:
+        yield 'ingest', None, None
+        (results, df), seconds, peak = measure(
+            lambda: methods.dupuit_forchheimer(*args, n_points=n), repeat)
+    else:
+        path = os.path.join(directory, f'{case.method}_{n}.csv')
+        case.data.to_csv(path, index=False)
+        data, seconds, peak = measure(lambda: pd.read_csv(path), repeat)
+        yield 'ingest', seconds, peak
+        columns = [data[col] for col in method.columns]
+        (results, df), seconds, peak = measure(lambda: method.run(*columns, *args), repeat)
+    yield 'fit', seconds, peak
+
+    png, seconds, peak = measure(lambda: render_png(method.plot, results, df, case.params),
+                                 repeat)
+    yield 'plot', seconds, peak
+
+    if len(df) > REPORT_MAX_ROWS:
+        yield 'report', None, None
+    else:
+        _, seconds, peak = measure(
+            lambda: build_report(method.title, case.params, results, df, png), repeat)
+        yield 'report', seconds, peak
+
+
+def run_suite(method_names, sizes, repeat):
+    """Timings of every stage, with their ratio to the reference kernel,
+    and the reference time."""
+    _, reference, _ = measure(reference_kernel, max(repeat, 5))
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            # seeded by size, so a subset run fits the same readings as the
+            # full run the baselines came from
+            rng = np.random.default_rng([0, n])
+            cases = [case for case in make_cases(n, rng) if case.method in method_names
+                     and n <= MAX_ROWS.get(case.method, n)]
+            for case in cases:
+                for stage, seconds, peak in run_case(case, n, directory, repeat):
+                    if seconds is None:
+                        continue
+                    rows.append({'method': case.method, 'rows': n, 'stage': stage,
+                                 'seconds': seconds, 'peak_mb': peak / 2**20})
+                    print(f'{case.method:>21} {n:>9} {stage:>7} {seconds*1000:10.2f} ms '
+                          f'{peak / 2**20:9.2f} MB', flush=True)
+    # the reference is timed again at the end, so a machine that was busy
+    # at the start does not skew the whole run
+    reference = min(reference, measure(reference_kernel, max(repeat, 5))[1])
+    print(f'{"reference":>21} {"":>9} {"":>7} {reference*1000:10.2f} ms', flush=True)
+    results = pd.DataFrame(rows, columns=['method', 'rows', 'stage', 'seconds', 'peak_mb'])
+    results.insert(4, 'relative', results['seconds'] / reference)
+    return results, reference
+
+
+def baseline_key(row):
+    return f'{row.method}/{row.rows}/{row.stage}'
+
+
+def load_baselines(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return dict()
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baselines(results, reference, path=BASELINES_PATH):
+    baselines = load_baselines(path)
+    baselines[REFERENCE_KEY] = {'seconds': round(reference, 6)}
+    for row in results.itertuples():
+        baselines[baseline_key(row)] = {'seconds': round(row.seconds, 6),
+                                        'relative': round(row.relative, 4),
+                                        'peak_mb': round(row.peak_mb, 3)}
+    with open(path, 'w') as f:
+        json.dump(dict(sorted(baselines.items())), f, indent=1)
+        f.write('\n')
+
+
+def compare(results, baselines, reference, tolerance=TOLERANCE, min_slowdown=MIN_SLOWDOWN):
+    """results with the baseline figures, the slowdown ratio (of the times
+    relative to the reference kernel), the slowdown in seconds of this run
+    and a regression flag."""
+    base = [baselines.get(baseline_key(row), {}) for row in results.itertuples()]
+    compared = results.copy()
+    compared['base_relative'] = [b.get('relative', np.nan) for b in base]
+    compared['base_peak_mb'] = [b.get('peak_mb', np.nan) for b in base]
+    compared['ratio'] = compared['relative'] / compared['base_relative']
+    compared['slowdown'] = compared['seconds'] - compared['base_relative'] * reference
+    compared['regressed'] = ((compared['ratio'] > tolerance)
+                             & (compared['slowdown'] >= min_slowdown))
+    return compared
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmarks.suite',
+                                     description='Benchmark every analysis method.')
+    parser.add_argument('-m', '--method', action='append', choices=METHOD_NAMES,
+                        help='method to run (repeatable, default: all)')
+    parser.add_argument('-n', '--rows', action='append', type=lambda v: int(float(v)),
+                        help='number of readings (repeatable, default: 10 to 10^6)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='timed runs per stage, the best is kept')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='slowdown ratio flagged as a regression')
+    parser.add_argument('--min-slowdown', type=float, default=MIN_SLOWDOWN,
+                        help='seconds a stage must slow down by to be flagged')
+    parser.add_argument('--save', action='store_true',
+                        help='store the timings as the new baselines')
+    parser.add_argument('-o', '--output', help='also write the comparison to this CSV')
+    args = parser.parse_args(argv)
+
+    results, reference = run_suite(args.method or METHOD_NAMES, args.rows or SIZES,
+                                   args.repeat)
+
+    if args.save:
+        save_baselines(results, reference)
+        print(f'baselines saved to {BASELINES_PATH}')
+        return 0
+
+    compared = compare(results, load_baselines(), reference, args.tolerance,
+                       args.min_slowdown)
+    if args.output:
+        compared.to_csv(args.output, index=False)
+    print()
+    print(compared.to_string(index=False, float_format=lambda v: f'{v:.4g}'))
+    regressed = compared[compared['regressed']]
+    for row in regressed.itertuples():
+        print(f'REGRESSION {baseline_key(row)}: {row.relative:.4g} '
+              f'vs {row.base_relative:.4g} reference kernels ({row.ratio:.2f}x, '
+              f'{row.slowdown*1000:.1f} ms slower)')
+    return 1 if len(regressed) else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,41 @@
+"""Time the tabulated W(u) against scipy's exp1 on a few million points.
+
+Run from the repository root: python -m benchmarks.well_function
+"""
+import time
+
+import numpy as np
+from scipy.special import exp1
+
+from aquaprobe.well_function import get_table, theis_drawdown, well_function
+
+N_POINTS = 4_000_000
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    table, build_time = timed(get_table)
+    print(f'table build: {build_time*1000:.1f} ms, {len(table.y)} nodes, '
+          f'max rel error {table.max_rel_error:.2e}')
+
+    rng = np.random.default_rng(0)
+    u = 10 ** rng.uniform(-9, 2, N_POINTS)
+    w_table, t_table = timed(well_function, u)
+    w_exact, t_exact = timed(exp1, u)
+    rel_err = np.max(np.abs(w_table - w_exact) / w_exact)
+    print(f'W(u), {N_POINTS} points: table {t_table*1000:.0f} ms, '
+          f'exp1 {t_exact*1000:.0f} ms, max rel error {rel_err:.2e}')
+
+    t = np.logspace(-4, 1, 2000)[:, None]
+    r = np.linspace(1, 500, 2000)[None, :]
+    _, t_drawdown = timed(theis_drawdown, t, 2e-4, 800.0, 2500.0, r)
+    print(f'theis_drawdown, {t.size * r.size} (r, t) points: {t_drawdown*1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,21 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from scipy.special import exp1
-from fpdf import FPDF
 from datetime import date, datetime
 import images
+from aquaprobe.cache import cached
+from aquaprobe.batch import BATCH_COLUMNS, fit_theis_batch
+from aquaprobe.ingest import LARGE_FILE_BYTES, read_logger
+from aquaprobe.methods import schedule_in_days
+from aquaprobe.misfit import confidence_extent, misfit_surface
+from aquaprobe.plots import plot_misfit, plot_theis, plot_time_drawdown, plot_wellbore, render_png
+from aquaprobe.bootstrap import theis_intervals
+from aquaprobe.report import build_theis_report, csv_bytes, interval_lines
+from aquaprobe.superposition import fit_schedule
+from aquaprobe.theis import fit_theis
+from aquaprobe.wellbore import fit_wellbore
+from aquaprobe.widgets import (archive_loader, archive_saver, diagnostic_plot, interval_selector,
+                               paginated_table, reading_editor, report_download, schedule_editor)
 
 st.set_page_config(page_title="Theis", page_icon="🌊",
                    layout="wide", initial_sidebar_state="auto", menu_items=None)
@@ -81,54 +91,39 @@ Q = st.number_input('Pumping rate from well (m3/day)',
                         min_value=0.000, format="%.3f")
 r = st.number_input('Distance from well (m)',
                         min_value=0.000, format="%.3f")
+schedule = schedule_editor('theis_schedule', Q)
+pumped_well = st.checkbox('Readings are from the pumped well',
+                          help='Fits the Papadopulos-Cooper solution with wellbore storage, '
+                               'taking the well diameter as the screen and casing diameter (m)')
+if pumped_well:
+    known_S = st.number_input('Storativity, if known from an observation well (fits the skin factor)',
+                              min_value=0.0, format="%.7f")
 st.markdown("""---""")
 
 input_method = st.radio('Choose a method for input of data',
-                            ('Upload File', 'Fill Form'), horizontal=True)
-
-if 'theis_time' not in st.session_state:
-    st.session_state.theis_time = list()
-if 'theis_drawdown' not in st.session_state:
-    st.session_state.theis_drawdown = list()
-if 'exception_status' not in st.session_state:
-    st.session_state.exception_status = False
-
-def form_callback(t, s):
-        st.session_state.theis_time.append(t)
-        st.session_state.theis_drawdown.append(s)
-
-def delete():
-    try:
-        del st.session_state.theis_time[del_index]
-        del st.session_state.theis_drawdown[del_index]
-    except:
-        st.session_state.exception_status = True
-
-    if(input_method == 'Fill Form'):
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.write('Add Reading')
-            time_data = st.number_input(
-                'Time (days)', min_value=0.0, format="%.2f")
-            drawdown_data = st.number_input(
-                'Drawdown (m)', min_value=0.0, format="%.2f")
-            submit = st.button(label='Enter data', on_click=form_callback, args=(
-                time_data, drawdown_data))
-
-        with col2:
-            st.write('Delete Reading')
-            del_index = st.number_input('Index', min_value=0)
-            del_button = st.button('Delete', on_click=delete)
-            if st.session_state.exception_status == True:
-                st.warning('Incorrect Index Entered')
-                st.session_state.exception_status = False
-
-        if 'theis_time' in st.session_state:
-            df = pd.DataFrame({'Time': st.session_state.theis_time,
-                               'Drawdown': st.session_state.theis_drawdown})
-            st.table(df)
+                            ('Upload File', 'Fill Form', 'Batch Upload', 'Archive'),
+                            horizontal=True)
+
+if(input_method == 'Fill Form'):
+
+    df = reading_editor('theis_form', ['Time', 'Drawdown'],
+                        ['Time (days)', 'Drawdown (m)'])
+
+if(input_method == 'Batch Upload'):
+
+    batch_file = st.file_uploader("Choose a file", key='theis_batch_file')
+    st.warning('Please keep the data in long format with the columns ' +
+               ', '.join(BATCH_COLUMNS) + ' (time in mins, drawdown in m)')
+    if(batch_file):
+        try:
+            summary = cached(fit_theis_batch, pd.read_csv(batch_file))
+        except ValueError as e:
+            st.error(f'Invalid batch file - {e}')
+            st.stop()
+        paginated_table(summary, key='theis_batch')
+        st.download_button(label="Download CSV", data=cached(
+            csv_bytes, summary), file_name='Theis_Batch'+datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+'.csv')
+    st.stop()
 
 if(input_method == 'Upload File'):
 
@@ -136,8 +131,21 @@ if(input_method == 'Upload File'):
     st.warning(
             'Please keep the data in two columns as Time (days) and Drawdown (m) resepectively')
     if(uploaded_file):
-        df = pd.read_csv(uploaded_file)
-        st.table(df)
+        stream_file = st.checkbox('Reduce to log-spaced time bins (for large logger files)',
+                                  value=uploaded_file.size > LARGE_FILE_BYTES)
+        if stream_file:
+            df = read_logger(uploaded_file)
+            st.info(f'Data reduced to {len(df)} log-spaced time bins')
+        else:
+            df = pd.read_csv(uploaded_file)
+        paginated_table(df, key='theis_upload')
+
+if(input_method == 'Archive'):
+
+    archived = archive_loader('theis', key='theis_archive')
+    if archived is not None:
+        df = archived
+        paginated_table(df, key='theis_archive_table')
 
 if "theis_calculated_button_clicked" not in st.session_state:
     st.session_state.theis_calculated_button_clicked = False
@@ -150,10 +158,14 @@ st.markdown("""---""")
 
 if calculate_theis or st.session_state.theis_calculated_button_clicked:
 
-    if(Q == 0 or r == 0):
+    if(Q == 0 or (well_diameter == 0 if pumped_well else r == 0)):
         st.error('Invalid user input - entered value is zero')
         st.stop()
 
+    if pumped_well and schedule is not None:
+        st.error('Invalid user input - the pumped-well fit needs a constant pumping rate')
+        st.stop()
+
     if 'df' not in locals():
         st.error('Invalid user input - please enter data')
         st.stop()
@@ -163,159 +175,83 @@ if calculate_theis or st.session_state.theis_calculated_button_clicked:
 
     t = np.divide(t, 1440)
 
-    def calculate_u(r, S, T, t):
-        return (r*r*S)/(4*T*t)
-
-    def calculate_theis_drawdown(t, S, T, Q, r):
-        u = calculate_u(r, S, T, t)
-        s_theis = Q/(4*np.pi*T)*exp1(u)
-        return s_theis
-
-    def theis_function(t, S, T):
-        return calculate_theis_drawdown(t, S, T, Q, r)
-
-    fig, ax = plt.subplots()
-    plt.plot(t, s, 'x')
-    plt.xlabel('Time')
-    plt.ylabel('Drawdown')
-    st.pyplot(fig)
-    fig, ax = plt.subplots()
-    lnt = np.log(t)
-    coeffs = np.polyfit(np.log(t), s, 1)
-    plt.plot(lnt, s, ls='', marker='o', label='Field Data')
-    fit_line = np.poly1d(coeffs)(lnt)
-    plt.plot(lnt, fit_line, label='Theis Fit')
-    plt.xlabel('Time')
-    plt.ylabel('Drawdown')
-    plt.legend(loc='best')
-    plt.savefig('fig.png')
-    st.pyplot(fig)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.image(cached(render_png, plot_time_drawdown, t, s), width='stretch')
+    with col2:
+        diagnostic_plot(t, s, key='theis_derivative', xlabel='Time (days)')
+    resampling, confidence = (None, None) if pumped_well else interval_selector('theis_intervals')
+    wellbore = None
+    if pumped_well:
+        r = well_diameter/2
+        fit = cached(fit_wellbore, t, s, Q, r, None, known_S or None)
+        wellbore = fit._asdict()
+    elif schedule is None:
+        days = None
+        fit = cached(fit_theis, t, s, Q, r)
+    else:
+        days = schedule_in_days(schedule)
+        fit = cached(fit_schedule, t, s, days, r)
+    S, T = fit.S, fit.T
+    rms_residual = fit.rms_residual
+    intervals = []
+    if resampling is not None:
+        with st.spinner('Resampling'):
+            results = cached(theis_intervals, t, s, Q, r, S, T, days, resampling, confidence)
+        intervals = interval_lines(results, [('T', 'Transmissivity (m2/day)'), ('S', 'Storativity')],
+                                   resampling, confidence)
+
+    if pumped_well:
+        png = cached(render_png, plot_wellbore, df, wellbore, Q, r)
+    else:
+        png = cached(render_png, plot_theis, t, s, S, T, Q, r, days)
+    st.image(png, width='stretch')
     st.markdown("""---""")
 
-    rms_residual = np.sqrt(np.sum((fit_line - s)**2))
-    m, c = coeffs
-
-    def get_S_and_T(m, c):
-        Tfit = Q / 4 / np.pi / m
-        Sfit = 4 * Tfit / r**2 * np.exp(-(c/m + np.euler_gamma))
-        return Sfit, Tfit
-
-    S, T = get_S_and_T(m, c)
-
     st.info('Transmissivity = {} m2/day'.format(round(T, 5)))
     st.info('Storativity = {}'.format(round(S, 5)))
+    if pumped_well:
+        st.info('Skin factor = {}'.format(round(fit.skin, 3)))
+        st.info('Dimensionless wellbore storage (C_D) = {}'.format(round(fit.C_D, 3)))
+    for line in intervals:
+        st.info(line)
 
     st.success(f'RMS residual = {round(rms_residual, 5)}')
+    if pumped_well and not known_S:
+        st.warning('Storativity from pumped-well data assumes no skin - enter a storativity '
+                   'from an observation well to fit the skin factor instead')
+    if not fit.converged:
+        st.warning(f'Theis fit did not converge after {fit.iterations} iterations')
     st.markdown("""---""")
 
-    def output_df_to_pdf(pdf, df):
-        table_cell_width = 35
-        table_cell_height = 10
-        pdf.set_font('Arial', 'B', 8)
-        cols = df.columns
-        for col in cols:
-            pdf.cell(table_cell_width, table_cell_height,
-                         col, align='C', border=1)
-        pdf.ln(table_cell_height)
-        pdf.set_font('Arial', '', 10)
-        for row in df.itertuples():
-            for col in cols:
-                value = str(round(getattr(row, col), 5))
-                pdf.cell(table_cell_width, table_cell_height,
-                             value, align='C', border=1)
-            pdf.ln(table_cell_height)
-                
-    def output_df_to_pdf1(pdf, df):
-        table_cell_width = 90
-        table_cell_height = 12
-        pdf.set_font('Arial', '', 12)
-        cols = df.columns
-        for row in df.itertuples():
-            for col in cols:
-                value = str(getattr(row, col))
-                if (value[:9] == 'Performed'):
-                    table_cell_width = 180
-                    pdf.cell(table_cell_width, table_cell_height, value, align='L', border=1)
-                elif (value == ''):
-                    pass
-                else:
-                    table_cell_width = 90
-                    pdf.cell(table_cell_width, table_cell_height, value, align='L', border=1)
-            pdf.ln(table_cell_height)
-
-    pdf = FPDF()
-    pdf.add_page()
-
-    pdf.image('images/logo.jpg', w=25, h=30)
-
-    pdf.set_font('Arial', 'B', 10)
-    pdf.cell(0, 10, 'CENTRAL GROUND WATER BOARD (CGWB)', ln=1)
-    pdf.ln(5)
-
-    pdf.set_font('Arial', 'BU', 18)
-    pdf.cell(0, 10, 'Theis Test Report', align='C', ln=1)
-    pdf.ln(5)
-
-    pdf.set_font('Arial', '', 12)
-    lst1 = list()
-    lst2 = list()
-    lst1.append(f' location: {location} ')
-    lst2.append(f' coordinate: {coordinates} ')
-    lst1.append(f' Geology: {soil_select} ')
-    lst2.append(f' Lithology: {rock_select} ')
-    lst1.append(f'Performed by: {test_employee} ')
-    lst2.append('')
-    lst1.append(f'Start time: {shr}:{smin} ')
-    lst2.append(f'End time:  {ehr}:{emin}')
-    lst1.append(f' Start Date: {start_date} ')
-    lst2.append(f' End date:  {end_date} ')
-
-    df_1 = pd.DataFrame({'properties': lst1, 'values': lst2})
-    output_df_to_pdf1(pdf, df_1)
-
-    pdf.ln(15)
-
-    lst3 = list()
-    lst4 = list()
-    lst3.append(f' Zones tapped in : {zone} (bgl m)')
-    lst4.append(f' Well depth : {well_depth} m')
-    lst3.append(f' Well diameter : {well_diameter} m')
-    lst4.append(f' Static water level : {static_water} m')
-    df_2 = pd.DataFrame({'properties': lst3, 'values': lst4})
-    output_df_to_pdf1(pdf, df_2)
-    pdf.ln(5)
-
-    pdf.set_font('Arial', '', 12)
-    pdf.cell(0, 10, f'Well Discharge (Q) : {Q} m3/day', ln=1)
-    pdf.cell(0, 10, f'Radial Distance (r) : {r} m', ln=1)
-    pdf.ln(5)
-
-    pdf.set_font('Arial', 'B', 13)
-    pdf.cell(0, 10, "Graphical Interpretation", ln=1)
-    pdf.image('fig.png', w=200, h=200)
-    pdf.ln(5)
-
-    pdf.set_font('Arial', 'B', 12)
-    pdf.cell(0, 10, f'Transmissivity : {round(T, 5)} m2/day', ln=1)
-    pdf.cell(0, 10, f'Storativity : {round(S, 5)}', ln=1)
-    pdf.cell(
-            0, 10, f'Mean Fitting Error = {round(rms_residual, 5)}%', ln=1)
-    pdf.ln(5)
-
-    pdf.set_font('Arial', 'B', 13)
-    pdf.cell(0, 10, 'Data Table', ln=1)
-
-    pdf.set_font('Arial', '', 12)
-    output_df_to_pdf(pdf, df)
-    pdf.ln(4)
-
-    pdf.dashed_line(10, int(pdf.get_y()), 210 - 10,
-                        int(pdf.get_y()), dash_length=1, space_length=1)
-
+    if not pumped_well and st.checkbox('Show the S-T misfit surface (is S identifiable?)',
+                                       key='theis_misfit'):
+        surface = cached(misfit_surface, t, s, Q, r, S, T, days)
+        st.image(cached(render_png, plot_misfit, surface, S, T), width='stretch')
+        (S_low, S_high), (T_low, T_high), S_bounded, T_bounded = confidence_extent(surface)
+        st.info(f'95% confidence region: S from {S_low:.3g} to {S_high:.3g}, '
+                f'T from {T_low:.4g} to {T_high:.4g} m2/day')
+        if not S_bounded:
+            st.warning('The 95% confidence region runs off the grid in S - the record does '
+                       'not pin down the storativity (are the early readings missing?)')
+        if not T_bounded:
+            st.warning('The 95% confidence region runs off the grid in T')
+        st.markdown("""---""")
+
+    meta = dict(location=location, coordinates=coordinates, soil_select=soil_select,
+                rock_select=rock_select, test_employee=test_employee, shr=shr, smin=smin,
+                ehr=ehr, emin=emin, start_date=start_date, end_date=end_date, zone=zone,
+                well_depth=well_depth, well_diameter=well_diameter, static_water=static_water)
     filename = "Theis_Test_Report_" + \
             datetime.now().strftime("%d-%m-%Y,%H:%M:%S")+".pdf"
-    st.download_button("Download Report", data=pdf.output(
-            dest='S').encode('latin-1'), file_name=filename)
+    report_download('theis_report', filename, build_theis_report,
+                    meta, Q, r, T, S, rms_residual, df, png, schedule, wellbore, intervals)
+    archive_saver('theis', 'theis_save', dict(location=location, coordinates=coordinates,
+                                               geology=soil_select, lithology=rock_select,
+                                               performed_by=test_employee,
+                                               performed_on=start_date),
+                  dict(Q=Q, r=r, well_diameter=well_diameter), df,
+                  dict(fit._asdict(), **(results if resampling is not None else {})))
 
         
 
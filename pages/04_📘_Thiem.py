@@ -1,16 +1,18 @@
 import streamlit as st
-import math
-import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from fpdf import FPDF
 from datetime import date, datetime
 import images
-
-st.set_page_config(page_title="Dupuit-Forchheimer", page_icon="🌊",
+from aquaprobe.cache import cached
+from aquaprobe.batch import THIEM_BATCH_COLUMNS, fit_thiem_batch
+from aquaprobe.methods import thiem_estimate
+from aquaprobe.plots import plot_thiem, render_png
+from aquaprobe.report import build_method_report, csv_bytes
+from aquaprobe.widgets import paginated_table, reading_editor, report_download
+
+st.set_page_config(page_title="Thiem", page_icon="🌊",
                    layout="wide", initial_sidebar_state="auto", menu_items=None)
 
-st.title(f"*Dupuit-Forchheimer Method*")
+st.title(f"*Thiem Method*")
 st.markdown("""---""")
 
 location = st.text_input(
@@ -28,156 +30,112 @@ date_performed = st.date_input("Date of performance of test", date(
     today_date_year, today_date_month, today_date_day))
 st.markdown("""---""")
 
-R = st.number_input('Recharge Rate (m/day)', min_value=0.0000, format="%.4f")
-Q = st.number_input('Well Discharge (m3/day)', min_value=0.0000, format="%.3f")
-K = st.number_input("Hydraulic Conductivity (m/day)",
+Q = st.number_input('Pumping rate from well (m3/day)',
                     min_value=0.000, format="%.3f")
-h0 = st.number_input('Head at Outer Radius (m)',
-                     min_value=0.000, format="%.3f")
+confidence = st.select_slider('Confidence level', options=[0.8, 0.9, 0.95, 0.99], value=0.95,
+                              format_func=lambda c: f'{c:.0%}')
 
 st.markdown("""---""")
 
-r1 = st.number_input(
-    'Enter the radius at which you want to obtain the head / drawdown (m)', min_value=0.000, format="%.3f")
+input_method = st.radio('Choose a method for input of data',
+                        ('Upload File', 'Fill Form', 'Batch Upload'), horizontal=True)
+
+if(input_method == 'Fill Form'):
+
+    df = reading_editor('thiem_form', ['r', 'h'],
+                        ['Distance from pumping well (m)', 'Steady head (m)'])
+
+if(input_method == 'Batch Upload'):
+
+    batch_file = st.file_uploader("Choose a file", key='thiem_batch_file')
+    st.warning('Please keep the data in long format with the columns ' +
+               ', '.join(THIEM_BATCH_COLUMNS) +
+               ' (one row per piezometer, r and head in m) and an optional weight column')
+    if(batch_file):
+        try:
+            summary = cached(fit_thiem_batch, pd.read_csv(batch_file), confidence)
+        except ValueError as e:
+            st.error(f'Invalid batch file - {e}')
+            st.stop()
+        paginated_table(summary, key='thiem_batch')
+        st.download_button(label="Download CSV", data=cached(
+            csv_bytes, summary), file_name='Thiem_Batch'+datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+'.csv')
+    st.stop()
 
-if "dupoit_calculated_button_clicked" not in st.session_state:
-    st.session_state.dupoit_calculated_button_clicked = False
+if(input_method == 'Upload File'):
+
+    uploaded_file = st.file_uploader("Choose a file")
+    st.warning(
+        'Please keep the data in columns as Distance from pumping well (m) and Steady head (m), '
+        'with relative weights, if any, in a column headed weight')
+    if(uploaded_file):
+        df = pd.read_csv(uploaded_file)
+        df = df.rename(columns=dict(zip(df.columns[:2], ['r', 'h'])))
+        df = df[['r', 'h'] + (['weight'] if 'weight' in df.columns else [])]
+        paginated_table(df, key='thiem_upload')
+
+if "thiem_calculated_button_clicked" not in st.session_state:
+    st.session_state.thiem_calculated_button_clicked = False
 
 
 def callback():
-    st.session_state.dupoit_calculated_button_clicked = True
+    st.session_state.thiem_calculated_button_clicked = True
 
 
-calculate_dup = st.button('Calculate', on_click=callback)
+calculate_thiem = st.button('Calculate', on_click=callback)
 st.markdown("""---""")
 
-if calculate_dup or st.session_state.dupoit_calculated_button_clicked:
+if calculate_thiem or st.session_state.thiem_calculated_button_clicked:
 
-    if(R == 0 or Q == 0 or K == 0 or h0 == 0):
+    if(Q == 0):
         st.error('Invalid user input - entered value is zero')
         st.stop()
 
-    area = Q/R
-    r0 = math.sqrt(area/math.pi)
-    st.success("Radius of Influence = {} (m)".format(r0))
+    if 'df' not in locals() or len(df) < 2:
+        st.error('Invalid user input - please enter the heads of at least two piezometers')
+        st.stop()
 
-    def calculate_h(r):
-        if(r >= r0 or r == 0):
-            return h0
-        return math.sqrt((h0**2)-(Q*(math.log(r0/r)))/(K*math.pi))
+    if (df['r'] <= 0).any():
+        st.error('Invalid user input - distances from the pumping well must be positive')
+        st.stop()
 
-    h1 = calculate_h(r1)
-    st.info(f"Head at {r1} m = {h1} m")
-    st.info(f"Drawdown at {r1} m = {h0-h1} m")
+    weights = df['weight'] if 'weight' in df.columns else None
+    try:
+        results, df = cached(thiem_estimate, df['r'], df['h'], Q, weights, confidence)
+    except ValueError as e:
+        st.error(f'Invalid user input - {e}')
+        st.stop()
+    T = results['T']
+
+    st.info('Transmissivity = {} (m2/day)'.format(T))
+    if len(df) > 2:
+        st.info(f"{confidence:.0%} confidence interval of T = {results['T_low']} to {results['T_high']} (m2/day)")
+    else:
+        st.warning('Two piezometers fix the line exactly - add more for a confidence interval')
+    st.success(f"RMS residual = {results['rms_residual']} m")
     st.markdown("""---""")
 
-    r_start, r_end = st.slider(
-        'Select a range of radii', 0.01, (r0+(0.5*r0)), (0.01, r0+(0.2*r0)))
-    n_points = st.slider('Select number of points to interpolate', 3, 50, 20)
-
-    step = (r_end-r_start)/n_points
-    r_list = list()
-    for x in np.arange(r_start, r_end, step):
-        r_list.append(x)
-    df = pd.DataFrame({'r': r_list})
-
-    h_list = list()
-    s_list = list()
-    for index, row in df.iterrows():
-        h = calculate_h(row['r'])
-        h_list.append(h)
-        s = h0-h
-        s_list.append(s)
-
-    df['h'] = h_list
-    df['s'] = s_list
-
-    st.table(df)
-    st.download_button(label="Download CSV", data=df.to_csv().encode(
-        'utf-8'), file_name='Dupuit-Forchheimer'+datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+'.csv')
+    paginated_table(df, key='thiem_results')
+    st.download_button(label="Download CSV", data=cached(
+        csv_bytes, df), file_name='Thiem'+datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+'.csv')
     st.markdown("""---""")
 
-    fig, ax = plt.subplots()
-    plt.plot(df['r'], df['s'])
-    plt.xlabel("Distance from pumping well (m)")
-    plt.ylabel("Drawdown (m)")
-    plt.title("Estimated Steady State Cone of Depression")
-    plt.savefig('fig.png')
-    arrow_properties = dict(facecolor="red", width=1, headwidth=4, shrink=0.1)
-    plt.annotate("r0", (r0,s), arrowprops = arrow_properties)
-    st.pyplot(fig)
+    png = cached(render_png, plot_thiem, df, results)
+    st.image(png, width='stretch')
     st.markdown("""---""")
 
-    def output_df_to_pdf(pdf, df):
-        table_cell_width = 35
-        table_cell_height = 10
-        pdf.set_font('Arial', 'B', 8)
-        cols = df.columns
-        for col in cols:
-            pdf.cell(table_cell_width, table_cell_height,
-                     col, align='C', border=1)
-        pdf.ln(table_cell_height)
-        pdf.set_font('Arial', '', 10)
-        for row in df.itertuples():
-            for col in cols:
-                value = str(round(getattr(row, col), 5))
-                pdf.cell(table_cell_width, table_cell_height,
-                         value, align='C', border=1)
-            pdf.ln(table_cell_height)
-
-    pdf = FPDF()
-    pdf.add_page()
-
-    pdf.image('images/logo.jpg', w=100, h=30)
-
-    pdf.set_font('Arial', 'B', 10)
-    pdf.cell(0, 10, 'CENTRAL GROUND WATER BOARD (CGWB)', ln=1)
-    pdf.ln(5)
-
-    pdf.set_font('Arial', 'B', 18)
-    pdf.cell(0, 10, 'Dupuit-Forchheimer Test Report', align='C', ln=1)
-    pdf.line(10, int(pdf.get_y()), 210 - 10, int(pdf.get_y()))
-    pdf.ln(5)
-
-    pdf.set_font('Arial', '', 12)
-    pdf.cell(0, 10, f'Location : {location}', align='L')
-    pdf.cell(0, 10, f'Coordinates : {coordinates}', align='R', ln=1)
-    pdf.cell(0, 10, f'Performed by : {test_employee}', align='L')
-    pdf.cell(0, 10, f'Performed on : {date_performed}',align='R',ln=1)
-    pdf.ln(5)
-
-    pdf.cell(0, 10, f'Recharge rate : {R} m/day', ln=1)
-    pdf.cell(0, 10, f'Well Discharge : {Q} m3/day', align='L', ln=1)
-    pdf.cell(0, 10, f'Hydraulic Conductivity : {K} m/day', ln=1)
-    pdf.cell(0, 10, f'Head at Outer Radius : {h0} m', align='L')
-    pdf.cell(
-        0, 10, f'Radius at which head/Drawdown calculated : {r1} m', align='R', ln=1)
-    pdf.ln(10)
-
-    pdf.set_font('Arial', 'B', 13)
-    pdf.cell(0, 10, 'Data Table', ln=1)
-
-    pdf.set_font('Arial', '', 12)
-    output_df_to_pdf(pdf, df)
-    pdf.ln(10)
-
-    pdf.set_font('Arial', 'B', 12)
-    pdf.cell(0, 10, f'Head : {h1} m', ln=1)
-    pdf.cell(0, 10, f'Drawdown : {h0 - h1} m', ln=1)
-    pdf.cell(0, 10, f'Radius of influence : {r0} m', ln=1)
-    pdf.ln(5)
-
-    pdf.set_font('Arial', 'B', 13)
-    pdf.cell(0, 10, "Graphical Interpretation", ln=1)
-    pdf.image('fig.png', w=200, h=200)
-    pdf.ln(5)
-    pdf.dashed_line(10, int(pdf.get_y()), 210 - 10,
-                    int(pdf.get_y()), dash_length=1, space_length=1)
-
-    filename = "Dupuit-Forchheimer_Report_" + \
+    meta = dict(location=location, coordinates=coordinates,
+                test_employee=test_employee, date_performed=date_performed)
+    parameter_rows = [(f'Well Discharge (Q) : {Q} m3/day',
+                       f'Piezometers : {len(df)}')]
+    result_lines = [f'Transmissivity : {round(T, 5)} m2/day',
+                    f'{confidence:.0%} confidence interval : '
+                    f'{round(results["T_low"], 5)} to {round(results["T_high"], 5)} m2/day',
+                    f'RMS residual : {round(results["rms_residual"], 5)} m']
+    filename = "Thiem_Report_" + \
         datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+".pdf"
-    st.download_button("Download Report", data=pdf.output(
-        dest='S').encode('latin-1'), file_name=filename)
+    report_download('thiem_report', filename, build_method_report,
+                    'Thiem Test Report', meta, parameter_rows, df, result_lines, png)
 
     st.markdown("""---""")
 
@@ -187,4 +145,4 @@ hide_streamlit_style = """
             footer {visibility: hidden;}
             </style>
             """
-st.markdown(hide_streamlit_style, unsafe_allow_html=True)
\ No newline at end of file
+st.markdown(hide_streamlit_style, unsafe_allow_html=True)
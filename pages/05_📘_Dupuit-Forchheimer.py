@@ -1,11 +1,13 @@
 import streamlit as st
-import math
-import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from fpdf import FPDF
 from datetime import date, datetime
 import images
+from aquaprobe.cache import cached
+from aquaprobe.methods import dupuit_forchheimer, dupuit_head, radius_of_influence
+from aquaprobe.plots import plot_dupuit, plot_dupuit_field, render_png
+from aquaprobe.report import build_method_report, csv_bytes
+from aquaprobe.wellfield import make_well_field
+from aquaprobe.widgets import paginated_table, report_download
 
 st.set_page_config(page_title="Dupuit-Forchheimer", page_icon="🌊",
                    layout="wide", initial_sidebar_state="auto", menu_items=None)
@@ -57,16 +59,10 @@ if calculate_dup or st.session_state.dupoit_calculated_button_clicked:
         st.error('Invalid user input - entered value is zero')
         st.stop()
 
-    area = Q/R
-    r0 = math.sqrt(area/math.pi)
+    r0 = radius_of_influence(R, Q)
     st.success("Radius of Influence = {} (m)".format(r0))
 
-    def calculate_h(r):
-        if(r >= r0 or r == 0):
-            return h0
-        return math.sqrt((h0**2)-(Q*(math.log(r0/r)))/(K*math.pi))
-
-    h1 = calculate_h(r1)
+    h1 = float(dupuit_head(r1, Q, K, h0, r0))
     st.info(f"Head at {r1} m = {h1} m")
     st.info(f"Drawdown at {r1} m = {h0-h1} m")
     st.markdown("""---""")
@@ -75,109 +71,50 @@ if calculate_dup or st.session_state.dupoit_calculated_button_clicked:
         'Select a range of radii', 0.01, (r0+(0.5*r0)), (0.01, r0+(0.2*r0)))
     n_points = st.slider('Select number of points to interpolate', 3, 50, 20)
 
-    step = (r_end-r_start)/n_points
-    r_list = list()
-    for x in np.arange(r_start, r_end, step):
-        r_list.append(x)
-    df = pd.DataFrame({'r': r_list})
-
-    h_list = list()
-    s_list = list()
-    for index, row in df.iterrows():
-        h = calculate_h(row['r'])
-        h_list.append(h)
-        s = h0-h
-        s_list.append(s)
-
-    df['h'] = h_list
-    df['s'] = s_list
-
-    st.table(df)
-    st.download_button(label="Download CSV", data=df.to_csv().encode(
-        'utf-8'), file_name='Dupuit-Forchheimer'+datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+'.csv')
-    st.markdown("""---""")
+    results, df = cached(dupuit_forchheimer, R, Q, K, h0, r1, r_start, r_end, n_points)
 
-    fig, ax = plt.subplots()
-    plt.plot(df['r'], df['s'])
-    plt.xlabel("Distance from pumping well (m)")
-    plt.ylabel("Drawdown (m)")
-    plt.title("Estimated Steady State Cone of Depression")
-    plt.savefig('fig.png')
-    arrow_properties = dict(facecolor="red", width=1, headwidth=4, shrink=0.1)
-    plt.annotate("r0", (r0,s), arrowprops = arrow_properties)
-    st.pyplot(fig)
+    paginated_table(df, key='dupuit_results')
+    st.download_button(label="Download CSV", data=cached(
+        csv_bytes, df), file_name='Dupuit-Forchheimer'+datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+'.csv')
     st.markdown("""---""")
 
-    def output_df_to_pdf(pdf, df):
-        table_cell_width = 35
-        table_cell_height = 10
-        pdf.set_font('Arial', 'B', 8)
-        cols = df.columns
-        for col in cols:
-            pdf.cell(table_cell_width, table_cell_height,
-                     col, align='C', border=1)
-        pdf.ln(table_cell_height)
-        pdf.set_font('Arial', '', 10)
-        for row in df.itertuples():
-            for col in cols:
-                value = str(round(getattr(row, col), 5))
-                pdf.cell(table_cell_width, table_cell_height,
-                         value, align='C', border=1)
-            pdf.ln(table_cell_height)
-
-    pdf = FPDF()
-    pdf.add_page()
-
-    pdf.image('images/logo.jpg', w=100, h=30)
-
-    pdf.set_font('Arial', 'B', 10)
-    pdf.cell(0, 10, 'CENTRAL GROUND WATER BOARD (CGWB)', ln=1)
-    pdf.ln(5)
-
-    pdf.set_font('Arial', 'B', 18)
-    pdf.cell(0, 10, 'Dupuit-Forchheimer Test Report', align='C', ln=1)
-    pdf.line(10, int(pdf.get_y()), 210 - 10, int(pdf.get_y()))
-    pdf.ln(5)
-
-    pdf.set_font('Arial', '', 12)
-    pdf.cell(0, 10, f'Location : {location}', align='L')
-    pdf.cell(0, 10, f'Coordinates : {coordinates}', align='R', ln=1)
-    pdf.cell(0, 10, f'Performed by : {test_employee}', align='L')
-    pdf.cell(0, 10, f'Performed on : {date_performed}',align='R',ln=1)
-    pdf.ln(5)
-
-    pdf.cell(0, 10, f'Recharge rate : {R} m/day', ln=1)
-    pdf.cell(0, 10, f'Well Discharge : {Q} m3/day', align='L', ln=1)
-    pdf.cell(0, 10, f'Hydraulic Conductivity : {K} m/day', ln=1)
-    pdf.cell(0, 10, f'Head at Outer Radius : {h0} m', align='L')
-    pdf.cell(
-        0, 10, f'Radius at which head/Drawdown calculated : {r1} m', align='R', ln=1)
-    pdf.ln(10)
-
-    pdf.set_font('Arial', 'B', 13)
-    pdf.cell(0, 10, 'Data Table', ln=1)
-
-    pdf.set_font('Arial', '', 12)
-    output_df_to_pdf(pdf, df)
-    pdf.ln(10)
-
-    pdf.set_font('Arial', 'B', 12)
-    pdf.cell(0, 10, f'Head : {h1} m', ln=1)
-    pdf.cell(0, 10, f'Drawdown : {h0 - h1} m', ln=1)
-    pdf.cell(0, 10, f'Radius of influence : {r0} m', ln=1)
-    pdf.ln(5)
-
-    pdf.set_font('Arial', 'B', 13)
-    pdf.cell(0, 10, "Graphical Interpretation", ln=1)
-    pdf.image('fig.png', w=200, h=200)
-    pdf.ln(5)
-    pdf.dashed_line(10, int(pdf.get_y()), 210 - 10,
-                    int(pdf.get_y()), dash_length=1, space_length=1)
+    png = cached(render_png, plot_dupuit, df, r0)
+    st.image(png, width='stretch')
+    st.markdown("""---""")
 
+    meta = dict(location=location, coordinates=coordinates,
+                test_employee=test_employee, date_performed=date_performed)
+    parameter_rows = [(f'Recharge rate : {R} m/day', None),
+                      (f'Well Discharge : {Q} m3/day', None),
+                      (f'Hydraulic Conductivity : {K} m/day', None),
+                      (f'Head at Outer Radius : {h0} m',
+                       f'Radius at which head/Drawdown calculated : {r1} m')]
+    result_lines = [f'Head : {h1} m',
+                    f'Drawdown : {h0 - h1} m',
+                    f'Radius of influence : {r0} m']
     filename = "Dupuit-Forchheimer_Report_" + \
         datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+".pdf"
-    st.download_button("Download Report", data=pdf.output(
-        dest='S').encode('latin-1'), file_name=filename)
+    report_download('dupuit_report', filename, build_method_report,
+                    'Dupuit-Forchheimer Test Report', meta, parameter_rows, df, result_lines, png)
+
+    st.markdown("""---""")
+
+    st.subheader('Well Field')
+    st.caption('Drawdown of several pumping wells, superposed in h² with the recharge rate, '
+               'hydraulic conductivity and head at outer radius entered above')
+    wells_table = st.data_editor(pd.DataFrame({'x (m)': [0.0], 'y (m)': [0.0],
+                                               'Discharge (m3/day)': [Q]}),
+                                 num_rows='dynamic', key='dupuit_wells')
+    wells_table = wells_table.dropna()
+    try:
+        wells = make_well_field(wells_table['x (m)'], wells_table['y (m)'],
+                                wells_table['Discharge (m3/day)'])
+    except ValueError as e:
+        st.error(f'Invalid well field - {e}')
+        st.stop()
+    n_cells = st.select_slider('Grid resolution (cells per side)',
+                               options=[100, 200, 400, 1000, 2000], value=400)
+    st.image(cached(render_png, plot_dupuit_field, wells, R, K, h0, n_cells), width='stretch')
 
     st.markdown("""---""")
 
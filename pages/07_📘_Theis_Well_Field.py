@@ -0,0 +1,123 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import images
+from aquaprobe.cache import cached, cached_as, make_key
+from aquaprobe.plots import plot_theis_field, render_gif, render_png
+from aquaprobe.report import csv_bytes
+from aquaprobe.wellfield import interference, make_well_field, theis_field
+from aquaprobe.widgets import paginated_table
+
+st.set_page_config(page_title="Theis Well Field", page_icon="🌊",
+                   layout="wide", initial_sidebar_state="auto", menu_items=None)
+
+st.title(f"*Theis Well Field*")
+st.caption('Forward model of the drawdown around several pumping wells in a confined aquifer, '
+           'to check the interference between production wells before siting them')
+st.markdown("""---""")
+
+T = st.number_input('Transmissivity (m2/day)', min_value=0.000, format="%.3f")
+S = st.number_input('Storativity', min_value=0.0, format="%.6f")
+
+st.markdown("""---""")
+
+st.write('Pumping Wells')
+wells_table = st.data_editor(pd.DataFrame({'x (m)': [0.0], 'y (m)': [0.0],
+                                           'Discharge (m3/day)': [0.0]}),
+                             num_rows='dynamic', key='theis_field_wells')
+wells_table = wells_table.dropna()
+
+col1, col2 = st.columns(2)
+with col1:
+    t_start = st.number_input('First time (min)', min_value=0.0, value=1.0, format="%.3f")
+    t_end = st.number_input('Last time (min)', min_value=0.0, value=1440.0, format="%.3f")
+with col2:
+    n_times = st.slider('Time slices', min_value=2, max_value=50, value=20)
+    n_cells = st.select_slider('Grid resolution (cells per side)',
+                               options=[100, 200, 300, 500], value=200)
+
+if "theis_field_calculated_button_clicked" not in st.session_state:
+    st.session_state.theis_field_calculated_button_clicked = False
+
+
+def callback():
+    st.session_state.theis_field_calculated_button_clicked = True
+
+
+calculate_field = st.button('Calculate', on_click=callback)
+st.markdown("""---""")
+
+if calculate_field or st.session_state.theis_field_calculated_button_clicked:
+
+    if(T == 0 or S == 0):
+        st.error('Invalid user input - entered value is zero')
+        st.stop()
+
+    if(t_start <= 0 or t_end <= t_start):
+        st.error('Invalid user input - the last time must be after a positive first time')
+        st.stop()
+
+    try:
+        wells = make_well_field(wells_table['x (m)'], wells_table['y (m)'],
+                                wells_table['Discharge (m3/day)'])
+    except ValueError as e:
+        st.error(f'Invalid well field - {e}')
+        st.stop()
+
+    if not wells.Q.any():
+        st.error('Invalid user input - every well has a discharge of zero')
+        st.stop()
+
+    # times in days, log spaced so the early spread of the cones shows
+    times = np.geomspace(t_start, t_end, n_times) / 1440
+
+    # one drawdown series per session; it can be tens of MB, so it is kept
+    # out of the shared cache
+    field_key = make_key(theis_field, wells, S, T, times, n_cells)
+    if st.session_state.get('theis_field_key') != field_key:
+        with st.spinner('Computing drawdown'):
+            st.session_state.theis_field = theis_field(wells, S, T, times,
+                                                       nx=n_cells, ny=n_cells)
+        st.session_state.theis_field_key = field_key
+    field = st.session_state.theis_field
+
+    k = st.select_slider('Time (min)', options=list(range(n_times)), value=n_times - 1,
+                         format_func=lambda i: '{:.4g}'.format(times[i] * 1440))
+    # the figures are keyed on the inputs of the field rather than a hash
+    # of the drawdown cube itself
+    st.image(cached_as(make_key(render_png, plot_theis_field, field_key, k),
+                       render_png, plot_theis_field, field, wells, k), width='stretch')
+
+    if st.button('Animate'):
+        with st.spinner('Rendering animation'):
+            gif = cached_as(make_key(render_gif, plot_theis_field, field_key),
+                            render_gif, plot_theis_field,
+                            [(field, wells, i) for i in range(n_times)])
+        st.image(gif, width='stretch')
+        st.download_button(label="Download GIF", data=gif, file_name='Theis_Well_Field' +
+                           datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+'.gif')
+    st.markdown("""---""")
+
+    st.subheader('Interference')
+    st.caption('Drawdown at each well (rows) caused by each pumping well (columns) '
+               'at the selected time; the diagonal is at a well radius of 0.1 m')
+    names = [f'Well {i}' for i in range(len(wells.Q))]
+    matrix = interference(wells, S, T, times[k])
+    df = pd.DataFrame(matrix, index=names, columns=names)
+    df['Total'] = matrix.sum(axis=1)
+    df['From other wells'] = df['Total'] - np.diag(matrix)
+    df = df.reset_index(names='Well')
+    paginated_table(df, key='theis_field_interference')
+    st.download_button(label="Download CSV", data=cached(
+        csv_bytes, df), file_name='Theis_Well_Field'+datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+'.csv')
+
+    st.markdown("""---""")
+
+hide_streamlit_style = """
+            <style>
+            #MainMenu {visibility: hidden;}
+            footer {visibility: hidden;}
+            </style>
+            """
+st.markdown(hide_streamlit_style, unsafe_allow_html=True)
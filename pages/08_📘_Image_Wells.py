@@ -0,0 +1,170 @@
+import streamlit as st
+import pandas as pd
+from datetime import date, datetime
+import images
+from aquaprobe.boundaries import make_layout
+from aquaprobe.cache import cached
+from aquaprobe.ingest import LARGE_FILE_BYTES, read_logger
+from aquaprobe.methods import image_well_theis, observation_point
+from aquaprobe.plots import plot_image_wells, render_png
+from aquaprobe.report import build_method_report, csv_bytes
+from aquaprobe.widgets import paginated_table, reading_editor, report_download
+
+st.set_page_config(page_title="Image Wells", page_icon="🌊",
+                   layout="wide", initial_sidebar_state="auto", menu_items=None)
+
+st.title(f"*Image Well Method*")
+st.caption('Theis analysis near straight barrier (no-flow) and recharge (constant-head) '
+           'boundaries, fitting the distance from the pumping well to the boundary')
+st.markdown("""---""")
+
+location = st.text_input(
+    "Test Location", placeholder='Enter the location of the test well')
+coordinates = st.text_input(
+    "Coordinates of test location", placeholder='48.8566° N, 2.3522° E')
+test_employee = st.text_input(
+    "Performed by", placeholder='Performed by Mr / Mrs. ____')
+today_date = date.today()
+today_date_string = today_date.strftime("%Y/%m/%d")
+today_date_year = int(today_date_string[0:4])
+today_date_month = int(today_date_string[5:7])
+today_date_day = int(today_date_string[8:])
+date_performed = st.date_input("Date of performance of test", date(
+    today_date_year, today_date_month, today_date_day))
+st.markdown("""---""")
+
+Q = st.number_input('Pumping rate from well (m3/day)',
+                    min_value=0.000, format="%.3f")
+r = st.number_input('Distance from well (m)',
+                    min_value=0.000, format="%.3f")
+angle = st.number_input('Direction of the observation well (degrees)', value=0.0,
+                        help='Anticlockwise from the direction from the pumping well to the boundary')
+st.markdown("""---""")
+
+shapes = {'Straight boundary': 'straight', 'Parallel strip': 'strip', 'Wedge': 'wedge'}
+kinds = {'Barrier (no flow)': 'barrier', 'Recharge (constant head)': 'recharge'}
+shape = shapes[st.radio('Boundary', list(shapes), horizontal=True)]
+col1, col2 = st.columns(2)
+with col1:
+    first_kind = kinds[st.selectbox('Kind of boundary', list(kinds))]
+boundary_kinds = [first_kind]
+width, wedge_n, position = None, 2, 0.5
+if shape != 'straight':
+    with col2:
+        boundary_kinds.append(kinds[st.selectbox('Kind of second boundary', list(kinds))])
+    if shape == 'strip':
+        width = st.number_input('Width of the strip (m)', min_value=0.000, format="%.3f")
+    else:
+        wedge_n = st.select_slider('Wedge angle (degrees)', options=[2, 3, 4, 6, 8, 12],
+                                   value=2, format_func=lambda n: f'{180 / n:g}')
+        position = st.slider('Direction of the pumping well from the first side of the wedge, '
+                             'as a fraction of the wedge angle', 0.05, 0.95, 0.5)
+
+try:
+    layout = make_layout(shape, boundary_kinds, width, wedge_n, position)
+except ValueError as e:
+    st.error(f'Invalid boundary - {e}')
+    st.stop()
+
+st.markdown("""---""")
+
+input_method = st.radio('Choose a method for input of data',
+                        ('Upload File', 'Fill Form'), horizontal=True)
+
+if(input_method == 'Fill Form'):
+
+    df = reading_editor('image_wells_form', ['Time', 'Drawdown'],
+                        ['Time (mins)', 'Drawdown (m)'])
+
+if(input_method == 'Upload File'):
+
+    uploaded_file = st.file_uploader("Choose a file")
+    st.warning('Please keep the data in two columns as Time (mins) and Drawdown (m) respectively')
+    if(uploaded_file):
+        stream_file = st.checkbox('Reduce to log-spaced time bins (for large logger files)',
+                                  value=uploaded_file.size > LARGE_FILE_BYTES)
+        if stream_file:
+            df = read_logger(uploaded_file)
+            st.info(f'Data reduced to {len(df)} log-spaced time bins')
+        else:
+            df = pd.read_csv(uploaded_file)
+        df = df.rename(columns=dict(zip(df.columns[:2], ['Time', 'Drawdown'])))
+        paginated_table(df, key='image_wells_upload')
+
+if "image_wells_calculated_button_clicked" not in st.session_state:
+    st.session_state.image_wells_calculated_button_clicked = False
+
+
+def callback():
+    st.session_state.image_wells_calculated_button_clicked = True
+
+
+calculate_image_wells = st.button(label='Calculate', on_click=callback)
+st.markdown("""---""")
+
+if calculate_image_wells or st.session_state.image_wells_calculated_button_clicked:
+
+    if(Q == 0 or r == 0):
+        st.error('Invalid user input - entered value is zero')
+        st.stop()
+
+    if 'df' not in locals() or len(df) < 4:
+        st.error('Invalid user input - please enter at least four readings')
+        st.stop()
+
+    if (df['Time'] <= 0).any():
+        st.error('Invalid user input - times must be positive')
+        st.stop()
+
+    with st.spinner('Fitting'):
+        try:
+            results, df = cached(image_well_theis, df['Time'], df['Drawdown'], Q, r, angle,
+                                 layout)
+        except ValueError as e:
+            st.error(f'Invalid boundary - {e}')
+            st.stop()
+    T, S, distance = results['T'], results['S'], results['distance']
+
+    x, y = observation_point(r, angle)
+    png = cached(render_png, plot_image_wells, df, results, x, y, layout)
+    st.image(png, width='stretch')
+
+    st.info('Transmissivity = {} m2/day'.format(round(T, 5)))
+    st.info('Storativity = {}'.format(round(S, 7)))
+    st.info('Distance from the pumping well to the boundary = {} m'.format(round(distance, 3)))
+    st.success(f"RMS residual = {round(results['rms_residual'], 5)}")
+    if not results['converged']:
+        st.warning('The image well fit did not converge')
+    if shape == 'strip':
+        st.warning('A well in a strip can often be matched as well from either side - '
+                   'check the distance against the site geology')
+    st.markdown("""---""")
+
+    paginated_table(df, key='image_wells_results')
+    st.download_button(label="Download CSV", data=cached(
+        csv_bytes, df), file_name='Image_Wells'+datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+'.csv')
+    st.markdown("""---""")
+
+    meta = dict(location=location, coordinates=coordinates,
+                test_employee=test_employee, date_performed=date_performed)
+    parameter_rows = [(f'Well Discharge (Q) : {Q} m3/day', f'Distance from well : {r} m'),
+                      (f'Boundary : {shape}, ' + ' and '.join(boundary_kinds),
+                       f'Direction of observation well : {angle} degrees')]
+    result_lines = [f'Transmissivity : {round(T, 5)} m2/day',
+                    f'Storativity : {round(S, 7)}',
+                    f'Distance to boundary : {round(distance, 3)} m',
+                    f'RMS residual : {round(results["rms_residual"], 5)} m']
+    filename = "Image_Well_Report_" + \
+        datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+".pdf"
+    report_download('image_wells_report', filename, build_method_report,
+                    'Image Well Test Report', meta, parameter_rows, df, result_lines, png)
+
+    st.markdown("""---""")
+
+hide_streamlit_style = """
+            <style>
+            #MainMenu {visibility: hidden;}
+            footer {visibility: hidden;}
+            </style>
+            """
+st.markdown(hide_streamlit_style, unsafe_allow_html=True)
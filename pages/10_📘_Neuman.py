@@ -0,0 +1,153 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+from datetime import date, datetime
+import images
+from aquaprobe.cache import cached
+from aquaprobe.ingest import LARGE_FILE_BYTES, read_logger
+from aquaprobe.methods import neuman
+from aquaprobe.plots import plot_neuman, render_png
+from aquaprobe.report import build_method_report, csv_bytes
+from aquaprobe.widgets import paginated_table, reading_editor, report_download
+
+st.set_page_config(page_title="Neuman", page_icon="🌊",
+                   layout="wide", initial_sidebar_state="auto", menu_items=None)
+
+st.title(f"*Neuman Method*")
+st.caption('Unconfined aquifer with delayed yield: fits transmissivity, storativity, '
+           'specific yield and the anisotropy parameter beta = (Kz/Kr) r²/b²')
+st.markdown("""---""")
+
+location = st.text_input(
+    "Test Location", placeholder='Enter the location of the test well')
+coordinates = st.text_input(
+    "Coordinates of test location", placeholder='48.8566° N, 2.3522° E')
+test_employee = st.text_input(
+    "Performed by", placeholder='Performed by Mr / Mrs. ____')
+today_date = date.today()
+today_date_string = today_date.strftime("%Y/%m/%d")
+today_date_year = int(today_date_string[0:4])
+today_date_month = int(today_date_string[5:7])
+today_date_day = int(today_date_string[8:])
+date_performed = st.date_input("Date of performance of test", date(
+    today_date_year, today_date_month, today_date_day))
+st.markdown("""---""")
+
+Q = st.number_input('Pumping rate from well (m3/day)',
+                    min_value=0.000, format="%.3f")
+r = st.number_input('Distance from well (m)',
+                    min_value=0.000, format="%.3f")
+b = st.number_input('Saturated thickness (m)', min_value=0.000, format="%.3f",
+                    help='Optional, for the hydraulic conductivity and the anisotropy Kz/Kr')
+
+st.markdown("""---""")
+
+input_method = st.radio('Choose a method for input of data',
+                        ('Upload File', 'Fill Form'), horizontal=True)
+
+if(input_method == 'Fill Form'):
+
+    df = reading_editor('neuman_form', ['Time', 'Drawdown'],
+                        ['Time (mins)', 'Drawdown (m)'])
+
+if(input_method == 'Upload File'):
+
+    uploaded_file = st.file_uploader("Choose a file")
+    st.warning('Please keep the data in two columns as Time (mins) and Drawdown (m) respectively')
+    if(uploaded_file):
+        stream_file = st.checkbox('Reduce to log-spaced time bins (for large logger files)',
+                                  value=uploaded_file.size > LARGE_FILE_BYTES)
+        if stream_file:
+            df = read_logger(uploaded_file)
+            st.info(f'Data reduced to {len(df)} log-spaced time bins')
+        else:
+            df = pd.read_csv(uploaded_file)
+        df = df.rename(columns=dict(zip(df.columns[:2], ['Time', 'Drawdown'])))
+        paginated_table(df, key='neuman_upload')
+
+if "neuman_calculated_button_clicked" not in st.session_state:
+    st.session_state.neuman_calculated_button_clicked = False
+
+
+def callback():
+    st.session_state.neuman_calculated_button_clicked = True
+
+
+calculate_neuman = st.button(label='Calculate', on_click=callback)
+st.markdown("""---""")
+
+if calculate_neuman or st.session_state.neuman_calculated_button_clicked:
+
+    if(Q == 0 or r == 0):
+        st.error('Invalid user input - entered value is zero')
+        st.stop()
+
+    if 'df' not in locals() or len(df) < 4:
+        st.error('Invalid user input - please enter at least four readings')
+        st.stop()
+
+    if (df['Time'] <= 0).any():
+        st.error('Invalid user input - times must be positive')
+        st.stop()
+
+    with st.spinner('Fitting'):
+        results, df = cached(neuman, df['Time'], df['Drawdown'], Q, r, b)
+    T, S, Sy = results['T'], results['S'], results['Sy']
+
+    if not np.isfinite(results['rms_residual']) or Sy >= 1:
+        st.error('The Neuman fit failed - a specific yield of {:.3g} is not physical. '
+                 'The readings do not show delayed yield; check them or use the Theis '
+                 'method'.format(Sy))
+        st.stop()
+
+    png = cached(render_png, plot_neuman, df, results, Q, r)
+    st.image(png, width='stretch')
+
+    st.info('Transmissivity = {} m2/day'.format(round(T, 5)))
+    st.info('Storativity = {}'.format(S))
+    st.info('Specific yield = {}'.format(round(Sy, 5)))
+    st.info('beta = {}'.format(round(results['beta'], 5)))
+    if b > 0:
+        st.info('Hydraulic conductivity = {} m/day, anisotropy Kz/Kr = {}'.format(
+            round(results['K'], 5), round(results['anisotropy'], 5)))
+    st.success(f"RMS residual = {round(results['rms_residual'], 5)}")
+    if not results['converged']:
+        st.warning('The Neuman fit did not converge')
+    if Sy < 2 * S:
+        st.warning('The specific yield is barely above the storativity - the readings '
+                   'show no delayed yield and the Theis method applies')
+    if S < 1e-4 * Sy:
+        st.warning('The early readings do not resolve the storativity - '
+                   'readings from the first minutes of pumping are needed')
+    st.markdown("""---""")
+
+    paginated_table(df, key='neuman_results')
+    st.download_button(label="Download CSV", data=cached(
+        csv_bytes, df), file_name='Neuman'+datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+'.csv')
+    st.markdown("""---""")
+
+    meta = dict(location=location, coordinates=coordinates,
+                test_employee=test_employee, date_performed=date_performed)
+    parameter_rows = [(f'Well Discharge (Q) : {Q} m3/day', f'Distance from well : {r} m'),
+                      (f'Saturated thickness : {b} m', None)]
+    result_lines = [f'Transmissivity : {round(T, 5)} m2/day',
+                    f'Storativity : {S:.5g}',
+                    f'Specific yield : {round(Sy, 5)}',
+                    f'beta : {round(results["beta"], 5)}',
+                    f'RMS residual : {round(results["rms_residual"], 5)} m']
+    if b > 0:
+        result_lines.insert(4, f'Anisotropy (Kz/Kr) : {round(results["anisotropy"], 5)}')
+    filename = "Neuman_Report_" + \
+        datetime.now().strftime("/%d/%m/%Y,%H:%M:%S")+".pdf"
+    report_download('neuman_report', filename, build_method_report,
+                    'Neuman Test Report', meta, parameter_rows, df, result_lines, png)
+
+    st.markdown("""---""")
+
+hide_streamlit_style = """
+            <style>
+            #MainMenu {visibility: hidden;}
+            footer {visibility: hidden;}
+            </style>
+            """
+st.markdown(hide_streamlit_style, unsafe_allow_html=True)